@@ -13,12 +13,26 @@ psisloo
 psislw
     Pareto smoothed importance sampling.
 
+psis_tail_length
+    Number of the largest log weights that determine the Pareto smoothing.
+
+psisloo_from_tails
+    PSIS leave-one-out log predictive densities from the largest log weights
+    of each observation only.
+
 gpdfitnew
     Estimate the paramaters for the Generalized Pareto Distribution (GPD).
 
+gpdfitnew_columns
+    Estimate the paramaters of the GPD for each column of a data array at once.
+
 gpinv
     Inverse Generalised Pareto distribution function.
 
+gpinv_columns
+    Inverse Generalised Pareto distribution function for one (k, sigma) pair
+    per column at once.
+
 sumlogs
     Sum of vector where numbers are represented by their logarithms.
 
@@ -63,9 +77,15 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
 from __future__ import division # For Python 2 compatibility
+from multiprocessing import Pool
 import numpy as np
 
 
+# Maximum number of elements of the temporary arrays of the batched GPD fit,
+# which determines how many columns are processed at once
+GPDFIT_BATCH_SIZE = 2 ** 22
+
+
 def psisloo(log_lik, **kwargs):
     """PSIS leave-one-out log predictive densities.
 
@@ -111,7 +131,7 @@ def psisloo(log_lik, **kwargs):
     return    dict(loo=loo, loos=loos, ks=ks)
     #return loo, loos, ks
 
-def psislw(lw, Reff=1.0, overwrite_lw=False):
+def psislw(lw, Reff=1.0, overwrite_lw=False, n_processes=None):
     """Pareto smoothed importance sampling (PSIS).
 
     Parameters
@@ -127,6 +147,11 @@ def psislw(lw, Reff=1.0, overwrite_lw=False):
         If True, the input array `lw` is smoothed in-place, assuming the array
         is F-contiguous. By default, a new array is allocated.
 
+    n_processes : int, optional
+        If larger than 1, the sets of log weights are split into as many
+        groups, which are smoothed by a pool of workers. By default, all sets
+        are smoothed in the calling process.
+
     Returns
     -------
     lw_out : ndarray
@@ -158,50 +183,26 @@ def psislw(lw, Reff=1.0, overwrite_lw=False):
     # precalculate constants
     cutoff_ind = - int(np.ceil(min(0.2 * n, 3 * np.sqrt(n / Reff)))) - 1
     cutoffmin = np.log(np.finfo(float).tiny)
-    logn = np.log(n)
     k_min = 1/3
 
-    # loop over sets of log weights
-    for i, x in enumerate(lw_out.T if lw_out.ndim == 2 else lw_out[None, :]):
-        # improve numerical accuracy
-        x -= np.max(x)
-        # sort the array
-        x_sort_ind = np.argsort(x)
-        # divide log weights into body and right tail
-        xcutoff = max(
-            x[x_sort_ind[cutoff_ind]],
-            cutoffmin
-        )
-        expxcutoff = np.exp(xcutoff)
-        tailinds, = np.where(x > xcutoff)
-        x2 = x[tailinds]
-        n2 = len(x2)
-        if n2 <= 4:
-            # not enough tail samples for gpdfitnew
-            k = np.inf
-        else:
-            # order of tail samples
-            x2si = np.argsort(x2)
-            # fit generalized Pareto distribution to the right tail samples
-            np.exp(x2, out=x2)
-            x2 -= expxcutoff
-            k, sigma = gpdfitnew(x2, sort=x2si)
-        if k >= k_min and not np.isinf(k):
-            # no smoothing if short tail or GPD fit failed
-            # compute ordered statistic for the fit
-            sti = np.arange(0.5, n2)
-            sti /= n2
-            qq = gpinv(sti, k, sigma)
-            qq += expxcutoff
-            np.log(qq, out=qq)
-            # place the smoothed tail into the output array
-            x[tailinds[x2si]] = qq
-            # truncate smoothed values to the largest raw weight 0
-            x[x > 0] = 0
-        # renormalize weights
-        x -= sumlogs(x)
-        # store tail index k
-        kss[i] = k
+    x = lw_out if lw_out.ndim == 2 else lw_out[:, None]
+    if n_processes is not None and n_processes > 1 and m > 1:
+        # smooth groups of sets of log weights in a pool of workers
+        n_processes = min(n_processes, m)
+        pool = Pool(n_processes)
+        try:
+            col_groups = np.array_split(np.arange(m), n_processes)
+            results = pool.map(_psislw_columns_worker,
+                               [(x[:, cols], cutoff_ind, cutoffmin, k_min)
+                                for cols in col_groups])
+        finally:
+            pool.close()
+            pool.join()
+        for cols, (x_cols, k_cols) in zip(col_groups, results):
+            x[:, cols] = x_cols
+            kss[cols] = k_cols
+    else:
+        kss[:] = _psislw_columns(x, cutoff_ind, cutoffmin, k_min)
 
     # If the provided input array is one dimensional, return kss as scalar.
     if lw_out.ndim == 1:
@@ -210,6 +211,234 @@ def psislw(lw, Reff=1.0, overwrite_lw=False):
     return lw_out, kss
 
 
+def psis_tail_length(n, Reff=1.0):
+    """Number of the largest log weights, out of `n`, that determine the
+    Pareto smoothing of :meth:`psislw()`, i.e., the right tail and its cutoff.
+
+    """
+    return int(np.ceil(min(0.2 * n, 3 * np.sqrt(n / Reff)))) + 1
+
+
+def psisloo_from_tails(lw_top, lw_body_sumlogs, log_lik_top, n, Reff=1.0):
+    """PSIS leave-one-out log predictive densities from summary statistics.
+
+    Computes the same output as :meth:`psisloo()` for a log likelihood array
+    of size n x m, which does not need to be held in memory, e.g., when the
+    posterior samples are streamed from disk.
+
+    Parameters
+    ----------
+    lw_top : ndarray
+        Array of size t x m with the t largest raw log weights, i.e., of
+        ``-log_lik``, of each observation, with
+        ``t >= psis_tail_length(n, Reff)``.
+
+    lw_body_sumlogs : ndarray
+        ``sumlogs()`` of the remaining n - t raw log weights of each
+        observation, ``-inf`` if ``t == n``.
+
+    log_lik_top : ndarray
+        Array of size t x m with the t largest log likelihood values of each
+        observation.
+
+    n : int
+        Number of posterior samples.
+
+    Reff : scalar, optional
+        relative MCMC efficiency ``N_eff / N``
+
+    Returns
+    -------
+    loo : scalar
+        sum of the leave-one-out log predictive densities
+
+    loos : ndarray
+        individual leave-one-out log predictive density terms
+
+    ks : ndarray
+        estimated Pareto tail indeces
+
+    """
+    n_top = psis_tail_length(n, Reff)
+    if lw_top.shape[0] < n_top or log_lik_top.shape[0] < n_top:
+        raise ValueError("At least {} largest values needed.".format(n_top))
+    x, x_raw, lwmax, _ = _psis_smooth_top(lw_top, n_top)
+    # log of the normalisation of the smoothed weights, shifted by lwmax
+    log_norm = np.logaddexp(lw_body_sumlogs - lwmax, sumlogs(x, axis=0))
+    # log_lik + lw is equal to -lwmax for all samples but the smoothed ones
+    loos = np.logaddexp(np.log(n - x.shape[0]), sumlogs(x - x_raw, axis=0))
+    loos -= lwmax
+    loos -= log_norm
+    # Pareto tail indices of the log weights' left tail, as in psisloo()
+    _, _, _, ks = _psis_smooth_top(log_lik_top, n_top)
+    return dict(loo=loos.sum(), loos=loos, ks=ks)
+
+
+def _psis_smooth_top(lw_top, n_top):
+    """Pareto smoothing of the largest log weights of each column.
+
+    The tail and its cutoff are the `n_top` largest values of each column of
+    `lw_top`. Returns the smoothed and the raw sorted log weights, both
+    shifted by their maximum, the maximum, and the Pareto tail indices.
+
+    """
+    cutoffmin = np.log(np.finfo(float).tiny)
+    k_min = 1/3
+
+    x_raw = np.sort(lw_top, axis=0)
+    lwmax = x_raw[-1].copy()
+    x_raw -= lwmax
+    x = x_raw.copy()
+    xcutoff = np.maximum(x[-n_top], cutoffmin)
+    # the tails are the last n2 rows of the sorted columns
+    n_tail = np.sum(x > xcutoff, axis=0)
+    kss = np.empty(x.shape[1])
+    kss.fill(np.inf)
+    # fit together the tails of equal length
+    for n2 in np.unique(n_tail):
+        if n2 <= 4:
+            # not enough tail samples for gpdfitnew
+            continue
+        cols, = np.where(n_tail == n2)
+        expxcutoff = np.exp(xcutoff[cols])
+        x2 = np.exp(x[-n2:, cols])
+        x2 -= expxcutoff
+        k, sigma = gpdfitnew_columns(x2)
+        kss[cols] = k
+        # no smoothing if short tail or GPD fit failed
+        smooth = np.logical_and(k >= k_min, np.isfinite(k))
+        if not np.any(smooth):
+            continue
+        sti = np.arange(0.5, n2)
+        sti /= n2
+        qq = gpinv_columns(sti, k[smooth], sigma[smooth])
+        qq += expxcutoff[smooth]
+        np.log(qq, out=qq)
+        # truncate smoothed values to the largest raw weight 0
+        qq[qq > 0] = 0
+        x[-n2:, cols[smooth]] = qq
+    return x, x_raw, lwmax, kss
+
+
+def _psislw_column(x, cutoff_ind, cutoffmin, k_min):
+    """Pareto smoothing of one set of log weights `x` in-place.
+
+    Returns the Pareto tail index.
+
+    """
+    # improve numerical accuracy
+    x -= np.max(x)
+    # sort the array
+    x_sort_ind = np.argsort(x)
+    # divide log weights into body and right tail
+    xcutoff = max(
+        x[x_sort_ind[cutoff_ind]],
+        cutoffmin
+    )
+    expxcutoff = np.exp(xcutoff)
+    tailinds, = np.where(x > xcutoff)
+    x2 = x[tailinds]
+    n2 = len(x2)
+    if n2 <= 4:
+        # not enough tail samples for gpdfitnew
+        k = np.inf
+    else:
+        # order of tail samples
+        x2si = np.argsort(x2)
+        # fit generalized Pareto distribution to the right tail samples
+        np.exp(x2, out=x2)
+        x2 -= expxcutoff
+        k, sigma = gpdfitnew(x2, sort=x2si)
+    if k >= k_min and not np.isinf(k):
+        # no smoothing if short tail or GPD fit failed
+        # compute ordered statistic for the fit
+        sti = np.arange(0.5, n2)
+        sti /= n2
+        qq = gpinv(sti, k, sigma)
+        qq += expxcutoff
+        np.log(qq, out=qq)
+        # place the smoothed tail into the output array
+        x[tailinds[x2si]] = qq
+        # truncate smoothed values to the largest raw weight 0
+        x[x > 0] = 0
+    # renormalize weights
+    x -= sumlogs(x)
+    return k
+
+
+def _psislw_columns(x, cutoff_ind, cutoffmin, k_min):
+    """Pareto smoothing of all columns of the n x m array `x` in-place.
+
+    The columns whose right tail consists of exactly ``- cutoff_ind - 1``
+    samples, i.e., all but those with ties at the cutoff or a cutoff raised to
+    `cutoffmin`, are smoothed at once. The rest are smoothed one by one.
+
+    Returns the Pareto tail indices.
+
+    """
+    m = x.shape[1]
+    n2 = - cutoff_ind - 1
+    # improve numerical accuracy
+    x -= np.max(x, axis=0)
+    # sort the columns
+    x_sort_ind = np.argsort(x, axis=0)
+    # divide log weights into body and right tail
+    xcutoff = np.maximum(x[x_sort_ind[cutoff_ind], np.arange(m)], cutoffmin)
+    tailinds = x_sort_ind[cutoff_ind + 1:]
+    regular = x[tailinds[0], np.arange(m)] > xcutoff
+    if n2 <= 4:
+        # not enough tail samples for gpdfitnew
+        regular[:] = False
+    kss = np.empty(m)
+    for i in np.where(~regular)[0]:
+        kss[i] = _psislw_column(x[:, i], cutoff_ind, cutoffmin, k_min)
+    if not np.any(regular):
+        return kss
+    regular, = np.where(regular)
+    if len(regular) == m:
+        x_regular = x
+    else:
+        x_regular = x[:, regular]
+        tailinds = tailinds[:, regular]
+        xcutoff = xcutoff[regular]
+    cols = np.arange(len(regular))
+    expxcutoff = np.exp(xcutoff)
+    # tail samples, sorted in ascending order
+    x2 = x_regular[tailinds, cols]
+    # fit generalized Pareto distribution to the right tail samples
+    np.exp(x2, out=x2)
+    x2 -= expxcutoff
+    k, sigma = gpdfitnew_columns(x2)
+    kss[regular] = k
+    # no smoothing if short tail or GPD fit failed
+    smooth, = np.where((k >= k_min) & ~np.isinf(k))
+    if len(smooth) > 0:
+        # compute ordered statistic for the fit
+        sti = np.arange(0.5, n2)
+        sti /= n2
+        qq = gpinv_columns(sti, k[smooth], sigma[smooth])
+        qq += expxcutoff[smooth]
+        np.log(qq, out=qq)
+        # place the smoothed tail into the output array
+        x_smooth = x_regular[:, smooth]
+        x_smooth[tailinds[:, smooth], np.arange(len(smooth))] = qq
+        # truncate smoothed values to the largest raw weight 0
+        x_smooth[x_smooth > 0] = 0
+        x_regular[:, smooth] = x_smooth
+    # renormalize weights
+    x_regular -= sumlogs(x_regular, axis=0)
+    if x_regular is not x:
+        x[:, regular] = x_regular
+    return kss
+
+
+def _psislw_columns_worker(args):
+    x, cutoff_ind, cutoffmin, k_min = args
+    x = np.copy(x, order='F')
+    kss = _psislw_columns(x, cutoff_ind, cutoffmin, k_min)
+    return x, kss
+
+
 def gpdfitnew(x, sort=True, sort_in_place=False, return_quadrature=False):
     """Estimate the paramaters for the Generalized Pareto Distribution (GPD)
 
@@ -333,6 +562,85 @@ def gpdfitnew(x, sort=True, sort_in_place=False, return_quadrature=False):
         return k, sigma
 
 
+def gpdfitnew_columns(x):
+    """Estimate the paramaters for the GPD of each column of `x` at once.
+
+    Vectorized counterpart of :meth:`gpdfitnew()`. The columns are processed
+    in batches, so that the temporary arrays have at most
+    ``GPDFIT_BATCH_SIZE`` elements.
+
+    Parameters
+    ----------
+    x : ndarray
+        Array of size n x m, each column of which is sorted in ascending order
+
+    Returns
+    -------
+    k, sigma : ndarray
+        estimated parameter values for each column
+
+    """
+    if x.ndim != 2 or x.shape[0] <= 1:
+        raise ValueError("Invalid input array.")
+
+    n, m = x.shape
+    PRIOR = 3
+    m_quad = 30 + int(np.sqrt(n))
+
+    bs_quad = np.arange(1, m_quad + 1, dtype=float)
+    bs_quad -= 0.5
+    np.divide(m_quad, bs_quad, out=bs_quad)
+    np.sqrt(bs_quad, out=bs_quad)
+    np.subtract(1, bs_quad, out=bs_quad)
+
+    k = np.empty(m)
+    sigma = np.empty(m)
+    batch_size = max(1, GPDFIT_BATCH_SIZE // (m_quad * n))
+    for start in range(0, m, batch_size):
+        batch = slice(start, start + batch_size)
+        xb = x[:, batch]
+
+        # quadrature points x columns
+        bs = bs_quad[:, None] / (PRIOR * xb[int(n/4 + 0.5) - 1])
+        bs += 1 / xb[-1]
+
+        temp = np.negative(bs)[:, None, :] * xb
+        np.log1p(temp, out=temp)
+        ks = np.mean(temp, axis=1)
+
+        L = bs / ks
+        np.negative(L, out=L)
+        np.log(L, out=L)
+        L -= ks
+        L -= 1
+        L *= n
+
+        temp = L[None, :, :] - L[:, None, :]
+        np.exp(temp, out=temp)
+        w = np.sum(temp, axis=1)
+        np.divide(1, w, out=w)
+
+        # remove negligible weights
+        w[w < 10 * np.finfo(float).eps] = 0
+        # normalise w
+        w /= w.sum(axis=0)
+
+        # posterior mean for b
+        b = np.sum(bs * w, axis=0)
+        # Estimate for k, note that we return a negative of Zhang and
+        # Stephens's k, because it is more common parameterisation.
+        temp = (-b) * xb
+        np.log1p(temp, out=temp)
+        kb = np.mean(temp, axis=0)
+        # estimate for sigma
+        sigma[batch] = -kb / b * n / (n - 0)
+        # weakly informative prior for k
+        a = 10
+        k[batch] = kb * n / (n+a) + a * 0.5 / (n+a)
+
+    return k, sigma
+
+
 def gpinv(p, k, sigma):
     """Inverse Generalised Pareto distribution function."""
     x = np.empty(p.shape)
@@ -378,6 +686,25 @@ def gpinv(p, k, sigma):
     return x
 
 
+def gpinv_columns(p, k, sigma):
+    """Inverse Generalised Pareto distribution function for each (k, sigma).
+
+    Vectorized counterpart of :meth:`gpinv()` for probabilities
+    ``0 < p < 1``, returning an array of size len(p) x len(k).
+
+    """
+    log1mp = np.log1p(np.negative(p))[:, None]
+    k_zero = np.abs(k) < np.finfo(float).eps
+    k_nonzero = np.where(k_zero, 1.0, k)
+    x = log1mp * (-k_nonzero)
+    np.expm1(x, out=x)
+    x /= k_nonzero
+    x[:, k_zero] = np.negative(log1mp)
+    x *= sigma
+    x[:, sigma <= 0] = np.nan
+    return x
+
+
 def sumlogs(x, axis=None, out=None):
     """Sum of vector where numbers are represented by their logarithms.
 
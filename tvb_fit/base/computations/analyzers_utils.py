@@ -1,6 +1,7 @@
+from multiprocessing import Pool
 import numpy as np
 from scipy.signal import butter, filtfilt, welch, periodogram, spectrogram
-from scipy.interpolate import interp1d, griddata
+from scipy.interpolate import interp1d
 
 # x is assumed to be data (real numbers) arranged along the first dimension of an ndarray
 # this factory makes use of the numpy array properties
@@ -17,25 +18,55 @@ def interval_scaling(x, min_targ=0.0, max_targ=1.0, min_orig=None, max_orig=None
     return min_targ + (x - min_orig) * scale_factor
 
 
-def abs_envelope(x):
+def abs_envelope(x, in_place=False):
     x_mean = x.mean(axis=0) * np.ones(x.shape[1:])
-    # Mean center each signal
-    x -= x_mean
+    # Mean center each signal, overwriting x only if in_place is True
+    if in_place:
+        x -= x_mean
+    else:
+        x = x - x_mean
     # Compute the absolute value and add back the mean
-    return np.abs(x) + x_mean
+    np.abs(x, out=x)
+    x += x_mean
+    return x
+
+
+def _spectrogram_worker(args):
+    x, fs, kwargs = args
+    return spectrogram(x, fs, axis=0, **kwargs)
 
 
-def spectrogram_envelope(x, fs, lpf=None, hpf=None, nperseg=None):
-    envelope = []
-    for xx in x.T:
-        F, T, C = spectrogram(xx, fs, nperseg=nperseg)
-        fmask = np.ones(F.shape, 'bool')
-        if hpf:
-            fmask *= F > hpf
-        if lpf:
-            fmask *= F < lpf
-        envelope.append(C[fmask].sum(axis=0))
-    return np.array(envelope).T, T
+def batch_spectrogram(x, fs, n_processes=None, **kwargs):
+    """
+    Compute the spectrograms of all signals of x, arranged along its second dimension, in a single call.
+    :param x: data array of shape (time points, signals)
+    :param fs: sampling frequency
+    :param n_processes: if > 1, the signals are split into as many groups, which are processed by a pool of workers
+    :param kwargs: keyword arguments passed to scipy.signal.spectrogram
+    :return: frequencies, segment times, and spectrograms of shape (frequencies, signals, segment times)
+    """
+    if n_processes is None or n_processes < 2 or x.shape[1] < 2:
+        return spectrogram(x, fs, axis=0, **kwargs)
+    pool = Pool(min(n_processes, x.shape[1]))
+    try:
+        results = pool.map(_spectrogram_worker,
+                           [(xx, fs, kwargs) for xx in np.array_split(x, min(n_processes, x.shape[1]), axis=1)])
+    finally:
+        pool.close()
+        pool.join()
+    return results[0][0], results[0][1], np.concatenate([result[2] for result in results], axis=1)
+
+
+def spectrogram_envelope(x, fs, lpf=None, hpf=None, nperseg=None, n_processes=None):
+    if x.ndim == 1:
+        x = x[:, np.newaxis]
+    F, T, C = batch_spectrogram(x, fs, n_processes, nperseg=nperseg)
+    fmask = np.ones(F.shape, 'bool')
+    if hpf:
+        fmask *= F > hpf
+    if lpf:
+        fmask *= F < lpf
+    return C[fmask].sum(axis=0).T, T
 
 
 # Across points analyzers:
@@ -75,35 +106,30 @@ def spectral_analysis(x, fs, freq=None, method="periodogram", output="spectrum",
     if freq is None:
         freq = np.linspace(f_low, nperseg, nperseg - f_low - 1)
         df = freq[1] - freq[0]
-    psd = []
-    for iS in range(x.shape[1]):
-        if method is welch:
-            f, temp_psd = welch(x[:, iS],
-                           fs=fs,  # sample rate
-                           nfft=nfft,
-                           window=window,   # apply a Hanning window before taking the DFT
-                           nperseg=nperseg,        # compute periodograms of 256-long segments of x
-                           detrend=detrend,
-                           scaling="spectrum",
-                           noverlap=noverlap,
-                           return_onesided=True,
-                           axis=0)
-        else:
-            f, temp_psd = periodogram(x[:, iS],
-                                 fs=fs,  # sample rate
-                                 nfft=nfft,
-                                 window=window,  # apply a Hanning window before taking the DFT
-                                 detrend=detrend,
-                                 scaling="spectrum",
-                                 return_onesided=True,
-                                 axis=0)
-        f = interp1d(f, temp_psd)
-        temp_psd = f(freq)
-        if output == "density":
-            temp_psd /= (np.sum(temp_psd) * df)
-        psd.append(temp_psd)
-    # Stack them to a ndarray
-    psd = np.stack(psd, axis=1)
+    # All signals, arranged along the second dimension, are processed at once:
+    if method is welch:
+        f, psd = welch(x,
+                       fs=fs,  # sample rate
+                       nfft=nfft,
+                       window=window,   # apply a Hanning window before taking the DFT
+                       nperseg=nperseg,        # compute periodograms of 256-long segments of x
+                       detrend=detrend,
+                       scaling="spectrum",
+                       noverlap=noverlap,
+                       return_onesided=True,
+                       axis=0)
+    else:
+        f, psd = periodogram(x,
+                             fs=fs,  # sample rate
+                             nfft=nfft,
+                             window=window,  # apply a Hanning window before taking the DFT
+                             detrend=detrend,
+                             scaling="spectrum",
+                             return_onesided=True,
+                             axis=0)
+    psd = interp1d(f, psd, axis=0)(freq)
+    if output == "density":
+        psd /= (np.sum(psd, axis=0) * df)
     if output == "energy":
         return np.sum(psd, axis=0)
     else:
@@ -113,20 +139,15 @@ def spectral_analysis(x, fs, freq=None, method="periodogram", output="spectrum",
 
 
 def time_spectral_analysis(x, fs, freq=None, mode="psd", nfft=None, window='hanning', nperseg=256, detrend='constant',
-                           noverlap=None, f_low=10.0, calculate_psd=True, log_scale=False):
+                           noverlap=None, f_low=10.0, calculate_psd=True, log_scale=False, n_processes=None):
     # TODO: add a Continuous Wavelet Transform implementation
     if freq is None:
         freq = np.linspace(f_low, nperseg, nperseg - f_low - 1)
-    stf = []
-    for iS in range(x.shape[1]):
-        f, t, temp_s = spectrogram(x[:, iS], fs=fs, nperseg=nperseg, nfft=nfft, window=window, mode=mode,
-                                noverlap=noverlap, detrend=detrend, return_onesided=True, scaling='spectrum', axis=0)
-        t_mesh, f_mesh = np.meshgrid(t, f, indexing="ij")
-        temp_s = griddata((t_mesh.flatten(), f_mesh.flatten()), temp_s.T.flatten(),
-                          tuple(np.meshgrid(t, freq, indexing="ij")), method='linear')
-        stf.append(temp_s)
-    # Stack them to a ndarray
-    stf = np.stack(stf, axis=2)
+    f, t, s = batch_spectrogram(x, fs, n_processes, nperseg=nperseg, nfft=nfft, window=window, mode=mode,
+                                noverlap=noverlap, detrend=detrend, return_onesided=True, scaling='spectrum')
+    # The spectrograms lie on a regular (frequency, time) grid, and only their frequency points change,
+    # so that linear interpolation along the frequency axis yields the output (time, freq, signals) grid:
+    stf = interp1d(f, s, axis=0, bounds_error=False, fill_value=np.nan)(freq).transpose((2, 0, 1))
     if log_scale:
         stf = np.log(stf)
     if calculate_psd:
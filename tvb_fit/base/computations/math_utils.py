@@ -1,5 +1,4 @@
 # Some math tools
-from itertools import product
 from sklearn.cluster import AgglomerativeClustering
 
 import numpy as np
@@ -47,13 +46,13 @@ def compute_in_degree(weights):
 
 
 def compute_gain_matrix(locations1, locations2, normalize=100.0, ceil=False):
-    n1 = locations1.shape[0]
-    n2 = locations2.shape[0]
-    projection = np.zeros((n1, n2))
-    dist = np.zeros((n1, n2))
-    for i1, i2 in product(range(n1), range(n2)):
-        dist[i1, i2] = np.abs(np.sum((locations1[i1, :] - locations2[i2, :]) ** 2))
-        projection[i1, i2] = 1 / dist[i1, i2]
+    locations1 = np.array(locations1, dtype="float64")
+    locations2 = np.array(locations2, dtype="float64")
+    # Squared euclidean distances of all pairs of locations, accumulated per coordinate in a (n1, n2) array
+    dist = np.zeros((locations1.shape[0], locations2.shape[0]))
+    for i_dim in range(locations1.shape[1]):
+        dist += (locations1[:, i_dim][:, np.newaxis] - locations2[:, i_dim][np.newaxis, :]) ** 2
+    projection = 1.0 / dist
     if normalize:
         projection /= np.percentile(projection, normalize)
     if ceil:
@@ -86,8 +86,8 @@ class ProbabilisticParameterBase(Parameter, ProbabilityDistribution):
             raise_not_implemented_error("Scipy method " + method +
                                         " is not implemented for parameter " + self.name + "!")
 
-    def numpy(self, size=()):
-        return self._numpy(self.loc, self.scale, size)
+    def numpy(self, size=(), random_state=np.random):
+        return self._numpy(self.loc, self.scale, size, random_state)
 
     def _update_params(self, use="scipy", **params):
         self.loc = make_float(params.pop("loc", self.loc))
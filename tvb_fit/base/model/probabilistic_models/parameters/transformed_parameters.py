@@ -1,6 +1,8 @@
 from abc import ABCMeta, abstractmethod
 from collections import OrderedDict
 
+import numpy as np
+
 from tvb_fit.base.model.probabilistic_models.parameters.base import get_x_arg_for_param_distrib
 from tvb_fit.base.utils.data_structures_utils import formal_repr
 from tvb_fit.base.utils.log_error_utils import raise_not_implemented_error
@@ -91,8 +93,8 @@ class TransformedProbabilisticParameterBase(object):
     def kurt(self):
         return self.star.kurt
 
-    def numpy(self, size=()):
-        return self.star.numpy(size)
+    def numpy(self, size=(), random_state=np.random):
+        return self.star.numpy(size, random_state)
 
     def scipy_method(self, method, loc=0.0, scale=1.0, *args, **kwargs):
         return self.star.scipy_method(method, loc, scale, *args, **kwargs)
@@ -159,5 +161,6 @@ class NegativeLognormal(TransformedProbabilisticParameterBase, object):
             raise_not_implemented_error("Scipy method " + method +
                                         " is not implemented for transformed parameter " + self.name + "!")
 
-    def numpy(self, size=()):
-        return self.max - self._numpy(self.loc, self.scale, size)
\ No newline at end of file
+    def numpy(self, size=(), random_state=np.random):
+        star_numpy = self.star.numpy(size, random_state)
+        return lambda: self.max - star_numpy()
\ No newline at end of file
@@ -35,7 +35,7 @@ class BernoulliDistribution(DiscreteProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return ss.bernoulli(p=self.p, loc=loc)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=np.random):
         raise_not_implemented_error("No implementation of bernoulli distribution in numpy.random module!")
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
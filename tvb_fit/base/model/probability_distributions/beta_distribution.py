@@ -50,8 +50,8 @@ class BetaDistribution(ContinuousProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return ss.beta(a=self.alpha, b=self.beta, loc=loc, scale=scale)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
-        return lambda: nr.beta(a=self.alpha, b=self.beta, size=size) * scale + loc
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
+        return lambda: random_state.beta(a=self.alpha, b=self.beta, size=size) * scale + loc
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         return self.alpha / (self.alpha + self.beta) + loc
@@ -39,8 +39,8 @@ class BinomialDistribution(DiscreteProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return ss.binom(n=self.n, p=self.p, loc=loc)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
-        return lambda: nr.binomial(n=self.n, p=self.p, size=size) + loc
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
+        return lambda: random_state.binomial(n=self.n, p=self.p, size=size) + loc
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         return self.n * self.p + loc
@@ -40,8 +40,8 @@ class ChisquareDistribution(ContinuousProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return ss.chi(df=self.df, loc=loc, scale=scale)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
-        return lambda: nr.chisquare(df=self.df, size=size) * scale + loc
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
+        return lambda: random_state.chisquare(df=self.df, size=size) * scale + loc
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         return self.df + make_int(np.around(loc))
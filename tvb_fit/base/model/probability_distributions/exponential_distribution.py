@@ -48,8 +48,8 @@ class ExponentialDistribution(ContinuousProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return ss.expon(loc=loc, scale=scale / self.lamda)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
-        return lambda: nr.exponential(scale=scale / self.lamda, size=size) + loc
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
+        return lambda: random_state.exponential(scale=scale / self.lamda, size=size) + loc
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         return scale / self.lamda + loc
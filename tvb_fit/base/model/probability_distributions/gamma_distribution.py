@@ -70,8 +70,8 @@ class GammaDistribution(ContinuousProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return getattr(ss, self.scipy_name)(a=self.alpha, loc=loc, scale=self.theta * scale)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
-        return lambda: nr.gamma(shape=self.alpha, scale=self.theta * scale, size=size) + loc
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
+        return lambda: random_state.gamma(shape=self.alpha, scale=self.theta * scale, size=size) + loc
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         return self.alpha * self.theta * scale + loc
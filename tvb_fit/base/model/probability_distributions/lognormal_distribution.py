@@ -47,9 +47,9 @@ class LognormalDistribution(ContinuousProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return getattr(ss, self.scipy_name)(s=self.sigma, loc=loc, scale=np.exp(self.mu) * scale)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
         mu = self.scale_params(loc, scale)[0]
-        return lambda: nr.lognormal(mean=self.mu, sigma=self.sigma, size=size) + loc
+        return lambda: random_state.lognormal(mean=self.mu, sigma=self.sigma, size=size) + loc
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         mu = self.scale_params(loc, scale)[0]
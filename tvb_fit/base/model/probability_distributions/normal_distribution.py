@@ -43,8 +43,8 @@ class NormalDistribution(ContinuousProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return getattr(ss, self.scipy_name)(loc=self.mu+loc, scale=self.sigma*scale)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
-        return lambda: nr.normal(self.mu + loc, self.sigma * scale, size=size)
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
+        return lambda: random_state.normal(self.mu + loc, self.sigma * scale, size=size)
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         return self.mu + loc
@@ -42,8 +42,8 @@ class PoissonDistribution(DiscreteProbabilityDistribution):
     def _scipy(self, loc=0.0, scale=1.0):
         return getattr(ss, self.scipy_name)(self.lamda, loc=loc, scale=scale)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
-        return lambda: nr.poisson(self.lamda, size=size) + loc
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
+        return lambda: random_state.poisson(self.lamda, size=size) + loc
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         return self.lamda + loc
@@ -171,7 +171,7 @@ class ProbabilityDistribution(object):
         return getattr(self._scipy(loc, scale), method)(*args, **kwargs)
 
     @abstractmethod
-    def _numpy(self, loc=0.0, scale=1.0, size=()):
+    def _numpy(self, loc=0.0, scale=1.0, size=(), random_state=np.random):
         pass
 
     @abstractmethod
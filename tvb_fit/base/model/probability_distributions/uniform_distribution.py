@@ -57,9 +57,9 @@ class UniformDistribution(ContinuousProbabilityDistribution):
         a, b = self.scale_params(loc, scale)
         return getattr(ss, self.scipy_name)(loc=a, scale=b - a)
 
-    def _numpy(self, loc=0.0, scale=1.0, size=(1,)):
+    def _numpy(self, loc=0.0, scale=1.0, size=(1,), random_state=nr):
         a, b = self.scale_params(loc, scale)
-        return lambda: nr.uniform(a, b, size=size)
+        return lambda: random_state.uniform(a, b, size=size)
 
     def calc_mean_manual(self, loc=0.0, scale=1.0):
         a, b = self.scale_params(loc, scale)
@@ -27,12 +27,16 @@ class Timeseries(object):
 
     # dimension_labels = {"space": numpy.array([]), "variables": numpy.array([])}
 
+    # {dimension: (labels, {label: index})} dictionaries, built on demand by _get_labels_index
+    _labels_index = None
+
     def __init__(self, data, dimension_labels, time_start, time_step, time_unit="ms"):
         self.data = self.prepare_4D(data)
         self.dimension_labels = dimension_labels
         self.time_start = time_start
         self.time_step = time_step
         self.time_unit = time_unit
+        self._labels_index = {}
 
     def prepare_4D(self, data):
         if data.ndim < 2:
@@ -111,17 +115,41 @@ class Timeseries(object):
     def _get_string_slice_index(self, current_slice_string, slice_idx):
         return self._get_index_for_slice_label(current_slice_string, slice_idx)
 
+    def _get_labels_index(self, dimension):
+        # Return a {label: index} dictionary of the labels of this dimension, which is built only once,
+        # unless the labels of the dimension are replaced. The first index is kept for repeated labels.
+        labels = self.dimension_labels[dimension]
+        if self._labels_index is None:
+            self._labels_index = {}
+        cached_labels, labels_index = self._labels_index.get(dimension, (None, None))
+        if cached_labels is not labels:
+            labels_index = {}
+            for index, label in enumerate(labels):
+                labels_index.setdefault(label, index)
+            self._labels_index[dimension] = (labels, labels_index)
+        return labels_index
+
+    def _carry_labels_index(self, timeseries):
+        # Pass the labels' indices on to a timeseries derived from this one, for the dimensions of unchanged labels
+        if self._labels_index:
+            for dimension, (labels, labels_index) in self._labels_index.items():
+                new_labels = timeseries.dimension_labels.get(dimension, None)
+                if new_labels is labels or \
+                        (new_labels is not None and numpy.array_equal(new_labels, labels)):
+                    timeseries._labels_index[dimension] = (new_labels, labels_index)
+        return timeseries
+
     def _get_index_of_state_variable(self, sv_label):
         try:
-            sv_index = numpy.where(self.dimension_labels[TimeseriesDimensions.VARIABLES.value] == sv_label)[0][0]
+            sv_index = self._get_labels_index(TimeseriesDimensions.VARIABLES.value)[sv_label]
         except KeyError:
-            self.logger.error("There are no state variables defined for this instance. Its shape is: %s",
-                              self.data.shape)
-            raise
-        except IndexError:
+            if TimeseriesDimensions.VARIABLES.value not in self.dimension_labels.keys():
+                self.logger.error("There are no state variables defined for this instance. Its shape is: %s",
+                                  self.data.shape)
+                raise
             self.logger.error("Cannot access index of state variable label: %s. Existing state variables: %s" % (
                 sv_label, self.dimension_labels[TimeseriesDimensions.VARIABLES.value]))
-            raise
+            raise IndexError
         return sv_index
 
     def _check_space_indices(self, list_of_index):
@@ -131,17 +159,28 @@ class Timeseries(object):
                 raise IndexError
 
     def _get_indices_for_labels(self, list_of_labels):
+        space_labels_index = self._get_labels_index(TimeseriesDimensions.SPACE.value)
         list_of_indices_for_labels = []
         for label in list_of_labels:
             try:
-                space_index = numpy.where(self.dimension_labels[TimeseriesDimensions.SPACE.value] == label)[0][0]
-            except ValueError:
+                space_index = space_labels_index[label]
+            except KeyError:
                 self.logger.error("Cannot access index of space label: %s. Existing space labels: %s" % (
                     label, self.dimension_labels[TimeseriesDimensions.SPACE.value]))
-                raise
+                raise IndexError
             list_of_indices_for_labels.append(space_index)
         return list_of_indices_for_labels
 
+    def _get_data_for_indices(self, list_of_index, axis=1):
+        if isinstance(self.data, numpy.ndarray):
+            return numpy.take(self.data, list_of_index, axis)
+        # Lazy data (e.g., an h5py dataset) can be indexed only by increasing unique indices,
+        # so we read these ones from disk and then reorder/repeat them in memory
+        unique_indices, inverse_indices = numpy.unique(list_of_index, return_inverse=True)
+        slice_tuple = [slice(None)] * self.data.ndim
+        slice_tuple[axis] = unique_indices.tolist()
+        return numpy.take(self.data[tuple(slice_tuple)], inverse_indices, axis)
+
     def _get_time_unit_for_index(self, time_index):
         return self.time_start + time_index * self.time_step
 
@@ -152,12 +191,12 @@ class Timeseries(object):
         state_variables_keys = []
         if TimeseriesDimensions.VARIABLES.value in self.dimension_labels.keys():
             state_variables_keys = self.dimension_labels[TimeseriesDimensions.VARIABLES.value]
-            if attr_name in self.dimension_labels[TimeseriesDimensions.VARIABLES.value]:
+            if attr_name in self._get_labels_index(TimeseriesDimensions.VARIABLES.value):
                 return self.get_state_variable(attr_name)
         space_keys = []
         if (TimeseriesDimensions.SPACE.value in self.dimension_labels.keys()):
             space_keys = self.dimension_labels[TimeseriesDimensions.SPACE.value]
-            if attr_name in self.dimension_labels[TimeseriesDimensions.SPACE.value]:
+            if attr_name in self._get_labels_index(TimeseriesDimensions.SPACE.value):
                 return self.get_subspace_by_labels([attr_name])
         # Hack to avoid stupid error messages when searching for __ attributes in numpy.array() call...
         # TODO: something better? Maybe not needed if we never do something like numpy.array(timeseries)
@@ -187,27 +226,29 @@ class Timeseries(object):
         subspace_dimension_labels[TimeseriesDimensions.VARIABLES.value] = numpy.array([sv_label])
         if sv_data.ndim == 3:
             sv_data = numpy.expand_dims(sv_data, 2)
-        return self.__class__(sv_data, subspace_dimension_labels,
-                              self.time_start, self.time_step, self.time_unit)
+        return self._carry_labels_index(self.__class__(sv_data, subspace_dimension_labels,
+                                                       self.time_start, self.time_step, self.time_unit))
 
     def get_subspace_by_labels(self, list_of_labels):
         list_of_indices_for_labels = self._get_indices_for_labels(list_of_labels)
-        subspace_data = self.data[:, list_of_indices_for_labels, :, :]
+        subspace_data = self._get_data_for_indices(list_of_indices_for_labels)
         subspace_dimension_labels = deepcopy(self.dimension_labels)
         subspace_dimension_labels[TimeseriesDimensions.SPACE.value] = numpy.array(list_of_labels)
         if subspace_data.ndim == 3:
             subspace_data = numpy.expand_dims(subspace_data, 1)
-        return self.__class__(subspace_data, subspace_dimension_labels, self.time_start, self.time_step, self.time_unit)
+        return self._carry_labels_index(self.__class__(subspace_data, subspace_dimension_labels,
+                                                       self.time_start, self.time_step, self.time_unit))
 
     def get_subspace_by_index(self, list_of_index):
         self._check_space_indices(list_of_index)
-        subspace_data = self.data[:, list_of_index, :, :]
+        subspace_data = self._get_data_for_indices(list_of_index)
         subspace_dimension_labels = deepcopy(self.dimension_labels)
         subspace_dimension_labels[TimeseriesDimensions.SPACE.value] = \
             numpy.array(self.dimension_labels[TimeseriesDimensions.SPACE.value])[list_of_index]
         if subspace_data.ndim == 3:
             subspace_data = numpy.expand_dims(subspace_data, 1)
-        return self.__class__(subspace_data, subspace_dimension_labels, self.time_start, self.time_step, self.time_unit)
+        return self._carry_labels_index(self.__class__(subspace_data, subspace_dimension_labels,
+                                                       self.time_start, self.time_step, self.time_unit))
 
     def get_time_window(self, index_start, index_end):
         if index_start < 0 or index_end > self.data.shape[0]:
@@ -216,8 +257,9 @@ class Timeseries(object):
         subtime_data = self.data[index_start:index_end, :, :, :]
         if subtime_data.ndim == 3:
             subtime_data = numpy.expand_dims(subtime_data, 0)
-        return self.__class__(subtime_data, self.dimension_labels,
-                             self._get_time_unit_for_index(index_start), self.time_step, self.time_unit)
+        return self._carry_labels_index(self.__class__(subtime_data, self.dimension_labels,
+                                                       self._get_time_unit_for_index(index_start),
+                                                       self.time_step, self.time_unit))
 
     def get_time_window_by_units(self, unit_start, unit_end):
         end_time = self.time_end
@@ -236,13 +278,15 @@ class Timeseries(object):
         index_step = int(time_step / self.time_step)
         time_data = self.data[::index_step, :, :, :]
 
-        return self.__class__(time_data, self.dimension_labels, self.time_start, time_step, self.time_unit)
+        return self._carry_labels_index(self.__class__(time_data, self.dimension_labels,
+                                                       self.time_start, time_step, self.time_unit))
 
     def get_sample_window(self, index_start, index_end):
         subsample_data = self.data[:, :, :, index_start:index_end]
         if subsample_data.ndim == 3:
             subsample_data = numpy.expand_dims(subsample_data, 3)
-        return self.__class__(subsample_data, self.dimension_labels, self.time_start, self.time_step, self.time_unit)
+        return self._carry_labels_index(self.__class__(subsample_data, self.dimension_labels,
+                                                       self.time_start, self.time_step, self.time_unit))
 
     def get_sample_window_by_percentile(self, percentile_start, percentile_end):
         pass
@@ -256,8 +300,9 @@ class Timeseries(object):
 
     def get_bipolar(self):
         bipolar_labels, bipolar_inds = monopolar_to_bipolar(self.space_labels)
-        data = self.data[:, bipolar_inds[0]] - self.data[:, bipolar_inds[1]]
+        data = self._get_data_for_indices(bipolar_inds[0]) - self._get_data_for_indices(bipolar_inds[1])
         bipolar_dimension_labels = deepcopy(self.dimension_labels)
         bipolar_dimension_labels["space"] = numpy.array(bipolar_labels)
-        return self.__class__(data, bipolar_dimension_labels, self.time_start, self.time_step, self.time_unit)
+        return self._carry_labels_index(self.__class__(data, bipolar_dimension_labels,
+                                                       self.time_start, self.time_step, self.time_unit))
 
@@ -31,6 +31,11 @@ class Sensors(object):
     needles = np.array([])
     gain_matrix = np.array([])
 
+    # (labels, electrodes' labels, electrodes' sensors' indices) and (labels, {label: indices}) caches,
+    # computed by _get_electrodes and _get_labels_index respectively, for the current labels
+    _electrodes = None
+    _labels_index = None
+
     def __init__(self, labels, locations, needles=np.array([]), gain_matrix=np.array([]),
                  s_type=SensorTypes.TYPE_SEEG, name=SensorTypes.TYPE_SEEG.value):
         self.name = name
@@ -43,11 +48,11 @@ class Sensors(object):
         self.elec_labels = np.array([])
         self.elec_inds = np.array([])
         if len(self.labels) > 1:
-            self.elec_labels, self.elec_inds = self.group_sensors_to_electrodes()
+            self.elec_labels, self.elec_inds = self._get_electrodes()
             if self.needles.size == self.number_of_sensors:
                 self.channel_labels, self.channel_inds = self.get_inds_labels_from_needles()
             else:
-                self.channel_labels, self.channel_inds = self.group_sensors_to_electrodes()
+                self.channel_labels, self.channel_inds = self._get_electrodes()
                 self.get_needles_from_inds_labels()
 
     @property
@@ -56,7 +61,22 @@ class Sensors(object):
 
     @property
     def number_of_electrodes(self):
-        return self.group_sensors_to_electrodes()[0].size
+        return self._get_electrodes()[0].size
+
+    def _get_electrodes(self):
+        # Group sensors to electrodes only once, unless the labels are replaced
+        if self._electrodes is None or self._electrodes[0] is not self.labels:
+            self._electrodes = (self.labels,) + tuple(self.group_sensors_to_electrodes())
+        return self._electrodes[1:]
+
+    def _get_labels_index(self):
+        # Return a {label: sensors' indices} dictionary, built only once, unless the labels are replaced
+        if self._labels_index is None or self._labels_index[0] is not self.labels:
+            labels_index = {}
+            for index, label in enumerate(self.labels):
+                labels_index.setdefault(label, []).append(index)
+            self._labels_index = (self.labels, labels_index)
+        return self._labels_index[1]
 
     def __repr__(self):
         d = {"1. sensors' type": self.s_type,
@@ -70,9 +90,10 @@ class Sensors(object):
         return self.__repr__()
 
     def sensor_label_to_index(self, labels):
+        labels_index = self._get_labels_index()
         indexes = []
         for label in labels:
-            indexes.append(np.where([np.array(lbl) == np.array(label) for lbl in self.labels])[0][0])
+            indexes.append(labels_index.get(label, [])[0])
         if len(indexes) == 1:
             return indexes[0]
         else:
@@ -81,7 +102,11 @@ class Sensors(object):
     def get_sensors_inds_by_sensors_labels(self, lbls):
         # Make sure that the labels are not bipolar:
         lbls = [label.split("-")[0] for label in ensure_list(lbls)]
-        return labels_to_inds(self.labels, lbls)
+        labels_index = self._get_labels_index()
+        inds = []
+        for label in lbls:
+            inds += labels_index.get(label, [])
+        return np.unique(inds)
 
     def get_elecs_inds_by_elecs_labels(self, lbls):
         return labels_to_inds(self.elec_labels, lbls)
@@ -112,10 +137,10 @@ class Sensors(object):
         if labels is None:
             labels = self.labels
         sensor_names = np.array(split_string_text_numbers(labels))
-        elec_labels = np.unique(sensor_names[:, 0])
-        elec_inds = []
-        for chlbl in elec_labels:
-            elec_inds.append(np.where(sensor_names[:, 0] == chlbl)[0])
+        elec_labels, sensors_elecs = np.unique(sensor_names[:, 0], return_inverse=True)
+        # Split the sensors' indices, sorted by electrode, to one (sorted) array per electrode:
+        elec_inds = np.split(np.argsort(sensors_elecs, kind="mergesort"),
+                             np.cumsum(np.bincount(sensors_elecs))[:-1])
         return elec_labels, elec_inds
 
     def get_bipolar_sensors(self, sensors_inds=None):
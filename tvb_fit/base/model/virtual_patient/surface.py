@@ -61,17 +61,13 @@ class Surface(object):
 
         vf = self.vertices[self.triangles]
         fn = np.cross(vf[:, 1] - vf[:, 0], vf[:, 2] - vf[:, 0])
-        vf = [set() for _ in range(self.n_vertices)]
-        for i, fi in enumerate(self.triangles):
-            for j in fi:
-                vf[j].add(i)
-        vn = np.zeros_like(self.vertices)
-        for i, fi in enumerate(vf):
-            fni = fn[list(fi)]
-            norm = fni.sum(axis=0)
-            norm2 = norm / np.sqrt((norm ** 2).sum())
-            vn[i] = norm2
-        return vn
+        # Sum the (area weighted) normals of the triangles of each vertex by scatter-adding them to its 3 vertices
+        vertex_inds = self.triangles.ravel()
+        vn = np.zeros(self.vertices.shape)
+        for ii in range(vn.shape[1]):
+            vn[:, ii] = np.bincount(vertex_inds, weights=np.repeat(fn[:, ii], 3), minlength=self.n_vertices)
+        vn /= np.sqrt((vn ** 2).sum(axis=1))[:, np.newaxis]
+        return vn.astype(self.vertices.dtype)
 
     def get_vertex_normals(self):
         # If there is at least 3 vertices and 1 triangle...
@@ -112,11 +108,9 @@ class Surface(object):
 
     def get_vertex_areas(self):
         triangle_areas = self.get_triangle_areas()
-        vertex_areas = np.zeros((self.n_vertices,))
-        for triang, vertices in enumerate(self.triangles):
-            for i in range(3):
-                vertex_areas[vertices[i]] += 1. / 3. * triangle_areas[triang]
-        return vertex_areas
+        # Each vertex gets one third of the area of each one of its triangles
+        return np.bincount(self.triangles.ravel(), weights=np.repeat(triangle_areas[:, 0] / 3.0, 3),
+                           minlength=self.n_vertices)
 
     def add_vertices_and_triangles(self, new_vertices, new_triangles,
                                    new_vertex_normals=np.array([]),  new_triangle_normals=np.array([])):
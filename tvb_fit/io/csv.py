@@ -1,10 +1,15 @@
 # encoding=utf8
 
+import warnings
 import numpy as np
 from tvb_fit.io.r_file_io import rdump
 from tvb_fit.base.utils.log_error_utils import initialize_logger
 
 
+# Number of rows of csv files parsed at once when streaming
+CSV_CHUNK_LENGTH = 2 ** 10
+
+
 def merge_csv_data(*csvs):
     data_ = {}
     for csv in csvs:
@@ -19,6 +24,38 @@ def merge_csv_data(*csvs):
     return data_
 
 
+def parse_csv_body(lines, n_cols):
+    n_rows = len(lines)
+    # Convert all lines to floats in a single vectorized pass...
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        data = np.fromstring(",".join([line.strip() for line in lines]), sep=",")
+    if data.size == n_rows * n_cols:
+        return data.reshape((n_rows, n_cols))
+    # ...unless there are incomplete or invalid lines, which are found and skipped line by line:
+    data = []
+    for id_line, line in enumerate(lines):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            line_data = np.fromstring(line.strip(), sep=",")
+        if line_data.size == n_cols:
+            data.append(line_data)
+        else:
+            logger = initialize_logger(__name__)
+            logger.warn("Failed to convert line " + str(id_line) + " to " + str(n_cols) + " floats!" +
+                        "\nSkipping line " + str(id_line) + ":  " + line.strip() + "!")
+    if len(data) == 0:
+        return np.zeros((0, n_cols))
+    return np.array(data)
+
+
+def _csv_data_lines(fd):
+    # Skip CmdStan's configuration, adaptation and timing comment blocks, as well as empty lines
+    for line in fd:
+        if not line.startswith('#') and len(line.strip()) > 0:
+            yield line
+
+
 def parse_csv(fname, merge=True):
     if '*' in fname:
         import glob
@@ -29,27 +66,15 @@ def parse_csv(fname, merge=True):
             csv = merge_csv_data(*csv)
         return csv
 
-    lines = []
     with open(fname, 'r') as fd:
-        for line in fd.readlines():
-            if not line.startswith('#'):
-                lines.append(line.strip().split(','))
-    names = [field.split('.') for field in lines[0]]
-    data = []
-    for id_line, line in enumerate(lines[1:]):
-        append_data = True
-        for iline in range(len(line)):
-            try:
-                line[iline] = float(line[iline])
-            except:
-                logger = initialize_logger(__name__)
-                logger.warn("Failed to convert string " + line[iline] + " to float!" +
-                            "\nSkipping line " + str(id_line) + ":  " + str(line) + "!")
-                append_data = False
-                break
-        if append_data:
-            data.append(line)
-    data = np.array(data)
+        lines = list(_csv_data_lines(fd))
+    namemap, maxdims = parse_csv_header(lines[0])
+    data = parse_csv_body(lines[1:], sum([len(idx) for idx in namemap.values()]))
+    return csv_data_to_dict(data, namemap, maxdims)
+
+
+def parse_csv_header(line):
+    names = [field.split('.') for field in line.strip().split(',')]
 
     namemap = {}
     maxdims = {}
@@ -66,16 +91,53 @@ def parse_csv(fname, merge=True):
             dims.append(int(dim))
         maxdims[name] = tuple(reversed(dims))
 
+    return namemap, maxdims
+
+
+def csv_data_to_dict(data, namemap, maxdims, names=None):
     # data in linear order per Stan, e.g. mat is col maj
     # TODO array is row maj, how to distinguish matrix vs array[,]?
+    if names is None:
+        names = namemap.keys()
     data_ = {}
-    for name, idx in namemap.items():
+    for name in names:
         new_shape = (-1,) + maxdims.get(name, ())
-        data_[name] = data[:, idx].reshape(new_shape)
+        data_[name] = data[:, namemap[name]].reshape(new_shape)
 
     return data_
 
 
+def count_csv_rows(fname):
+    # Number of data rows, without parsing them
+    with open(fname, 'r') as fd:
+        return max(sum(1 for _ in _csv_data_lines(fd)) - 1, 0)
+
+
+def parse_csv_in_chunks(fname, names=None, chunk_length=CSV_CHUNK_LENGTH, skip_rows=0):
+    """
+    Parse a CmdStan csv file chunk by chunk, so that only chunk_length rows are held in memory at once.
+    :param fname: path to the csv file
+    :param names: optional list of the names of the outputs to return. If None, all outputs are returned
+    :param chunk_length: number of rows to parse at once
+    :param skip_rows: number of data rows to skip at the start of the file, e.g., warmup samples
+    :return: generator of dictionaries of the outputs' samples of each chunk, in the format of parse_csv
+    """
+    with open(fname, 'r') as fd:
+        lines = _csv_data_lines(fd)
+        namemap, maxdims = parse_csv_header(next(lines))
+        n_cols = sum([len(idx) for idx in namemap.values()])
+        chunk = []
+        for i_row, line in enumerate(lines):
+            if i_row < skip_rows:
+                continue
+            chunk.append(line)
+            if len(chunk) == chunk_length:
+                yield csv_data_to_dict(parse_csv_body(chunk, n_cols), namemap, maxdims, names)
+                chunk = []
+        if len(chunk) > 0:
+            yield csv_data_to_dict(parse_csv_body(chunk, n_cols), namemap, maxdims, names)
+
+
 def parse_csv_in_cols(fname):
     names = []
     sdims = {}
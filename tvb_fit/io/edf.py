@@ -1,53 +1,141 @@
 from mne.io import read_raw_edf
 
 import numpy as np
+from scipy.signal import firwin, lfilter, lfilter_zi
 
-from tvb_fit.base.utils.log_error_utils import initialize_logger
+from tvb_fit.base.utils.log_error_utils import initialize_logger, raise_value_error
 from tvb_fit.base.utils.data_structures_utils import ensure_string
 from tvb_fit.base.model.timeseries import Timeseries, TimeseriesDimensions
 
 
-def read_edf(path, sensors, rois_selection=None, label_strip_fun=None, time_units="ms"):
-    logger = initialize_logger(__name__)
+# Number of time points read from the edf file at once
+EDF_CHUNK_LENGTH = 2 ** 16
 
-    logger.info("Reading empirical dataset from mne file...")
-    raw_data = read_raw_edf(path, preload=True)
 
+def _select_edf_channels(ch_names, sensors, rois_selection=None, label_strip_fun=None):
     if not callable(label_strip_fun):
         label_strip_fun = lambda label: label
-
     rois = []
     rois_inds = []
     rois_lbls = []
-    if len(rois_selection) == 0:
+    if rois_selection is None or len(rois_selection) == 0:
         rois_selection = sensors.labels
-
-    logger.info("Selecting target signals from dataset...")
-    for iR, s in enumerate(raw_data.ch_names):
+    for iR, s in enumerate(ch_names):
         this_label = label_strip_fun(s)
         this_index = sensors.get_sensors_inds_by_sensors_labels(this_label)
         if this_label in rois_selection or (len(this_index) == 1 and this_index[0] in rois_selection):
             rois.append(iR)
             rois_inds.append(this_index[0])
             rois_lbls.append(this_label)
+    sort_inds = np.argsort(rois_lbls)
+    rois = np.array(rois, dtype="i")[sort_inds]
+    rois_inds = np.array(rois_inds)[sort_inds]
+    rois_lbls = np.array(rois_lbls)[sort_inds]
+    return rois, rois_inds, rois_lbls
+
+
+def _time_window_to_samples(time_window, sfreq, n_times, time_units="ms"):
+    if time_window is None:
+        return 0, n_times
+    # Assuming that edf file time units is "sec"
+    time_window = np.array(time_window, dtype="f8")
+    if ensure_string(time_units).find("ms") == 0:
+        time_window = time_window / 1000
+    start = int(np.maximum(np.round(time_window[0] * sfreq), 0))
+    stop = int(np.minimum(np.round(time_window[1] * sfreq), n_times))
+    if stop <= start:
+        raise_value_error("Time window " + str(time_window) + " selects no time points out of an edf recording of "
+                          + str(n_times) + " time points!")
+    return start, stop
+
 
-    data, times = raw_data[:, :]
-    data = data[rois].T
+def _read_edf_chunks(raw_data, picks, start, stop, chunk_length=EDF_CHUNK_LENGTH):
+    # Yield (time points, picks) arrays reading the selected channels only, chunk by chunk
+    for chunk_start in range(start, stop, chunk_length):
+        yield raw_data[picks, chunk_start:min(chunk_start + chunk_length, stop)][0].T
+
+
+def _read_edf_decimated(raw_data, picks, start, stop, decim_ratio, chunk_length=EDF_CHUNK_LENGTH):
+    # Streaming counterpart of scipy.signal.decimate(..., ftype="fir"):
+    # a causal FIR low pass filter runs over the chunks with its state carried across them,
+    # and its group delay is compensated by reading half a filter length past the end of the window.
+    # The filter is warmed up with half a filter length of samples preceding the window, if any.
+    n_taps = 20 * decim_ratio + 1
+    delay = n_taps // 2
+    b = firwin(n_taps, 1.0 / decim_ratio, window="hamming")
+    n_times = raw_data.n_times
+    read_start = max(start - delay, 0)
+    read_stop = min(stop + delay, n_times)
+    data = []
+    zi = None
+    i_sample = read_start
+    for chunk in _read_edf_chunks(raw_data, picks, read_start, read_stop, chunk_length):
+        if zi is None:
+            # Start the filter from the steady state of the first sample:
+            zi = lfilter_zi(b, 1.0)[:, np.newaxis] * chunk[0][np.newaxis]
+        filtered, zi = lfilter(b, 1.0, chunk, axis=0, zi=zi)
+        # Output sample i corresponds to input sample i - delay:
+        out_inds = np.arange(i_sample, i_sample + chunk.shape[0]) - delay
+        keep = np.logical_and(out_inds >= start, (out_inds - start) % decim_ratio == 0)
+        data.append(filtered[keep])
+        i_sample += chunk.shape[0]
+    if read_stop < stop + delay:
+        # Flush the filter with the last sample for the time points missing at the end of the recording:
+        n_pad = stop + delay - read_stop
+        filtered = lfilter(b, 1.0, np.tile(chunk[-1], (n_pad, 1)), axis=0, zi=zi)[0]
+        out_inds = np.arange(i_sample, i_sample + n_pad) - delay
+        keep = np.logical_and(out_inds >= start, (out_inds - start) % decim_ratio == 0)
+        data.append(filtered[keep])
+    return np.concatenate(data, axis=0)
+
+
+def read_edf(path, sensors, rois_selection=None, label_strip_fun=None, time_units="ms",
+             time_window=None, decim_ratio=1, chunk_length=EDF_CHUNK_LENGTH):
+    """
+    Read selected channels of an edf file, streaming the data from disk chunk by chunk.
+    :param path: path to the edf file
+    :param sensors: Sensors instance to match the channels' labels against
+    :param rois_selection: labels or indices of the sensors to read. If None or empty, all sensors are read
+    :param label_strip_fun: optional function to transform the edf channels' labels before matching
+    :param time_units: time units of the output times and of time_window ("ms" or "sec")
+    :param time_window: optional (start, end) time span to read, in time_units. If None, the whole recording is read
+    :param decim_ratio: if > 1, the data are low pass filtered and decimated on the fly by this integer ratio
+    :param chunk_length: number of time points to read from disk at once
+    :return: data (time points, channels), times, edf channels' indices, sensors' indices and labels
+    """
+    logger = initialize_logger(__name__)
+
+    logger.info("Reading empirical dataset from mne file...")
+    raw_data = read_raw_edf(path, preload=False)
+
+    logger.info("Selecting target signals from dataset...")
+    rois, rois_inds, rois_lbls = _select_edf_channels(raw_data.ch_names, sensors, rois_selection, label_strip_fun)
+
+    start, stop = _time_window_to_samples(time_window, raw_data.info["sfreq"], raw_data.n_times, time_units)
+    # Read the channels in file order, which is the cheapest for the reader, and reorder them afterwards:
+    picks_order = np.argsort(rois)
+    picks = rois[picks_order].tolist()
+    decim_ratio = int(decim_ratio)
+    if decim_ratio > 1:
+        logger.info("Reading and decimating target signals...")
+        data = _read_edf_decimated(raw_data, picks, start, stop, decim_ratio, chunk_length)
+    else:
+        logger.info("Reading target signals...")
+        decim_ratio = 1
+        data = np.concatenate(list(_read_edf_chunks(raw_data, picks, start, stop, chunk_length)), axis=0)
+    data = data[:, np.argsort(picks_order)]
+    times = raw_data.times[start:stop:decim_ratio]
     # Assuming that edf file time units is "sec"
     if ensure_string(time_units).find("ms") == 0:
         times = 1000 * times
-    sort_inds = np.argsort(rois_lbls)
-    rois = np.array(rois)[sort_inds]
-    rois_inds = np.array(rois_inds)[sort_inds]
-    rois_lbls = np.array(rois_lbls)[sort_inds]
-    data = data[:, sort_inds]
 
     return data, times, rois, rois_inds, rois_lbls
 
 
-def read_edf_to_Timeseries(path, sensors, rois_selection=None, label_strip_fun=None, time_units="ms"):
+def read_edf_to_Timeseries(path, sensors, rois_selection=None, label_strip_fun=None, time_units="ms",
+                           time_window=None, decim_ratio=1, chunk_length=EDF_CHUNK_LENGTH):
     data, times, rois, rois_inds, rois_lbls = \
-        read_edf(path, sensors, rois_selection, label_strip_fun, time_units)
+        read_edf(path, sensors, rois_selection, label_strip_fun, time_units, time_window, decim_ratio, chunk_length)
 
     return Timeseries(data, {TimeseriesDimensions.SPACE.value: rois_lbls},
                       times[0], np.mean(np.diff(times)), time_units)
@@ -315,42 +315,57 @@ class H5Reader(object):
         h5_file.close()
         return sim_settings
 
-    def read_ts(self, path):
+    def read_ts(self, path, lazy=False):
         """
         :param path: Path towards a valid TimeSeries H5 file
+        :param lazy: if True, data is returned as the h5py dataset of the open file,
+                     and only the parts that are sliced from it are read from disk
         :return: Timeseries data and time in 2 numpy arrays
         """
         self.logger.info("Starting to read TimeSeries from: %s" % path)
         h5_file = h5py.File(path, 'r', libver='latest')
 
-        data = h5_file['/data'][()]
         total_time = int(h5_file["/"].attrs["Simulated_period"][0])
         nr_of_steps = int(h5_file["/data"].attrs["Number_of_steps"][0])
         start_time = float(h5_file["/data"].attrs["Start_time"][0])
         time = numpy.linspace(start_time, total_time, nr_of_steps)
 
-        self.logger.info("First Channel sv sum: " + str(numpy.sum(data[:, 0])))
-        self.logger.info("Successfully read timeseries!")  #: %s" % data)
-        h5_file.close()
+        if lazy:
+            # The file will be closed when the dataset is garbage collected
+            data = h5_file['/data']
+            self.logger.info("Successfully opened timeseries for lazy reading!")
+        else:
+            data = h5_file['/data'][()]
+            self.logger.info("First Channel sv sum: " + str(numpy.sum(data[:, 0])))
+            self.logger.info("Successfully read timeseries!")  #: %s" % data)
+            h5_file.close()
 
         return time, data
 
-    def read_timeseries(self, path, timeseries=Timeseries):
+    def read_timeseries(self, path, timeseries=Timeseries, lazy=False):
         """
         :param path: Path towards a valid TimeSeries H5 file
-        :return: Timeseries data and time in 2 numpy arrays
+        :param timeseries: Timeseries class to be returned
+        :param lazy: if True, the Timeseries data is the h5py dataset of the open file,
+                     and only time windows, regions or variables selected from it are read from disk
+        :return: Timeseries object
         """
         self.logger.info("Starting to read TimeSeries from: %s" % path)
         h5_file = h5py.File(path, 'r', libver='latest')
 
-        data = h5_file['/data'][()]
         time = h5_file['/time'][()]
         labels = h5_file['/labels'][()]
         variables = h5_file['/variables'][()]
         time_unit = h5_file.attrs["time_unit"]
-        self.logger.info("First Channel sv sum: " + str(numpy.sum(data[:, 0])))
-        self.logger.info("Successfully read Timeseries!")  #: %s" % data)
-        h5_file.close()
+        if lazy and h5_file['/data'].ndim == 4:
+            # The file will be closed when the dataset is garbage collected
+            data = h5_file['/data']
+            self.logger.info("Successfully opened Timeseries for lazy reading!")
+        else:
+            data = h5_file['/data'][()]
+            self.logger.info("First Channel sv sum: " + str(numpy.sum(data[:, 0])))
+            self.logger.info("Successfully read Timeseries!")  #: %s" % data)
+            h5_file.close()
 
         return timeseries(data, {TimeseriesDimensions.SPACE.value: labels,
                                  TimeseriesDimensions.VARIABLES.value: variables},
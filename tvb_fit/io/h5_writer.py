@@ -24,6 +24,10 @@ KEY_STEPS = "Number_of_steps"
 KEY_SAMPLING = "Sampling_period"
 KEY_START = "Start_time"
 
+# Target size of a timeseries chunk (~1MB), within the range recommended for h5 chunked storage
+TS_CHUNK_BYTES = 2 ** 20
+TS_COMPRESSIONS = ("gzip", "lzf")
+
 
 class H5Writer(H5WriterBase):
 
@@ -267,8 +271,53 @@ class H5Writer(H5WriterBase):
         h5_file.attrs.create(self.H5_SUBTYPE_ATTRIBUTE, "list")
         h5_file.close()
 
-    def write_ts(self, raw_data, sampling_period, path):
+    def _prepare_ts_dataset_kwargs(self, data, chunks_time_length=None, compression=None, compression_opts=None,
+                                   shuffle=None):
+        """
+        :param data: numpy.ndarray of the timeseries to be written, with time as its first dimension
+        :param chunks_time_length: number of time points per chunk. If None and compression is requested,
+                                   it is chosen so that a chunk, spanning all other dimensions, is about 1MB
+        :param compression: None (default), "gzip" or "lzf"
+        :param compression_opts: gzip compression level (0-9)
+        :param shuffle: apply the shuffle filter. Defaults to True when compressing
+        :return: dictionary of keyword arguments for h5py create_dataset
+        """
+        dataset_kwargs = {"data": data}
+        if chunks_time_length is None and compression is None:
+            # Contiguous, uncompressed storage
+            return dataset_kwargs
+        n_times = data.shape[0]
+        if chunks_time_length is None:
+            time_point_bytes = max(1, data[:1].nbytes)
+            chunks_time_length = TS_CHUNK_BYTES // time_point_bytes
+        chunks_time_length = int(max(1, min(chunks_time_length, n_times)))
+        # Chunks span all other dimensions, since time windows over all channels is the most common read pattern
+        dataset_kwargs["chunks"] = (chunks_time_length,) + data.shape[1:]
+        if compression is not None:
+            dataset_kwargs["compression"] = compression
+            if compression == "gzip" and compression_opts is not None:
+                dataset_kwargs["compression_opts"] = compression_opts
+            if shuffle is None:
+                shuffle = True
+        if shuffle:
+            dataset_kwargs["shuffle"] = True
+        return dataset_kwargs
+
+    def write_ts(self, raw_data, sampling_period, path, chunks_time_length=None, compression=None,
+                 compression_opts=None, shuffle=None):
+        """
+        :param raw_data: dictionary of 2D numpy.ndarrays, 2D numpy.ndarray or Timeseries object to write in H5
+        :param sampling_period: sampling period of the data
+        :param path: H5 path to be written
+        :param chunks_time_length, compression, compression_opts, shuffle: optional chunking and lossless
+                compression of the data datasets along time (see _prepare_ts_dataset_kwargs)
+        """
+        if compression is not None and compression not in TS_COMPRESSIONS:
+            raise_value_error("Invalid TS compression %s! Expected one of %s" % (compression, str(TS_COMPRESSIONS)),
+                              self.logger)
         path = change_filename_or_overwrite(path)
+        ts_kwargs = {"chunks_time_length": chunks_time_length, "compression": compression,
+                     "compression_opts": compression_opts, "shuffle": shuffle}
 
         self.logger.info("Writing a TS at:\n" + path)
         h5_file = h5py.File(path, 'a', libver='latest')
@@ -276,7 +325,8 @@ class H5Writer(H5WriterBase):
         if isinstance(raw_data, dict):
             for data in raw_data:
                 if len(raw_data[data].shape) == 2 and str(raw_data[data].dtype)[0] == "f":
-                    h5_file.create_dataset("/" + data, data=raw_data[data])
+                    h5_file.create_dataset("/" + data,
+                                           **self._prepare_ts_dataset_kwargs(raw_data[data], **ts_kwargs))
                     write_metadata({KEY_MAX: raw_data[data].max(), KEY_MIN: raw_data[data].min(),
                                     KEY_STEPS: raw_data[data].shape[0], KEY_CHANNELS: raw_data[data].shape[1],
                                     KEY_SV: 1, KEY_SAMPLING: sampling_period, KEY_START: 0.0}, h5_file, KEY_DATE,
@@ -285,7 +335,7 @@ class H5Writer(H5WriterBase):
                     raise_value_error("Invalid TS data. 2D (time, nodes) numpy.ndarray of floats expected")
         elif isinstance(raw_data, numpy.ndarray):
             if len(raw_data.shape) != 2 and str(raw_data.dtype)[0] != "f":
-                h5_file.create_dataset("/data", data=raw_data)
+                h5_file.create_dataset("/data", **self._prepare_ts_dataset_kwargs(raw_data, **ts_kwargs))
                 write_metadata({KEY_MAX: raw_data.max(), KEY_MIN: raw_data.min(), KEY_STEPS: raw_data.shape[0],
                                 KEY_CHANNELS: raw_data.shape[1], KEY_SV: 1, KEY_SAMPLING: sampling_period,
                                 KEY_START: 0.0}, h5_file, KEY_DATE, KEY_VERSION, "/data")
@@ -293,7 +343,7 @@ class H5Writer(H5WriterBase):
                 raise_value_error("Invalid TS data. 2D (time, nodes) numpy.ndarray of floats expected")
         elif isinstance(raw_data, Timeseries):
             if len(raw_data.shape) == 4 and str(raw_data.data.dtype)[0] == "f":
-                h5_file.create_dataset("/data", data=raw_data.data)
+                h5_file.create_dataset("/data", **self._prepare_ts_dataset_kwargs(raw_data.data, **ts_kwargs))
                 h5_file.create_dataset("/time", data=raw_data.time)
                 h5_file.create_dataset("/labels",
                                        data=numpy.array([numpy.string_(label) for label in raw_data.space_labels]))
@@ -310,8 +360,10 @@ class H5Writer(H5WriterBase):
             raise_value_error("Invalid TS data. Dictionary or 2D (time, nodes) numpy.ndarray of floats expected")
         h5_file.close()
 
-    def write_timeseries(self, timeseries, path):
-        self.write_ts(timeseries, timeseries.time_step, path)
+    def write_timeseries(self, timeseries, path, chunks_time_length=None, compression=None, compression_opts=None,
+                         shuffle=None):
+        self.write_ts(timeseries, timeseries.time_step, path, chunks_time_length, compression, compression_opts,
+                      shuffle)
 
     def write_probabilistic_model(self, probabilistic_model, nr_regions, path):
         """
@@ -1,18 +1,194 @@
+import os
+import binascii
 import numpy as np
 from tvb_fit.base.config import CalculusConfig
+from tvb_fit.base.utils.log_error_utils import initialize_logger, raise_value_error
+from tvb_fit.base.utils.data_structures_utils import isequal_string
 from tvb_fit.base.model.parameter import Parameter
 from tvb_fit.samplers.sampler_base import SamplerBase
 
 
+# Number of bits of the integer representation of Sobol points
+SOBOL_BITS = 30
+
+# Joe & Kuo (2008) direction numbers of the Sobol sequence for dimensions 2 to 21:
+# degree s and coefficients a of the primitive polynomial, and initial direction numbers m_1, ..., m_s
+SOBOL_DIRECTION_NUMBERS = [(1, 0, (1,)),
+                           (2, 1, (1, 3)),
+                           (3, 1, (1, 3, 1)),
+                           (3, 2, (1, 1, 1)),
+                           (4, 1, (1, 1, 3, 3)),
+                           (4, 4, (1, 3, 5, 13)),
+                           (5, 2, (1, 1, 5, 5, 17)),
+                           (5, 4, (1, 1, 5, 5, 5)),
+                           (5, 7, (1, 1, 7, 11, 19)),
+                           (5, 11, (1, 1, 5, 1, 1)),
+                           (5, 13, (1, 1, 1, 3, 11)),
+                           (5, 14, (1, 3, 5, 5, 31)),
+                           (6, 1, (1, 3, 3, 9, 7, 49)),
+                           (6, 13, (1, 1, 1, 15, 21, 21)),
+                           (6, 16, (1, 3, 1, 13, 27, 49)),
+                           (6, 19, (1, 1, 1, 15, 7, 5)),
+                           (6, 22, (1, 3, 1, 15, 13, 25)),
+                           (6, 25, (1, 1, 5, 5, 19, 61)),
+                           (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+                           (7, 4, (1, 3, 7, 13, 13, 15, 69))]
+
+
+def _random_state(random_state):
+    if isinstance(random_state, np.random.RandomState):
+        return random_state
+    return np.random.RandomState(random_state)
+
+
+def latin_hypercube(n_samples, n_dims, scramble=True, random_state=None):
+    """
+    Latin hypercube sampling of the unit hypercube:
+    every dimension is divided in n_samples equal strata, each one of which is sampled exactly once.
+    :param n_samples: number of samples
+    :param n_dims: number of dimensions
+    :param scramble: if True, samples are uniformly distributed within their strata, otherwise at their centers
+    :param random_state: seed or numpy.random.RandomState for the permutations of the strata
+    :return: samples array of shape (n_samples, n_dims)
+    """
+    random_state = _random_state(random_state)
+    strata = np.array([random_state.permutation(n_samples) for _ in range(n_dims)]).T
+    if scramble:
+        offsets = random_state.uniform(size=(n_samples, n_dims))
+    else:
+        offsets = 0.5
+    return (strata + offsets) / n_samples
+
+
+def _first_primes(n):
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if np.all([candidate % prime for prime in primes]):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def halton(n_samples, n_dims, scramble=True, random_state=None):
+    """
+    Halton sequence in the unit hypercube, i.e., the radical inverses of the samples' indices
+    in the bases of the first n_dims prime numbers, starting from index 0.
+    :param n_samples: number of samples
+    :param n_dims: number of dimensions
+    :param scramble: if True, the digits of each dimension and position are randomly permuted
+    :param random_state: seed or numpy.random.RandomState for the permutations of the digits
+    :return: samples array of shape (n_samples, n_dims)
+    """
+    random_state = _random_state(random_state)
+    indices = np.arange(n_samples)
+    samples = np.zeros((n_samples, n_dims))
+    for i_dim, base in enumerate(_first_primes(n_dims)):
+        n_digits = int(np.ceil(np.log(np.maximum(n_samples, 2)) / np.log(base))) + 1
+        remainder = indices.copy()
+        scale = 1.0
+        for _ in range(n_digits):
+            scale /= base
+            digits = remainder % base
+            remainder //= base
+            if scramble:
+                digits = random_state.permutation(base)[digits]
+            samples[:, i_dim] += digits * scale
+    return samples
+
+
+def _sobol_direction_numbers(n_dims):
+    if n_dims > len(SOBOL_DIRECTION_NUMBERS) + 1:
+        raise_value_error("Sobol sequences are available for up to " + str(len(SOBOL_DIRECTION_NUMBERS) + 1) +
+                          " dimensions, not " + str(n_dims) + "!")
+    v = np.zeros((n_dims, SOBOL_BITS), dtype="i8")
+    # The first dimension is the van der Corput sequence in base 2:
+    v[0] = 1 << np.arange(SOBOL_BITS - 1, -1, -1)
+    for i_dim, (s, a, m) in enumerate(SOBOL_DIRECTION_NUMBERS[:n_dims - 1], 1):
+        m = list(m)
+        for k in range(s, SOBOL_BITS):
+            m_k = m[k - s] ^ (m[k - s] << s)
+            for j in range(1, s):
+                m_k ^= ((a >> (s - 1 - j)) & 1) * (m[k - j] << j)
+            m.append(m_k)
+        v[i_dim] = np.array(m[:SOBOL_BITS], dtype="i8") << np.arange(SOBOL_BITS - 1, -1, -1)
+    return v
+
+
+def sobol(n_samples, n_dims, scramble=True, random_state=None):
+    """
+    Sobol sequence in the unit hypercube, in Gray code order, starting from index 0.
+    Its balance properties hold for numbers of samples that are powers of 2.
+    :param n_samples: number of samples
+    :param n_dims: number of dimensions, up to 21
+    :param scramble: if True, a random linear matrix scrambling and a random digital shift are applied
+    :param random_state: seed or numpy.random.RandomState for the scrambling
+    :return: samples array of shape (n_samples, n_dims)
+    """
+    v = _sobol_direction_numbers(n_dims)
+    shift = np.zeros((n_dims,), dtype="i8")
+    if scramble:
+        random_state = _random_state(random_state)
+        # Multiply the direction numbers' bits by random lower triangular binary matrices with a unit diagonal:
+        bit_weights = 1 << np.arange(SOBOL_BITS - 1, -1, -1)
+        v_bits = (v[:, :, np.newaxis] // bit_weights) % 2
+        lms = np.tril(random_state.randint(2, size=(n_dims, SOBOL_BITS, SOBOL_BITS)), -1)
+        lms += np.eye(SOBOL_BITS, dtype=lms.dtype)
+        v_bits = np.einsum("drk,djk->djr", lms, v_bits) % 2
+        v = np.dot(v_bits, bit_weights)
+        shift = random_state.randint(1 << SOBOL_BITS, size=(n_dims,)).astype("i8")
+    gray = np.arange(n_samples, dtype="i8")
+    gray ^= gray >> 1
+    samples = np.tile(shift, (n_samples, 1))
+    for j in range(int(np.maximum(n_samples - 1, 1)).bit_length()):
+        samples ^= ((gray >> j) & 1)[:, np.newaxis] * v[:, j]
+    return samples / float(1 << SOBOL_BITS)
+
+
 class DeterministicSampler(SamplerBase):
+    logger = initialize_logger(__name__)
 
-    def __init__(self, n_samples=10, grid_mode=True):
+    space_filling_samplers = {"latin": latin_hypercube, "sobol": sobol, "halton": halton}
+
+    def __init__(self, n_samples=10, grid_mode=True, sampler="linspace", scramble=False, random_seed=None):
+        """
+        :param n_samples: number of samples per parameter for "linspace",
+                          or total number of samples for the space filling samplers
+        :param grid_mode: if True, "linspace" samples the full grid of all parameters' values.
+                          It is ignored by the space filling samplers, which never sample a grid
+        :param sampler: "linspace", or one of the space filling samplers "latin", "sobol" or "halton",
+                        whose number of samples does not grow with the number of parameters
+        :param scramble: if True, the space filling samples are randomized, see latin_hypercube, sobol and halton
+        :param random_seed: seed of the randomization of the space filling samples, including the permutations
+                            of the strata of "latin". If None and samples are randomized, a seed is drawn from
+                            OS entropy and logged, so that the samples can be reproduced
+        """
         super(DeterministicSampler, self).__init__(n_samples)
-        self.sampling_module = "numpy.linspace"
-        self.sampler = np.linspace
+        if isequal_string(sampler, "linspace"):
+            self.sampling_module = "numpy.linspace"
+            self.sampler = np.linspace
+        elif sampler.lower() in self.space_filling_samplers.keys():
+            self.sampling_module = __name__ + "." + self.space_filling_samplers[sampler.lower()].__name__
+            self.sampler = self.space_filling_samplers[sampler.lower()]
+        else:
+            raise_value_error("Sampler " + str(sampler) + " is not one of " +
+                              str(["linspace"] + list(self.space_filling_samplers.keys())) + "!")
         self.grid_mode = grid_mode
+        self.scramble = scramble
+        if random_seed is None and ((scramble and self.sampler is not np.linspace) or self.sampler is latin_hypercube):
+            random_seed = int(binascii.hexlify(os.urandom(4)), 16)
+            self.logger.info("Randomizing " + self.sampling_module + " samples with random_seed = " +
+                             str(random_seed))
+        self.random_seed = random_seed
         self.shape = (1, self.n_samples)
 
+    def _space_filling_sample(self, low, high, n_outputs):
+        if self.sampler is sobol and self.n_samples & (self.n_samples - 1) != 0:
+            self.logger.warning("The balance properties of Sobol sequences hold for numbers of samples " +
+                                "that are powers of 2, not for " + str(self.n_samples) + "!")
+        samples = self.sampler(self.n_samples, n_outputs, self.scramble, self.random_seed)
+        return low.flatten() + samples * (high - low).flatten()
+
     def sample(self, parameter=(), **kwargs):
         if isinstance(parameter, Parameter):
             parameter_shape = parameter.shape
@@ -25,19 +201,22 @@ class DeterministicSampler(SamplerBase):
         low, high = self.check_for_infinite_bounds(low, high)
         low, high, n_outputs, parameter_shape = self.check_size(low, high, parameter_shape)
         self.adjust_shape(parameter_shape)
-        samples = []
-        for (lo, hi) in zip(low.flatten(), high.flatten()):
-            samples.append(self.sampler(lo, hi, self.n_samples))
-        if self.grid_mode:
-            samples_grids = np.meshgrid(*(samples), sparse=False, indexing="ij")
-            samples = []
-            for sb in samples_grids:
-                samples.append(sb.flatten())
-            samples = np.array(samples)
-            self.shape = samples.shape
-            self.n_samples = self.shape[1]
+        if self.sampler is not np.linspace:
+            samples = self._space_filling_sample(low, high, n_outputs)
         else:
-            samples = np.array(samples)
+            samples = []
+            for (lo, hi) in zip(low.flatten(), high.flatten()):
+                samples.append(self.sampler(lo, hi, self.n_samples))
+            if self.grid_mode:
+                samples_grids = np.meshgrid(*(samples), sparse=False, indexing="ij")
+                samples = []
+                for sb in samples_grids:
+                    samples.append(sb.flatten())
+                samples = np.array(samples)
+                self.shape = samples.shape
+                self.n_samples = self.shape[1]
+            else:
+                samples = np.array(samples)
         transpose_shape = tuple([self.n_samples] + list(self.shape)[0:-1])
         samples = np.reshape(samples, transpose_shape).T
         self.shape = samples.shape
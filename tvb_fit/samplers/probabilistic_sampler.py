@@ -1,3 +1,6 @@
+import os
+import binascii
+from copy import deepcopy
 import numpy as np
 import numpy.random as nr
 import scipy.stats as ss
@@ -14,9 +17,46 @@ class ProbabilisticSampler(SamplerBase):
     logger = initialize_logger(__name__)
 
     def __init__(self, n_samples=10, sampling_module="scipy", random_seed=None):
+        """
+        :param n_samples: number of samples
+        :param sampling_module: "scipy" or "numpy"
+        :param random_seed: seed of the sampler's own random stream, which neither uses nor changes
+                            numpy's global random state. If None, a seed is drawn from OS entropy, logged,
+                            and kept in random_seed, so that the samples can be reproduced.
+                            Consecutive calls of sample continue the same stream.
+        """
         super(ProbabilisticSampler, self).__init__(n_samples)
-        self.random_seed = random_seed
         self.sampling_module = sampling_module.lower()
+        if random_seed is None:
+            random_seed = int(binascii.hexlify(os.urandom(4)), 16)
+            self.logger.info("Sampling " + self.sampling_module + " samples with random_seed = " + str(random_seed))
+        self.random_seed = random_seed
+        self._set_random_state([random_seed])
+
+    def _set_random_state(self, seed_key):
+        # The root stream is seeded as numpy.random.seed(random_seed), spawned ones by their whole seed key
+        self._seed_key = list(seed_key)
+        self._n_spawned = 0
+        if len(self._seed_key) == 1:
+            self.random_state = nr.RandomState(self._seed_key[0])
+        else:
+            self.random_state = nr.RandomState(self._seed_key)
+
+    def spawn(self, n_children):
+        """
+        Spawn copies of this sampler, each one with its own random stream, independent of this sampler's one,
+        e.g., to sample in parallel workers. Streams depend only on the random_seed and the order of spawning,
+        so that results are reproducible regardless of the workers' execution order.
+        :param n_children: number of samplers to spawn
+        :return: list of samplers
+        """
+        children = []
+        for i_child in range(n_children):
+            child = deepcopy(self)
+            child._set_random_state(self._seed_key + [self._n_spawned + i_child])
+            children.append(child)
+        self._n_spawned += n_children
+        return children
 
     def __repr__(self):
 
@@ -36,13 +76,12 @@ class ProbabilisticSampler(SamplerBase):
         # how-to-truncate-a-numpy-scipy-exponential-distribution-in-an-efficient-way
         # TODO: to have distributions parameters valid for the truncated distributions instead for the original one
         # pystan might be needed for that...
-        rnd_cdf = nr.uniform(self.sampler.cdf(x=trunc_limits.get("low", -np.inf)),
-                             self.sampler.cdf(x=trunc_limits.get("high", np.inf)),
-                             size=size)
+        rnd_cdf = self.random_state.uniform(self.sampler.cdf(x=trunc_limits.get("low", -np.inf)),
+                                            self.sampler.cdf(x=trunc_limits.get("high", np.inf)),
+                                            size=size)
         return self.sampler.ppf(q=rnd_cdf)
 
     def sample(self, parameter=(), loc=0.0, scale=1.0, **kwargs):
-        nr.seed(self.random_seed)
         if isinstance(parameter, (ProbabilisticParameterBase, TransformedProbabilisticParameterBase)):
             parameter_shape = parameter.p_shape
             low = parameter.low
@@ -72,15 +111,15 @@ class ProbabilisticSampler(SamplerBase):
         elif self.sampling_module.find("scipy") >= 0:
             if isinstance(prob_distr, basestring):
                 self.sampler = getattr(ss, prob_distr)(*parameter, **kwargs)
-                samples = self.sampler.rvs(size=out_shape) * scale + loc
+                samples = self.sampler.rvs(size=out_shape, random_state=self.random_state) * scale + loc
             elif isinstance(prob_distr, ProbabilisticParameterBase):
                 self.sampler = prob_distr._scipy(**kwargs)
-                samples = self.sampler.rvs(size=out_shape)
+                samples = self.sampler.rvs(size=out_shape, random_state=self.random_state)
         elif self.sampling_module.find("numpy") >= 0:
             if isinstance(prob_distr, basestring):
-                self.sampler = lambda size: getattr(nr, prob_distr)(*parameter, size=size, **kwargs)
+                self.sampler = lambda size: getattr(self.random_state, prob_distr)(*parameter, size=size, **kwargs)
                 samples = self.sampler(out_shape) * scale + loc
             elif isinstance(prob_distr, (ProbabilisticParameterBase, TransformedProbabilisticParameterBase)):
-                self.sampler = lambda size: prob_distr.numpy(size=size)
+                self.sampler = lambda size: prob_distr.numpy(size=size, random_state=self.random_state)()
                 samples = self.sampler(out_shape)
         return samples.T
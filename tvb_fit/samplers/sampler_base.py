@@ -1,7 +1,5 @@
 from collections import OrderedDict
 import numpy as np
-import scipy as scp
-import scipy.stats as ss
 from tvb_fit.tvb_epilepsy.base.constants.config import CalculusConfig
 from tvb_fit.base.utils.log_error_utils import initialize_logger
 from tvb_fit.base.utils.data_structures_utils import dict_str, formal_repr, shape_to_size
@@ -64,17 +62,63 @@ class SamplerBase(object):
         high = high * i1
         return low, high, n_params, parameter_shape
 
+    @staticmethod
+    def _sorted_percentiles(sorted_samples, q):
+        # Same as np.percentile(..., interpolation="linear") of samples sorted along the last axis
+        pos = np.array(q, dtype="f8") / 100 * (sorted_samples.shape[-1] - 1)
+        below = np.floor(pos).astype("i")
+        above = np.minimum(below + 1, sorted_samples.shape[-1] - 1)
+        weights_above = pos - below
+        return np.rollaxis(sorted_samples[..., below] * (1 - weights_above) +
+                           sorted_samples[..., above] * weights_above, -1)
+
+    @staticmethod
+    def _sorted_mode(sorted_samples):
+        # Same as scipy.stats.mode(...)[0], i.e., the smallest most frequent value,
+        # of samples sorted along the last axis, from the lengths of the runs of equal values
+        n = sorted_samples.shape[-1]
+        flat = sorted_samples.reshape((-1, n))
+        run_starts = np.ones(flat.shape, dtype="bool")
+        run_starts[:, 1:] = flat[:, 1:] != flat[:, :-1]
+        run_starts = np.flatnonzero(run_starts)
+        run_lengths = np.diff(np.append(run_starts, flat.size))
+        run_rows = run_starts // n
+        row_starts = np.searchsorted(run_rows, np.arange(flat.shape[0]))
+        max_lengths = np.maximum.reduceat(run_lengths, row_starts)
+        # The first longest run of each row is the one of the smallest value:
+        longest = np.flatnonzero(run_lengths == max_lengths[run_rows])
+        longest = longest[np.unique(run_rows[longest], return_index=True)[1]]
+        return flat.ravel()[run_starts[longest]].reshape(sorted_samples.shape[:-1] + (1,))
+
     def compute_stats(self, samples):
-        return OrderedDict([("mean", samples.mean(axis=-1)), ("median", scp.median(samples, axis=-1)),
-                            ("mode", scp.stats.mode(samples, axis=-1)[0]),
-                            ("std", samples.std(axis=-1)), ("var", samples.var(axis=-1)),
-                            ("kurt", ss.kurtosis(samples, axis=-1)), ("skew", ss.skew(samples, axis=-1)),
-                            ("min", samples.min(axis=-1)), ("max", samples.max(axis=-1)),
-                            ("1%", np.percentile(samples, 1, axis=-1)), ("5%", np.percentile(samples, 5, axis=-1)),
-                            ("10%", np.percentile(samples, 10, axis=-1)), ("p25", np.percentile(samples, 25, axis=-1)),
-                            ("p50", np.percentile(samples, 50, axis=-1)), ("p75", np.percentile(samples, 75, axis=-1)),
-                            ("p90", np.percentile(samples, 90, axis=-1)), ("p95", np.percentile(samples, 95, axis=-1)),
-                            ("p99", np.percentile(samples, 99, axis=-1))])
+        # All statistics are computed from one sort and one pass of centered moments along the samples' axis
+        samples = np.asarray(samples)
+        sorted_samples = np.sort(samples, axis=-1)
+        mean = samples.mean(axis=-1)
+        dev = samples - mean[..., np.newaxis]
+        dev2 = dev ** 2
+        var = dev2.mean(axis=-1)
+        m3 = (dev2 * dev).mean(axis=-1)
+        m4 = (dev2 ** 2).mean(axis=-1)
+        zero_var = var == 0
+        # As in scipy.stats, skewness and kurtosis are 0 - 3 for constant samples
+        var_nonzero = np.where(zero_var, 1.0, var)
+        skew = np.where(zero_var, 0.0, m3 / var_nonzero ** 1.5)
+        kurt = np.where(zero_var, 0.0, m4 / var_nonzero ** 2) - 3.0
+        percentiles = self._sorted_percentiles(sorted_samples, [1, 5, 10, 25, 50, 75, 90, 95, 99])
+        min_samples = sorted_samples[..., 0]
+        # np.sort puts NaNs last, so that, as for np.min and np.percentile,
+        # the minimum and the percentiles of samples with NaNs are set to NaN
+        nan_samples = np.isnan(sorted_samples[..., -1])
+        if np.any(nan_samples):
+            percentiles = np.where(nan_samples, np.nan, percentiles)
+            min_samples = np.where(nan_samples, np.nan, min_samples)
+        p1, p5, p10, p25, p50, p75, p90, p95, p99 = percentiles
+        return OrderedDict([("mean", mean), ("median", p50), ("mode", self._sorted_mode(sorted_samples)),
+                            ("std", np.sqrt(var)), ("var", var), ("kurt", kurt), ("skew", skew),
+                            ("min", min_samples), ("max", sorted_samples[..., -1]),
+                            ("1%", p1), ("5%", p5), ("10%", p10), ("p25", p25), ("p50", p50), ("p75", p75),
+                            ("p90", p90), ("p95", p95), ("p99", p99)])
 
     def generate_samples(self, stats=False, parameter=(), **kwargs):
         samples = self.sample(parameter, **kwargs)
@@ -1,14 +1,21 @@
+import re
+import time
+import subprocess
 from shutil import copyfile
 from tvb_fit.base.utils.log_error_utils import raise_value_error, warning
 from tvb_fit.base.utils.data_structures_utils import construct_import_path
 from tvb_fit.base.utils.command_line_utils import execute_command
 from tvb_fit.base.utils.file_utils import change_filename_or_overwrite_with_wildcard
-from tvb_fit.io.csv import parse_csv_in_cols
+from tvb_fit.io.csv import parse_csv, parse_csv_in_cols
 from tvb_fit.plot.plotter import Plotter
 from tvb_fit.samplers.stan.stan_interface import StanInterface
 from tvb_fit.samplers.stan.stan_factory import *
 
 
+# CmdStan progress lines look like "Iteration:  100 / 2000 [  5%]  (Warmup)"
+CMDSTAN_ITERATION_PATTERN = re.compile(r"Iteration:\s*(\d+)\s*/\s*(\d+)")
+
+
 class CmdStanInterface(StanInterface):
 
     def __init__(self, model_name=None, model=None, model_code=None, model_dir="", model_code_path="", model_data_path="",
@@ -23,6 +30,8 @@ class CmdStanInterface(StanInterface):
                               base_path=model_dir, check_files=False)
         self.assert_fitmethod()
         self.command = ""
+        self.chains_progress = []
+        self.chains_samples = OrderedDict()
         self.options = {"init": init, "random_seed": random_seed}
         self.options = self.set_options(**options)
         self.context_str = "from " + construct_import_path(__file__) + " import " + self.__class__.__name__
@@ -97,8 +106,27 @@ class CmdStanInterface(StanInterface):
             if self.model_path != self.model_code_path.split(".stan", 1)[0]:
                 copyfile(self.model_code_path.split(".stan", 1)[0], self.model_path)
 
+    def _get_chains_samples(self):
+        # Return the samples of the chains/runs finished by run_chains, in the order of their ids,
+        # if they are outputs of the current output file.
+        # Outputs that failed to be parsed, or were not parsed, when their chain/run finished are parsed now.
+        chains = [chain for chain in self.chains_progress if chain["status"] == "done"]
+        if len(chains) == 0 or \
+                not np.all([chain["output_filepath"].find(self.output_filepath[:-4]) == 0 for chain in chains]):
+            return None
+        samples = []
+        for chain in chains:
+            if chain["output_filepath"] not in self.chains_samples:
+                self.chains_samples[chain["output_filepath"]] = parse_csv(chain["output_filepath"])
+            samples.append(self.chains_samples[chain["output_filepath"]])
+        if len(samples) == 1:
+            return samples[0]
+        return samples
+
     def read_output(self):
-        samples = self.read_output_samples(self.output_filepath)
+        samples = self._get_chains_samples()
+        if samples is None:
+            samples = self.read_output_samples(self.output_filepath)
         est = self.compute_estimates_from_samples(samples)
         if os.path.isfile(self.summary_filepath):
             try:
@@ -121,6 +149,91 @@ class CmdStanInterface(StanInterface):
         else:
             return None
 
+    def _read_chain_progress(self, chain):
+        # Read the chain's log written since the last reading, and update its progress from the last iteration line
+        with open(chain["log_filepath"], "r") as log_file:
+            log_file.seek(chain["log_position"])
+            new_output = log_file.read()
+            chain["log_position"] = log_file.tell()
+        if len(new_output) > 0:
+            iterations = CMDSTAN_ITERATION_PATTERN.findall(new_output)
+            if len(iterations) > 0:
+                chain["iteration"], chain["iterations"] = [int(iteration) for iteration in iterations[-1]]
+                return True
+        return False
+
+    def _finalize_chain(self, chain, parse_outputs):
+        self._read_chain_progress(chain)
+        chain["elapsed"] = time.time() - chain["start_time"]
+        chain["returncode"] = chain["process"].returncode
+        if chain["returncode"] == 0:
+            chain["status"] = "done"
+            self.logger.info("Chain/run " + str(chain["id"]) + " finished in " + str(chain["elapsed"]) + " sec!")
+            if parse_outputs:
+                try:
+                    self.chains_samples[chain["output_filepath"]] = parse_csv(chain["output_filepath"])
+                except:
+                    warning("Reading output of chain/run " + str(chain["id"]) + " failed! " +
+                            "It will be read again with the rest of the output.", self.logger)
+        else:
+            chain["status"] = "failed"
+            warning("Chain/run " + str(chain["id"]) + " failed with exit code " + str(chain["returncode"]) +
+                    " after " + str(chain["elapsed"]) + " sec! See " + chain["log_filepath"] + " for details.",
+                    self.logger)
+        del chain["process"]
+
+    def run_chains(self, run_command, poll_interval=1.0, parse_outputs=True):
+        """
+        Run each chain/run of a fit as a separate process, monitor its progress,
+        and parse its output as soon as it finishes, while the rest of the chains/runs are still running.
+        The progress, start time and elapsed time (in sec) of each chain/run is kept in self.chains_progress,
+        and the parsed samples in self.chains_samples.
+        :param run_command: the command of a single chain/run, as generated by generate_cmdstan_run_command
+        :param poll_interval: time (in sec) between successive checks of the chains/runs
+        :param parse_outputs: if True, parse the output file of each chain/run when it finishes
+        :return: the time (in sec) required for all chains/runs
+        """
+        tic = time.time()
+        os.chmod(self.model_path, os.stat(self.model_path).st_mode | 0o111)
+        self.chains_progress = []
+        self.chains_samples = OrderedDict()
+        for chain_id in range(1, self.options["n_chains_or_runs"] + 1):
+            command = generate_cmdstan_chain_command(run_command, chain_id, self.options,
+                                                     self.output_filepath, self.diagnostic_filepath)
+            output_filepath = self.output_filepath[:-4] + str(chain_id) + ".csv"
+            # The log file should not match the output files' wildcard
+            log_filepath = os.path.join(os.path.dirname(output_filepath),
+                                        "chain" + str(chain_id) + "_" + os.path.basename(output_filepath)[:-4] + ".log")
+            with open(log_filepath, "w") as log_file:
+                process = subprocess.Popen(command.replace("\t", ""), shell=True, stdout=log_file,
+                                           stderr=subprocess.STDOUT, universal_newlines=True)
+            self.chains_progress.append({"id": chain_id, "status": "running", "iteration": 0, "iterations": None,
+                                         "start_time": time.time(), "elapsed": None,
+                                         "output_filepath": output_filepath,
+                                         "log_filepath": log_filepath, "log_position": 0, "process": process})
+        self.logger.info("Running " + str(len(self.chains_progress)) + " chains/runs...")
+        running = list(self.chains_progress)
+        while len(running) > 0:
+            time.sleep(poll_interval)
+            progressed = False
+            for chain in list(running):
+                if chain["process"].poll() is None:
+                    progressed = self._read_chain_progress(chain) or progressed
+                else:
+                    self._finalize_chain(chain, parse_outputs)
+                    running.remove(chain)
+            if progressed:
+                self.logger.info("Chains/runs' iterations: " +
+                                 ", ".join([str(chain["id"]) + ": " + str(chain["iteration"]) + "/" +
+                                            str(chain["iterations"]) for chain in self.chains_progress]))
+        # Keep the samples in the order of the chains/runs, not in the order they finished in:
+        self.chains_samples = OrderedDict([(chain["output_filepath"], self.chains_samples[chain["output_filepath"]])
+                                           for chain in self.chains_progress
+                                           if chain["output_filepath"] in self.chains_samples])
+        if np.all([chain["status"] == "failed" for chain in self.chains_progress]):
+            raise subprocess.CalledProcessError(self.chains_progress[-1]["returncode"], run_command)
+        return time.time() - tic
+
     def fit(self, debug=0, simulate=0, return_output=True, plot_HMC=True, overwrite_output_files=False, plot_warmup=1,
             **kwargs):
         num_warmup = kwargs.get("num_warmup", 0)
@@ -134,15 +247,23 @@ class CmdStanInterface(StanInterface):
         self.fitmethod = kwargs.pop("fitmethod", self.fitmethod)
         self.fitmethod = kwargs.pop("method", self.fitmethod)
         self.set_options(**kwargs)
+        model_data_path = self.set_model_data(debug, simulate, **kwargs)
         self.command, self.output_filepath, self.diagnostic_filepath = \
-            generate_cmdstan_fit_command(self.fitmethod, self.options, self.model_path,
-                                         self.set_model_data(debug, simulate, **kwargs),
+            generate_cmdstan_fit_command(self.fitmethod, self.options, self.model_path, model_data_path,
                                          self.output_filepath, self.diagnostic_filepath)
         self.logger.info("Model fitting with " + self.fitmethod +
                          " method of model: " + self.model_path + "...")
         with open(self.command_filepath, "w") as text_file:
             text_file.write(self.command)
-        self.fitting_time = execute_command(self.command.replace("\t", ""), shell=True)[1]
+        if self.options["n_chains_or_runs"] > 1:
+            self.fitting_time = \
+                self.run_chains(generate_cmdstan_run_command(self.fitmethod, self.options, self.model_path,
+                                                             model_data_path),
+                                kwargs.get("poll_interval", 1.0), return_output)
+        else:
+            self.chains_progress = []
+            self.chains_samples = OrderedDict()
+            self.fitting_time = execute_command(self.command.replace("\t", ""), shell=True)[1]
         self.logger.info(str(self.fitting_time) + ' sec required to ' + self.fitmethod + "!")
         self.logger.info("Computing stan summary...")
         self.stan_summary()
@@ -96,8 +96,8 @@ def generate_cmdstan_options(method, **kwargs):
     return options
 
 
-def generate_cmdstan_fit_command(fitmethod, options, model_path, model_data_path, output_filepath, diagnostic_filepath,
-                                 command_path=None):
+def generate_cmdstan_run_command(fitmethod, options, model_path, model_data_path):
+    # The command of a single chain or run, without its id and output options
     command = model_path
     if isequal_string(fitmethod, "sample"):
         command += " method=sample"' \\' + "\n"
@@ -141,6 +141,21 @@ def generate_cmdstan_fit_command(fitmethod, options, model_path, model_data_path
     command += "\t\tdata file=" + model_data_path + ' \\' + "\n"
     command += "\t\tinit=" + str(options["init"]) + ' \\' + "\n"
     command += "\t\trandom seed=" + str(options["random_seed"]) + ' \\' + "\n"
+    return command
+
+
+def generate_cmdstan_chain_command(run_command, chain_id, options, output_filepath, diagnostic_filepath):
+    # The command of the chain or run with id chain_id, writing to output and diagnostic files numbered by chain_id
+    return run_command + \
+           "\t\tid=" + str(chain_id) + ' \\' + "\n" + \
+           "\t\toutput file=" + output_filepath[:-4] + str(chain_id) + ".csv" + ' \\' + "\n" + \
+           "\t\tdiagnostic_file=" + diagnostic_filepath[:-4] + str(chain_id) + ".csv" + ' \\' + "\n" + \
+           "\t\trefresh=" + str(options["refresh"])
+
+
+def generate_cmdstan_fit_command(fitmethod, options, model_path, model_data_path, output_filepath, diagnostic_filepath,
+                                 command_path=None):
+    command = generate_cmdstan_run_command(fitmethod, options, model_path, model_data_path)
     if diagnostic_filepath == "":
         diagnostic_filepath = os.path.join(os.path.dirname(output_filepath), STAN_OUTPUT_OPTIONS["diagnostic_file"])
     if options["n_chains_or_runs"] > 1:
@@ -3,6 +3,7 @@ import pickle
 from shutil import copyfile
 from abc import ABCMeta, abstractmethod
 from scipy.io import savemat, loadmat
+from scipy.special import logsumexp
 from scipy.stats import describe
 import numpy as np
 from tvb_fit.tvb_epilepsy.base.constants.config import Config
@@ -11,7 +12,7 @@ from tvb_fit.base.utils.log_error_utils import initialize_logger, warning, \
 from tvb_fit.base.utils.data_structures_utils import isequal_string, ensure_list, sort_dict, \
                                                     list_of_dicts_to_dicts_of_ndarrays, switch_levels_of_dicts_of_dicts
 from tvb_fit.io.r_file_io import rdump, rload
-from tvb_fit.io.csv import parse_csv
+from tvb_fit.io.csv import parse_csv, parse_csv_in_chunks, count_csv_rows, CSV_CHUNK_LENGTH
 from tvb_fit.io.h5_reader import H5Reader
 from tvb_fit.io.h5_writer import H5Writer
 
@@ -147,7 +148,8 @@ class StanInterface(object):
 
 
     def compute_information_criteria(self, samples, nparams=None, nsamples=None, ndata=None, parameters=[],
-                                     skip_samples=0, merge_chains_or_runs_flag=False, log_like_str='log_likelihood'):
+                                     skip_samples=0, merge_chains_or_runs_flag=False, log_like_str='log_likelihood',
+                                     n_processes=None):
 
         """
 
@@ -159,6 +161,7 @@ class StanInterface(object):
                            as well as for aicc, aic and bic computation
         :param merge_chains_or_runs_flag: logical flag for merging seperate chains/runs, default is True
         :param log_like_str: the name of the log likelihood output of stan, default ''log_likelihood
+        :param n_processes: number of processes for the Pareto smoothing of psis-loo, default None for no pool
         :return:
         """
 
@@ -239,7 +242,7 @@ class StanInterface(object):
             result.update(waic(log_likelihood))
 
             if nsamples > 1:
-                result.update(psisloo(log_likelihood))
+                result.update(psisloo(log_likelihood, n_processes=n_processes))
                 result["loos"] = np.reshape(result["loos"], target_shape)
                 result["ks"] = np.reshape(result["ks"], target_shape)
             else:
@@ -255,6 +258,79 @@ class StanInterface(object):
         else:
             return list_of_dicts_to_dicts_of_ndarrays(results)
 
+    def compute_information_criteria_from_files(self, output_filepaths, nparams=None, ndata=None, skip_samples=0,
+                                                merge_chains_or_runs_flag=False, log_like_str='log_likelihood',
+                                                chunk_length=CSV_CHUNK_LENGTH):
+        """
+        Streaming counterpart of compute_information_criteria, for log likelihoods that do not fit in memory.
+        The csv files are read chunk by chunk and only statistics per observation are kept in memory,
+        i.e., the maximum, the logsumexp, the mean and the variance of the log likelihood, and its largest values
+        and raw weights for psis-loo. dic is not computed, since it needs the parameters' samples.
+        :param output_filepaths: a path or a list of paths of CmdStan output csv files, one per chain/run
+        :param nparams: number of model parameters, necessary for aicc, aic and bic computation
+        :param ndata: number of data points, it can be inferred from loglikelihood if None
+        :param skip_samples: number of samples to skip at the start of each file
+        :param merge_chains_or_runs_flag: logical flag for merging seperate chains/runs, default is False
+        :param log_like_str: the name of the log likelihood output of stan, default ''log_likelihood
+        :param chunk_length: number of samples read from disk at once
+        :return: the same as compute_information_criteria, apart from dic
+        """
+
+        import sys
+        sys.path.insert(0, self.config.generic.MODEL_COMPARISON_PATH)
+        from information_criteria.ComputeIC import aicc, aic, bic
+        from information_criteria.ComputePSIS import psis_tail_length, psisloo_from_tails
+
+        output_filepaths = ensure_list(output_filepaths)
+        if merge_chains_or_runs_flag and len(output_filepaths) > 1:
+            filepaths_groups = [output_filepaths]
+        else:
+            filepaths_groups = [[filepath] for filepath in output_filepaths]
+
+        results = []
+        for filepaths in filepaths_groups:
+            nsamples = np.sum([np.maximum(count_csv_rows(filepath) - skip_samples, 0) for filepath in filepaths])
+            stats = LogLikelihoodStatistics(psis_tail_length(np.maximum(nsamples, 1)))
+            for filepath in filepaths:
+                for chunk in parse_csv_in_chunks(filepath, [log_like_str], chunk_length, skip_samples):
+                    stats.update(-1 * chunk[log_like_str])
+            if stats.nsamples == 0:
+                raise_value_error("No " + log_like_str + " samples found in files " + str(filepaths) + "!")
+
+            if ndata is None:
+                ndata = stats.ndata
+            elif ndata != stats.ndata:
+                warning("ndata (" + str(ndata) + ") is not equal to likelihood.shape[1] (" + str(stats.ndata) + ")!")
+
+            result = {"maxlike": np.max(stats.maxlike)}
+            warning("No computation of dic from streamed samples!")
+            if nparams is not None:
+                result['aicc'] = aicc(stats.maxlike, nparams, ndata)
+                result['aic'] = aic(stats.maxlike, nparams)
+                result['bic'] = bic(stats.maxlike, nparams, ndata)
+            else:
+                warning("Unknown number of parameters! No computation of aic, aaic, bic!")
+
+            result.update(stats.waic())
+
+            if stats.nsamples > 1:
+                result.update(psisloo_from_tails(stats.lw_top, stats.lw_body_sumlogs, stats.log_lik_top,
+                                                 stats.nsamples))
+                result["loos"] = np.reshape(result["loos"], stats.target_shape)
+                result["ks"] = np.reshape(result["ks"], stats.target_shape)
+            else:
+                result.pop('p_waic', None)
+
+            for metric, value in result.items():
+                result[metric] = value * np.ones(1,)
+
+            results.append(result)
+
+        if len(results) == 1:
+            return results[0]
+        else:
+            return list_of_dicts_to_dicts_of_ndarrays(results)
+
     def compare_models(self, samples, nparams=None, nsamples=None, ndata=None, parameters=[],
                        skip_samples=0, merge_chains_or_runs_flag=False, log_like_str='log_likelihood'):
 
@@ -328,3 +404,74 @@ def merge_samples(samples, skip_samples=0, flatten=False):
     else:
         return samples[0]
 
+
+class LogLikelihoodStatistics(object):
+
+    def __init__(self, n_top):
+        """
+        Statistics per observation of log likelihood samples, updated chunk by chunk of samples.
+        :param n_top: number of the largest log likelihood values and raw weights (-log likelihood) to keep
+        """
+        self.n_top = n_top
+        self.nsamples = 0
+        self.target_shape = (1,)
+        self.maxlike = None
+        self.log_lik_sumlogs = None
+        self.mean = None
+        self.m2 = None
+        self.lw_top = None
+        self.lw_body_sumlogs = None
+        self.log_lik_top = None
+
+    @property
+    def ndata(self):
+        return np.maximum(self.mean.size, 1)
+
+    def _update_top(self, top, values):
+        # Keep the n_top largest values and return the rest
+        if top is not None:
+            values = np.concatenate([top, values], axis=0)
+        n_rest = values.shape[0] - self.n_top
+        if n_rest <= 0:
+            return values, None
+        values = np.partition(values, n_rest, axis=0)
+        return values[n_rest:], values[:n_rest]
+
+    def update(self, log_lik):
+        """
+        :param log_lik: array of samples x observations (any shape) of log likelihood values
+        """
+        nsamples = log_lik.shape[0]
+        if nsamples == 0:
+            return
+        if len(log_lik.shape) > 1:
+            self.target_shape = log_lik.shape[1:]
+        log_lik = np.reshape(log_lik, (nsamples, -1))
+        mean = np.mean(log_lik, axis=0)
+        m2 = np.sum((log_lik - mean) ** 2, axis=0)
+        if self.nsamples == 0:
+            self.maxlike = np.max(log_lik, axis=0)
+            self.log_lik_sumlogs = logsumexp(log_lik, axis=0)
+            self.mean = mean
+            self.m2 = m2
+            self.lw_body_sumlogs = -np.inf * np.ones(mean.shape)
+        else:
+            self.maxlike = np.maximum(self.maxlike, np.max(log_lik, axis=0))
+            self.log_lik_sumlogs = np.logaddexp(self.log_lik_sumlogs, logsumexp(log_lik, axis=0))
+            # Merge mean and sum of squared deviations of the two sets of samples:
+            delta = mean - self.mean
+            total = self.nsamples + nsamples
+            self.m2 += m2 + delta ** 2 * self.nsamples * nsamples / total
+            self.mean += delta * nsamples / total
+        self.nsamples += nsamples
+        self.lw_top, lw_body = self._update_top(self.lw_top, -log_lik)
+        if lw_body is not None:
+            self.lw_body_sumlogs = np.logaddexp(self.lw_body_sumlogs, logsumexp(lw_body, axis=0))
+        self.log_lik_top = self._update_top(self.log_lik_top, log_lik)[0]
+
+    def waic(self):
+        # Same as ComputeIC.waic:
+        lpd = np.sum(self.log_lik_sumlogs - np.log(self.nsamples))
+        p_waic = np.sum(self.m2 / self.nsamples)
+        elpd_waic = lpd - p_waic
+        return dict(p_waic=p_waic, elpd_waic=elpd_waic, waic=-2 * elpd_waic)
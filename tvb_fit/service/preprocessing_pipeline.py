@@ -0,0 +1,106 @@
+import time
+from collections import OrderedDict
+
+from tvb_fit.base.utils.log_error_utils import initialize_logger
+
+
+class PreprocessingStep(object):
+
+    def __init__(self, name, fun, in_place=False, view=False, plot_title="", figure_name="", context=False):
+        """
+        A preprocessing step of a PreprocessingPipeline
+        :param name: name of the step, used for logging and timing
+        :param fun: function that takes a timeseries and returns the preprocessed timeseries.
+                    If in_place is True, it takes also an in_place flag, which, if True,
+                    allows the function to overwrite the data of the input timeseries
+        :param in_place: True if fun can operate in place
+        :param view: True if the timeseries returned by fun shares the data of its input timeseries,
+                     e.g., for time windows or decimation by slicing
+        :param plot_title: title of the plots of the output of this step
+        :param figure_name: name of the figures of the output of this step, to be prefixed by the pipeline's one.
+                            plot_title and figure_name can also be functions of the context of the run, called after
+                            the step has run, for names that depend on the step's parameters computed at run time.
+        :param context: True if fun takes also, after the in_place flag if any, the context of the run:
+                        a dictionary, new for each run of the pipeline, where steps keep the parameters they compute
+                        at run time, for later steps to use
+        """
+        self.name = name
+        self.fun = fun
+        self.in_place = in_place
+        self.view = view
+        self.plot_title = plot_title
+        self.figure_name = figure_name
+        self.context = context
+
+    def __call__(self, timeseries, in_place=False, context=None):
+        args = [timeseries]
+        if self.in_place:
+            args.append(in_place)
+        if self.context:
+            args.append(context)
+        return self.fun(*args)
+
+
+class PreprocessingPipeline(object):
+    logger = initialize_logger(__name__)
+
+    def __init__(self, steps=[], plotter=None, title_prefix="", logger=None):
+        """
+        A declarative sequence of timeseries preprocessing steps. Once a step has allocated a new data array,
+        all following steps that can operate in place reuse that array instead of allocating their own,
+        so that the input timeseries is never overwritten, but intermediate arrays are kept to a minimum.
+        Parameters computed at run time are passed from step to step only through the context of each run,
+        so that a pipeline can be run on any number of timeseries.
+        The output of each step is plotted only if a plotter is given, and the time of each step is kept in timings.
+        :param steps: list of PreprocessingStep instances
+        :param plotter: optional plotter, with plot_raster and plot_timeseries methods, to plot the output of each step
+        :param title_prefix: prefix of the names of the figures
+        :param logger: optional logger
+        """
+        self.steps = list(steps)
+        self.plotter = plotter
+        self.title_prefix = title_prefix
+        if logger is not None:
+            self.logger = logger
+        self.timings = OrderedDict()
+
+    def add_step(self, name, fun, in_place=False, view=False, plot_title="", figure_name="", context=False):
+        self.steps.append(PreprocessingStep(name, fun, in_place, view, plot_title, figure_name, context))
+        return self
+
+    def _plot(self, timeseries, step, context):
+        figure_name = step.figure_name
+        if callable(figure_name):
+            figure_name = figure_name(context)
+        if self.plotter and len(figure_name) > 0:
+            plot_title = step.plot_title
+            if callable(plot_title):
+                plot_title = plot_title(context)
+            if len(plot_title) == 0:
+                plot_title = step.name
+            self.plotter.plot_raster({plot_title: timeseries.squeezed}, timeseries.time,
+                                     time_units=timeseries.time_unit, special_idx=[], title=plot_title, offset=0.1,
+                                     figure_name=self.title_prefix + figure_name + "Raster",
+                                     labels=timeseries.space_labels)
+            self.plotter.plot_timeseries({plot_title: timeseries.squeezed}, timeseries.time,
+                                         time_units=timeseries.time_unit, special_idx=[], title=plot_title,
+                                         figure_name=self.title_prefix + figure_name + "TS",
+                                         labels=timeseries.space_labels)
+
+    def run(self, timeseries):
+        self.timings = OrderedDict()
+        # The input data are not ours to overwrite:
+        owns_data = False
+        context = {}
+        for i_step, step in enumerate(self.steps):
+            self.logger.info("Preprocessing step " + str(i_step + 1) + ": " + step.name + "...")
+            tic = time.time()
+            timeseries = step(timeseries, in_place=owns_data, context=context)
+            # A view of the data keeps the ownership of its base array, any other step returns new data, or ours:
+            if not step.view:
+                owns_data = True
+            self.timings[str(i_step + 1) + ". " + step.name] = time.time() - tic
+            self._plot(timeseries, step, context)
+        self.logger.info("Preprocessing timings (sec):\n" +
+                         "\n".join([name + ": " + str(timing) for name, timing in self.timings.items()]))
+        return timeseries
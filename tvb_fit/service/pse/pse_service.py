@@ -1,11 +1,28 @@
 
 from abc import abstractmethod, ABCMeta
+from multiprocessing import Pool, cpu_count
 
 import numpy as np
 
 from tvb_fit.base.utils.log_error_utils import initialize_logger, raise_value_error
 
 
+# The PSE service and the run arguments of the current parallel PSE, set once per worker process by the pool initializer
+_pse_worker_state = {}
+
+
+def _init_pse_worker(pse_service, conn_matrix, run_args):
+    _pse_worker_state["pse_service"] = pse_service
+    _pse_worker_state["conn_matrix"] = conn_matrix
+    _pse_worker_state["run_args"] = run_args
+
+
+def _run_pse_loop(iloop):
+    pse_service = _pse_worker_state["pse_service"]
+    return pse_service.run(pse_service.params_vals[iloop], _pse_worker_state["conn_matrix"],
+                           *_pse_worker_state["run_args"])
+
+
 class ABCPSEService(object):
     __metaclass__ = ABCMeta
 
@@ -40,16 +57,35 @@ class ABCPSEService(object):
             #     self.logger.warning("\nExecution of loop " + str(iloop) + " failed!")
             results.append(output)
             execution_status.append(status)
+        return self._prepare_pse_results(results, execution_status, grid_mode)
+
+    def run_pse_parallel(self, conn_matrix, grid_mode=False, n_processes=None, *kwargs):
+        # Each loop is executed on a separate process of a local pool,
+        # and the results are gathered in the order of the parameter samples
+        if n_processes is None:
+            n_processes = cpu_count()
+        n_processes = int(max(1, min(n_processes, self.n_loops)))
+        print "\nExecuting " + str(self.n_loops) + " loops on " + str(n_processes) + " processes"
+        pool = Pool(n_processes, initializer=_init_pse_worker, initargs=(self, conn_matrix, kwargs))
+        try:
+            outputs = pool.map(_run_pse_loop, range(self.n_loops),
+                               chunksize=int(np.ceil(self.n_loops / (4.0 * n_processes))))
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+        execution_status = [status for status, output in outputs]
+        results = [output for status, output in outputs]
+        return self._prepare_pse_results(results, execution_status, grid_mode)
+
+    def _prepare_pse_results(self, results, execution_status, grid_mode=False):
         if grid_mode:
             results = np.reshape(np.array(results, dtype="O"), tuple(self.n_params_vals))
             execution_status = np.reshape(np.array(execution_status), tuple(self.n_params_vals))
         return results, execution_status
 
-    @abstractmethod
-    def run_pse_parallel(self):
-        # TODO: start each loop on a separate process, gather results and return them
-        pass
-
     @abstractmethod
     def run(self, *kwargs):
         pass
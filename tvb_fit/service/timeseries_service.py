@@ -2,7 +2,7 @@
 from collections import OrderedDict
 
 import numpy as np
-from scipy.signal import decimate, convolve, detrend, hilbert
+from scipy.signal import decimate, convolve, detrend, hilbert, resample_poly, firwin
 from scipy.stats import zscore
 
 from tvb_fit.base.utils.log_error_utils import raise_value_error, initialize_logger
@@ -13,13 +13,25 @@ from tvb_fit.base.computations.analyzers_utils import abs_envelope, spectrogram_
 from tvb_fit.base.model.timeseries import TimeseriesDimensions
 
 
-def decimate_signals(signals, time, decim_ratio):
+def decimate_signals(signals, time, decim_ratio, passband_ratio=None):
+    # Anti-aliasing low pass filtering and downsampling at once, by a zero phase polyphase FIR filter.
+    # If only the band below passband_ratio * the new Nyquist frequency needs to be protected from aliasing,
+    # e.g., because it is low pass filtered afterwards anyway, a much shorter filter is enough:
+    # its transition band is allowed to span from the passband up to where the aliases of the passband start.
     if decim_ratio > 1:
-        signals = decimate(signals, decim_ratio, axis=0, zero_phase=True, ftype="fir")
-        time = decimate(time, decim_ratio, zero_phase=True, ftype="fir")
-        dt = np.mean(np.diff(time))
-        (n_times, n_signals) = signals.shape
-        return signals, time, dt, n_times
+        if passband_ratio is None:
+            signals = decimate(signals, decim_ratio, axis=0, zero_phase=True, ftype="fir")
+        else:
+            # Length of a hamming window FIR filter with a transition band of width
+            # (1 - passband_ratio) / decim_ratio of the sampling frequency:
+            n_taps = 2 * int(np.ceil(1.65 * decim_ratio / (1.0 - passband_ratio))) + 1
+            signals = resample_poly(signals, 1, decim_ratio, axis=0,
+                                    window=firwin(n_taps, 1.0 / decim_ratio, window="hamming"))
+        # The output samples correspond to every decim_ratio-th input sample:
+        time = time[::decim_ratio]
+    dt = np.mean(np.diff(time))
+    n_times = signals.shape[0]
+    return signals, time, dt, n_times
 
 
 def cut_signals_tails(signals, time, cut_tails):
@@ -32,10 +44,17 @@ def cut_signals_tails(signals, time, cut_tails):
 NORMALIZATION_METHODS = ["zscore", "mean", "minmax", "baseline", "baseline-amplitude", "baseline-std"]
 
 
-def normalize_signals(signals, normalization=None):
+def normalize_signals(signals, normalization=None, in_place=False):
+    # Unless in_place is True, the input signals are not overwritten
+    if not in_place:
+        signals = np.array(signals)
     if isinstance(normalization, basestring):
         if isequal_string(normalization, "zscore"):
-            signals = zscore(signals, axis=None)  # / 3.0
+            if in_place:
+                signals -= signals.mean()
+                signals /= signals.std()
+            else:
+                signals = zscore(signals, axis=None)  # / 3.0
         elif isequal_string(normalization, "mean"):
             signals -= (signals.mean(axis=0) * np.ones(signals.shape[1:]))
         elif isequal_string(normalization, "baseline-maxstd"):
@@ -77,6 +96,22 @@ class TimeseriesService(object):
 
         self.logger = logger
 
+    def _check_in_place(self, timeseries):
+        if not (isinstance(timeseries.data, np.ndarray) and timeseries.data.dtype.kind in "fc"):
+            raise_value_error("In place operations require timeseries data in a floating point numpy array, "
+                              "not in a " + str(type(timeseries.data)) + " of dtype " +
+                              str(getattr(timeseries.data, "dtype", None)) + "!")
+
+    def _elementwise(self, timeseries, fun, in_place=False):
+        # Apply a numpy ufunc to the timeseries' data, either writing to a new timeseries,
+        # or overwriting the data of the input timeseries, which is then returned
+        if in_place:
+            self._check_in_place(timeseries)
+            fun(timeseries.data, out=timeseries.data)
+            return timeseries
+        return timeseries.__class__(fun(timeseries.data), timeseries.dimension_labels,
+                                    timeseries.time_start, timeseries.time_step, timeseries.time_unit)
+
     def decimate(self, timeseries, decim_ratio):
         if decim_ratio > 1:
             return timeseries.__class__(timeseries.data[0:timeseries.time_length:decim_ratio],
@@ -85,10 +120,10 @@ class TimeseriesService(object):
         else:
             return timeseries
 
-    def decimate_by_filtering(self, timeseries, decim_ratio):
+    def decimate_by_filtering(self, timeseries, decim_ratio, passband_ratio=None):
         if decim_ratio > 1:
-            decim_data, decim_time, decim_dt, decim_n_times = decimate_signals(timeseries.squeezed,
-                                                                               timeseries.time, decim_ratio)
+            decim_data, decim_time, decim_dt, decim_n_times = decimate_signals(timeseries.data, timeseries.time,
+                                                                               decim_ratio, passband_ratio)
             return timeseries.__class__(decim_data, timeseries.dimension_labels,
                                         decim_time[0], decim_dt, timeseries.time_unit)
         else:
@@ -106,15 +141,20 @@ class TimeseriesService(object):
         return timeseries.__class__(np.abs(hilbert(timeseries.data, axis=0)), timeseries.dimension_labels,
                                     timeseries.time_start, timeseries.time_step, timeseries.time_unit)
 
-    def spectrogram_envelope(self, timeseries, lpf=None, hpf=None, nperseg=None):
-        data, time = spectrogram_envelope(timeseries.squeezed, timeseries.sampling_frequency, lpf, hpf, nperseg)
+    def spectrogram_envelope(self, timeseries, lpf=None, hpf=None, nperseg=None, n_processes=None):
+        data, time = spectrogram_envelope(timeseries.squeezed, timeseries.sampling_frequency, lpf, hpf, nperseg,
+                                          n_processes)
         if len(timeseries.time_unit) > 0 and timeseries.time_unit[0] == "m":
             time *= 1000
         return timeseries.__class__(data,
                                     timeseries.dimension_labels, timeseries.time_start+time[0],
                                     np.diff(time).mean(), timeseries.time_unit)
 
-    def abs_envelope(self, timeseries):
+    def abs_envelope(self, timeseries, in_place=False):
+        if in_place:
+            self._check_in_place(timeseries)
+            abs_envelope(timeseries.data, in_place=True)
+            return timeseries
         return timeseries.__class__(abs_envelope(timeseries.data), timeseries.dimension_labels,
                                     timeseries.time_start, timeseries.time_step, timeseries.time_unit)
 
@@ -122,7 +162,11 @@ class TimeseriesService(object):
         return timeseries.__class__(detrend(timeseries.data, axis=0, type=type), timeseries.dimension_labels,
                                     timeseries.time_start, timeseries.time_step, timeseries.time_unit)
 
-    def normalize(self, timeseries, normalization=None):
+    def normalize(self, timeseries, normalization=None, in_place=False):
+        if in_place:
+            self._check_in_place(timeseries)
+            normalize_signals(timeseries.data, normalization, in_place=True)
+            return timeseries
         return timeseries.__class__(normalize_signals(timeseries.data, normalization), timeseries.dimension_labels,
                                     timeseries.time_start, timeseries.time_step, timeseries.time_unit)
 
@@ -132,24 +176,21 @@ class TimeseriesService(object):
                                     timeseries.dimension_labels, timeseries.time_start, timeseries.time_step,
                                     timeseries.time_unit)
 
-    def log(self, timeseries):
-        return timeseries.__class__(np.log(timeseries.data), timeseries.dimension_labels,
-                                    timeseries.time_start, timeseries.time_step, timeseries.time_unit)
+    def log(self, timeseries, in_place=False):
+        return self._elementwise(timeseries, np.log, in_place)
 
-    def exp(self, timeseries):
-        return timeseries.__class__(np.exp(timeseries.data), timeseries.dimension_labels,
-                                    timeseries.time_start, timeseries.time_step, timeseries.time_unit)
+    def exp(self, timeseries, in_place=False):
+        return self._elementwise(timeseries, np.exp, in_place)
 
-    def abs(self, timeseries):
-        return timeseries.__class__(np.abs(timeseries.data), timeseries.dimension_labels,
-                                    timeseries.time_start, timeseries.time_step, timeseries.time_unit)
+    def abs(self, timeseries, in_place=False):
+        return self._elementwise(timeseries, np.abs, in_place)
 
     def power(self, timeseries):
-        return np.sum(self.square(self.normalize(timeseries, "mean")).squeezed, axis=0)
+        # The mean centered copy of the data can be squared in place
+        return np.sum(self.square(self.normalize(timeseries, "mean"), in_place=True).squeezed, axis=0)
 
-    def square(self, timeseries):
-        return timeseries.__class__(timeseries.data ** 2, timeseries.dimension_labels,
-                                   timeseries.time_start, timeseries.time_step, timeseries.time_unit)
+    def square(self, timeseries, in_place=False):
+        return self._elementwise(timeseries, np.square, in_place)
 
     def correlation(self, timeseries):
         return np.corrcoef(timeseries.squeezed.T)
@@ -0,0 +1,96 @@
+import numpy
+from scipy.signal import welch, periodogram, spectrogram
+from scipy.interpolate import interp1d, griddata
+from tvb_fit.base.computations.analyzers_utils import batch_spectrogram, spectrogram_envelope, spectral_analysis, \
+    time_spectral_analysis
+
+
+class TestAnalyzersUtils(object):
+    fs = 256.0
+
+    def _signals(self, n_times=2048, n_signals=5):
+        numpy.random.seed(0)
+        time = numpy.arange(n_times) / self.fs
+        return numpy.sin(2 * numpy.pi * numpy.outer(time, numpy.linspace(5.0, 50.0, n_signals))) + \
+               0.5 * numpy.random.normal(size=(n_times, n_signals))
+
+    def test_batch_spectrogram(self):
+        x = self._signals()
+        for kwargs in [{}, {"nperseg": 128, "noverlap": 64, "mode": "magnitude"}]:
+            expected = [spectrogram(xx, self.fs, **kwargs) for xx in x.T]
+            for n_processes in [None, 1, 2, 3, 10]:
+                f, t, s = batch_spectrogram(x, self.fs, n_processes, **kwargs)
+                assert s.shape == (f.size, x.shape[1], t.size)
+                for i_signal, (expected_f, expected_t, expected_s) in enumerate(expected):
+                    assert numpy.allclose(f, expected_f, rtol=1e-12, atol=1e-12)
+                    assert numpy.allclose(t, expected_t, rtol=1e-12, atol=1e-12)
+                    assert numpy.allclose(s[:, i_signal], expected_s, rtol=1e-10, atol=1e-12)
+
+    def test_spectrogram_envelope(self):
+        x = self._signals()
+        for n_processes in [None, 2]:
+            envelope, t = spectrogram_envelope(x, self.fs, lpf=40.0, hpf=10.0, nperseg=64, n_processes=n_processes)
+            assert envelope.shape == (t.size, x.shape[1])
+            for i_signal, xx in enumerate(x.T):
+                f, expected_t, s = spectrogram(xx, self.fs, nperseg=64)
+                assert numpy.allclose(t, expected_t)
+                assert numpy.allclose(envelope[:, i_signal], s[(f > 10.0) * (f < 40.0)].sum(axis=0),
+                                      rtol=1e-10, atol=1e-12)
+
+    def test_spectral_analysis(self):
+        x = self._signals()
+        freq = numpy.linspace(1.0, 120.0, 50)
+        for method, psd_fun, kwargs in [("periodogram", periodogram, {}), (welch, welch, {"nperseg": 256})]:
+            psd, output_freq = spectral_analysis(x, self.fs, freq=freq, method=method, nperseg=256)
+            assert numpy.all(output_freq == freq)
+            assert psd.shape == (freq.size, x.shape[1])
+            log_psd = spectral_analysis(x, self.fs, freq=freq, method=method, nperseg=256, log_scale=True)[0]
+            energy = spectral_analysis(x, self.fs, freq=freq, method=method, nperseg=256, output="energy")
+            for i_signal, xx in enumerate(x.T):
+                f, expected_psd = psd_fun(xx, fs=self.fs, window="hanning", scaling="spectrum", **kwargs)
+                expected_psd = interp1d(f, expected_psd)(freq)
+                assert numpy.allclose(psd[:, i_signal], expected_psd, rtol=1e-10, atol=1e-14)
+                assert numpy.allclose(log_psd[:, i_signal], numpy.log(expected_psd), rtol=1e-10, atol=1e-10)
+                assert numpy.allclose(energy[i_signal], numpy.sum(expected_psd), rtol=1e-10, atol=1e-14)
+        # The default frequencies, and the spectral density normalized per signal:
+        density, freq = spectral_analysis(x, 2 * 256.0, output="density")
+        df = freq[1] - freq[0]
+        for i_signal, xx in enumerate(x.T):
+            f, expected_psd = periodogram(xx, fs=2 * 256.0, window="hanning", scaling="spectrum")
+            expected_psd = interp1d(f, expected_psd)(freq)
+            assert numpy.allclose(density[:, i_signal], expected_psd / (numpy.sum(expected_psd) * df),
+                                  rtol=1e-10, atol=1e-14)
+
+    def _time_spectral_analysis(self, x, freq, nperseg=256, **kwargs):
+        # The spectrograms of the signals, interpolated one by one on the (time, freq) grid
+        stf = []
+        for iS in range(x.shape[1]):
+            f, t, temp_s = spectrogram(x[:, iS], fs=self.fs, nperseg=nperseg, window="hanning",
+                                       return_onesided=True, scaling='spectrum', axis=0, **kwargs)
+            t_mesh, f_mesh = numpy.meshgrid(t, f, indexing="ij")
+            temp_s = griddata((t_mesh.flatten(), f_mesh.flatten()), temp_s.T.flatten(),
+                              tuple(numpy.meshgrid(t, freq, indexing="ij")), method='linear')
+            stf.append(temp_s)
+        return numpy.stack(stf, axis=2), t
+
+    def test_time_spectral_analysis(self):
+        x = self._signals()
+        # Frequencies between those of the spectrograms, on them, and out of their range:
+        freq = numpy.concatenate([[-1.0], numpy.linspace(0.0, 128.0, 41), [128.5, 200.0]])
+        for kwargs in [{}, {"nperseg": 128, "noverlap": 100, "mode": "magnitude"}]:
+            expected_stf, expected_t = self._time_spectral_analysis(x, freq, **kwargs)
+            for n_processes in [None, 2]:
+                stf, t, output_freq = time_spectral_analysis(x, self.fs, freq=freq, calculate_psd=False,
+                                                             n_processes=n_processes, **kwargs)
+                assert stf.shape == expected_stf.shape == (t.size, freq.size, x.shape[1])
+                assert numpy.all(output_freq == freq)
+                assert numpy.allclose(t, expected_t)
+                out_of_range = numpy.isnan(expected_stf)
+                assert numpy.all(out_of_range[:, [0, -2, -1]])
+                assert not numpy.any(out_of_range[:, 1:-2])
+                assert numpy.all(numpy.isnan(stf) == out_of_range)
+                assert numpy.allclose(stf[~out_of_range], expected_stf[~out_of_range], rtol=1e-8, atol=1e-14)
+        log_stf, t, output_freq, log_psd = time_spectral_analysis(x, self.fs, freq=freq[1:-2], log_scale=True)
+        assert numpy.allclose(log_stf, numpy.log(self._time_spectral_analysis(x, freq[1:-2])[0]),
+                              rtol=1e-8, atol=1e-8)
+        assert numpy.allclose(log_psd, spectral_analysis(x, self.fs, freq=freq[1:-2], log_scale=True)[0])
@@ -0,0 +1,141 @@
+import os
+import sys
+import copy
+import subprocess
+import numpy
+import pytest
+from tvb_fit.base.config import GenericConfig
+from tvb_fit.samplers.stan import cmdstan_interface
+from tvb_fit.samplers.stan.cmdstan_interface import CmdStanInterface
+from tvb_fit.samplers.stan.stan_factory import generate_cmdstan_run_command, generate_cmdstan_chain_command, \
+    generate_cmdstan_fit_command
+from tvb_fit.tests.base import BaseTest
+
+
+# A model executable that mimics CmdStan: it logs its progress, and writes the chain's id as the samples of x,
+# after a delay that depends on the chain's id
+FAKE_MODEL = """#!%s
+import sys
+import time
+# "data file=..." and "output file=..." are split by the shell, and the output file comes last:
+args = dict([arg.split("=", 1) for arg in sys.argv[1:] if arg.find("=") > 0])
+chain_id = int(args["id"])
+num_samples = int(args["num_samples"])
+for iteration in range(1, num_samples + 1):
+    print("Iteration: %%d / %%d [%%d%%%%]  (Sampling)" %% (iteration, num_samples, 100 * iteration / num_samples))
+time.sleep(%s[chain_id - 1])
+if chain_id in %s:
+    sys.exit(3)
+with open(args["file"], "w") as output_file:
+    output_file.write("# id = " + str(chain_id) + "\\nlp__,x\\n")
+    for iteration in range(num_samples):
+        output_file.write("-1.0," + str(chain_id) + "\\n")
+"""
+
+
+class TestCmdStanInterface(BaseTest):
+
+    def _cmdstan_interface(self, failing_chains=[], n_chains_or_runs=3, num_samples=20, delays=None):
+        folder = self.config.out.FOLDER_TEMP
+        # A config of its own, with a dummy CmdStan installation:
+        config = copy.copy(self.config)
+        config.generic = GenericConfig()
+        config.generic.CMDSTAN_PATH = folder
+        open(os.path.join(folder, "runCmdStanTests.py"), "w").close()
+        model_path = os.path.join(folder, "fake_model")
+        with open(model_path, "w") as model_file:
+            model_file.write(FAKE_MODEL % (sys.executable, str(list(delays or [0.0] * n_chains_or_runs)),
+                                           str(list(failing_chains))))
+        stan_interface = CmdStanInterface(model_name="fake_model", model_dir=folder, config=config)
+        stan_interface.set_output_files(base_path=folder)
+        stan_interface.set_options(n_chains_or_runs=n_chains_or_runs, num_samples=num_samples)
+        run_command = generate_cmdstan_run_command("sample", stan_interface.options, model_path,
+                                                   os.path.join(folder, "ModelData.R"))
+        return stan_interface, run_command
+
+    def test_generate_cmdstan_chain_command(self):
+        stan_interface, run_command = self._cmdstan_interface()
+        output_filepath = stan_interface.output_filepath
+        diagnostic_filepath = stan_interface.diagnostic_filepath
+        command = generate_cmdstan_chain_command(run_command, 2, stan_interface.options,
+                                                 output_filepath, diagnostic_filepath)
+
+        assert command.startswith(run_command)
+        assert "id=2 \\\n" in command
+        assert "output file=" + output_filepath[:-4] + "2.csv \\\n" in command
+        assert "diagnostic_file=" + diagnostic_filepath[:-4] + "2.csv \\\n" in command
+        # It is the command of the same chain in the bash loop of the fit command:
+        fit_command = generate_cmdstan_fit_command("sample", stan_interface.options, stan_interface.model_path,
+                                                   os.path.join(self.config.out.FOLDER_TEMP, "ModelData.R"),
+                                                   output_filepath, diagnostic_filepath)[0]
+        assert "\t" + command + " &\n" in fit_command.replace("$i", "2")
+
+    def test_run_chains(self):
+        # The chains finish in the reverse order of their ids:
+        stan_interface, run_command = self._cmdstan_interface(delays=[1.0, 0.5, 0.0])
+        fitting_time = stan_interface.run_chains(run_command, poll_interval=0.01)
+
+        assert fitting_time > 0.0
+        assert numpy.all(numpy.diff([chain["start_time"] + chain["elapsed"]
+                                     for chain in stan_interface.chains_progress]) < 0.0)
+        assert [chain["id"] for chain in stan_interface.chains_progress] == [1, 2, 3]
+        for chain in stan_interface.chains_progress:
+            assert chain["status"] == "done"
+            assert chain["returncode"] == 0
+            assert chain["iteration"] == chain["iterations"] == 20
+            assert 0.0 <= chain["elapsed"] <= fitting_time
+            assert chain["start_time"] > 0.0
+            assert "process" not in chain
+        # The samples of each chain are parsed once it finishes, and reused when reading the output:
+        assert list(stan_interface.chains_samples.keys()) == \
+               [stan_interface.output_filepath[:-4] + str(chain_id) + ".csv" for chain_id in [1, 2, 3]]
+        samples = stan_interface.read_output()[1]
+        assert len(samples) == 3
+        for chain_id, chain_samples in enumerate(samples, 1):
+            assert chain_samples is stan_interface.chains_samples.values()[chain_id - 1]
+            assert numpy.all(chain_samples["x"] == chain_id)
+            assert chain_samples["x"].shape == (20,)
+
+    def test_run_chains_failed(self):
+        stan_interface, run_command = self._cmdstan_interface(failing_chains=[2])
+        stan_interface.run_chains(run_command, poll_interval=0.01)
+
+        assert [chain["status"] for chain in stan_interface.chains_progress] == ["done", "failed", "done"]
+        assert [chain["returncode"] for chain in stan_interface.chains_progress] == [0, 3, 0]
+        failed_chain = stan_interface.chains_progress[1]
+        assert failed_chain["iteration"] == 20
+        assert failed_chain["elapsed"] >= 0.0
+        assert os.path.isfile(failed_chain["log_filepath"])
+        assert list(stan_interface.chains_samples.keys()) == \
+               [stan_interface.output_filepath[:-4] + str(chain_id) + ".csv" for chain_id in [1, 3]]
+
+        stan_interface, run_command = self._cmdstan_interface(failing_chains=[1, 2, 3])
+        with pytest.raises(subprocess.CalledProcessError):
+            stan_interface.run_chains(run_command, poll_interval=0.01)
+
+    def test_run_chains_failed_parsing(self, monkeypatch):
+        stan_interface, run_command = self._cmdstan_interface(delays=[0.5, 0.0, 0.0])
+        original_parse_csv = cmdstan_interface.parse_csv
+
+        def parse_csv(filepath):
+            if filepath.endswith("2.csv"):
+                raise IOError("Incomplete file " + filepath + "!")
+            return original_parse_csv(filepath)
+
+        monkeypatch.setattr(cmdstan_interface, "parse_csv", parse_csv)
+        stan_interface.run_chains(run_command, poll_interval=0.01)
+        monkeypatch.undo()
+
+        assert [chain["status"] for chain in stan_interface.chains_progress] == ["done", "done", "done"]
+        assert len(stan_interface.chains_samples) == 2
+        # The output that could not be parsed when its chain finished is read again, at its place:
+        samples = stan_interface.read_output()[1]
+        assert [chain_samples["x"][0] for chain_samples in samples] == [1, 2, 3]
+        assert list(stan_interface.chains_samples.keys()) == \
+               [stan_interface.output_filepath[:-4] + str(chain_id) + ".csv" for chain_id in [1, 3, 2]]
+
+        # Outputs that cannot be parsed at all are not silently left out:
+        os.remove(stan_interface.output_filepath[:-4] + "2.csv")
+        del stan_interface.chains_samples[stan_interface.output_filepath[:-4] + "2.csv"]
+        with pytest.raises(IOError):
+            stan_interface.read_output()
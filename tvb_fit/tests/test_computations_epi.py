@@ -1,5 +1,5 @@
 import numpy
-from sympy import Matrix
+from sympy import Matrix, solveset, S
 
 from tvb_fit.base.utils.log_error_utils import initialize_logger
 from tvb_fit.base.utils.data_structures_utils import assert_arrays
@@ -10,12 +10,13 @@ from tvb_fit.tvb_epilepsy.base.computation_utils.calculations_utils import \
     calc_x0cr_r, calc_x0, calc_model_x0_to_x0_val, calc_dfun, \
     calc_jac, calc_coupling, calc_coupling_diff, calc_fx1z, calc_fx1z_diff, calc_fx1_2d_taylor, calc_fx1y1_6d_diff_x1, \
     calc_fz_jac_square_taylor
+from tvb_fit.tvb_epilepsy.base.computation_utils import equilibrium_computation
 from tvb_fit.tvb_epilepsy.base.computation_utils.equilibrium_computation import calc_eq_z, calc_eq_11d, calc_eq_6d, \
-    eq_x1_hypo_x0_optimize, eq_x1_hypo_x0_optimize_fun, eq_x1_hypo_x0_optimize_jac, eq_x1_hypo_x0_linTaylor
+    calc_eq_x2, calc_eq_x2_symbol, eq_x1_hypo_x0_optimize, eq_x1_hypo_x0_optimize_fun, eq_x1_hypo_x0_optimize_jac, eq_x1_hypo_x0_linTaylor
 from tvb_fit.tvb_epilepsy.base.computation_utils.symbolic_utils import \
     symbol_vars, symbol_eqtn_x0cr_r, symbol_eqtn_coupling, \
     symbol_calc_coupling_diff, symbol_eqtn_fx1z, symbol_eqtn_fx1z_diff, symbol_eqtn_fx2y2, symbol_calc_2d_taylor, \
-    symbol_calc_fx1y1_6d_diff_x1, symbol_calc_fz_jac_square_taylor
+    symbol_calc_fx1y1_6d_diff_x1, symbol_calc_fz_jac_square_taylor, symbol_eqnt_dfun
 from tvb_fit.tvb_epilepsy.base.model.epileptor_models import EpileptorDPrealistic
 
 
@@ -23,6 +24,55 @@ from tvb_fit.tvb_epilepsy.base.model.epileptor_models import EpileptorDPrealisti
 
 
 class TestComputations(BaseTest):
+    def test_symbol_builders_cache(self):
+        dfun_lambda, dfun_sym, v = symbol_eqnt_dfun(3, 6, numpy.array([ZMODE_DEF]))
+        v["foo"] = None
+        cached_dfun_lambda, cached_dfun_sym, cached_v = symbol_eqnt_dfun(3, 6, zmode=numpy.array([ZMODE_DEF]))
+        assert cached_dfun_lambda is dfun_lambda
+        assert cached_dfun_sym is dfun_sym
+        assert "foo" not in cached_v
+        assert symbol_eqnt_dfun(3, 6, numpy.array([ZMODE_DEF]), x2_neg=True)[0] is not dfun_lambda
+        assert symbol_eqnt_dfun(4, 6, numpy.array([ZMODE_DEF]))[0] is not dfun_lambda
+
+    def _calc_eq_x2_symbol(self, Iext2, zeq, geq, s, x2_neg):
+        # The symbolic solution of each region, and of the other x2_neg, if the first is on the wrong side of -0.25
+        x2eq = []
+        for iv in range(zeq.size):
+            args = (Iext2[iv:iv + 1], zeq[iv:iv + 1], geq[iv:iv + 1], s[iv:iv + 1])
+            x2 = calc_eq_x2_symbol(*(args + (bool(x2_neg[iv]),)))[0]
+            if not x2_neg[iv] and x2 < -0.25:
+                temp = calc_eq_x2_symbol(*(args + (True,)))[0]
+                if temp < -0.25:
+                    x2 = temp
+            elif x2_neg[iv] and x2 > -0.25:
+                temp = calc_eq_x2_symbol(*(args + (False,)))[0]
+                if temp > -0.25:
+                    x2 = temp
+            x2eq.append(x2)
+        return numpy.array(x2eq)
+
+    def test_calc_eq_x2(self, monkeypatch):
+        # The symbolic solution is available also without symbolic calculations:
+        for name, symbol in zip(["solveset", "S", "symbol_eqtn_fx2y2"], [solveset, S, symbol_eqtn_fx2y2]):
+            monkeypatch.setattr(equilibrium_computation, name, symbol, raising=False)
+        n = 21
+        numpy.random.seed(0)
+        zeq = numpy.random.uniform(2.5, 4.0, (n,))
+        geq = numpy.random.uniform(0.0, 0.1, (n,))
+        s = S_DEF * numpy.ones((n,))
+        # The constant term c of the cubic x2eq ** 3 - x2eq - c = 0 of x2_neg = True covers one negative,
+        # three, and one positive real root, after which x2_neg = False is used instead:
+        c = numpy.linspace(-2.0, 2.0, n)
+        assert numpy.sum(numpy.abs(c) < 2.0 / numpy.sqrt(27.0)) >= 3
+        Iext2 = c - 2.0 * geq + 0.3 * zeq - 1.05
+        # For x2_neg = False, both signs of the constant term of x2eq ** 3 + (s - 1) * x2eq - (c - 0.25 * s) = 0:
+        assert numpy.any(c < 0.25 * s) and numpy.any(c > 0.25 * s)
+        for x2_neg in [True, False, numpy.arange(n) % 2 == 0]:
+            x2eq = calc_eq_x2(Iext2, zeq=zeq, geq=geq, s=s, x2_neg=x2_neg)[0]
+            assert x2eq.shape == (n,)
+            assert numpy.allclose(x2eq, self._calc_eq_x2_symbol(Iext2, zeq, geq, s, numpy.ones((n,)) * x2_neg),
+                                  rtol=1e-8, atol=1e-8)
+
     def test_computations(self):
         logger = initialize_logger(__name__, self.config.out.FOLDER_LOGS)
 
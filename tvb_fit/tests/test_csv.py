@@ -0,0 +1,53 @@
+import os
+import numpy
+from tvb_fit.io.csv import parse_csv, parse_csv_in_chunks, count_csv_rows
+from tvb_fit.tests.base import BaseTest
+
+
+class TestCSV(BaseTest):
+
+    def _write_cmdstan_csv(self, filename, lines):
+        test_file = os.path.join(self.config.out.FOLDER_TEMP, filename)
+        with open(test_file, "w") as fd:
+            fd.write("# model = test\n# method = sample (Default)\n")
+            fd.write("lp__,accept_stat__,x.1,x.2,M.1.1,M.2.1,M.1.2,M.2.2\n")
+            fd.write("# Adaptation terminated\n# Step size = 0.5\n# Diagonal elements of inverse mass matrix:\n# 1\n")
+            for line in lines:
+                fd.write(line + "\n")
+            fd.write("\n#  Elapsed Time: 0.1 seconds (Warm-up)\n")
+        return test_file
+
+    def test_parse_csv(self):
+        test_file = self._write_cmdstan_csv("TestParseCSV.csv",
+                                            ["-1.5,0.9,1,2,11,21,12,22", "-2.5,0.8,3,4,13,23,14,24"])
+
+        csv = parse_csv(test_file)
+
+        assert numpy.all(csv["lp__"] == numpy.array([-1.5, -2.5]))
+        assert csv["x"].shape == (2, 2)
+        assert numpy.all(csv["x"][1] == numpy.array([3.0, 4.0]))
+        assert csv["M"].shape == (2, 2, 2)
+        assert numpy.all(csv["M"][0] == numpy.array([[11.0, 21.0], [12.0, 22.0]]))
+
+    def test_parse_csv_skipping_invalid_lines(self):
+        test_file = self._write_cmdstan_csv("TestParseCSVInvalid.csv",
+                                            ["-1.5,0.9,1,2,11,21,12,22", "-2.5,0.8,3,a,13,23,14,24",
+                                             "-3.5,0.7,5,6,15", "-4.5,0.6,7,nan,17,27,18,28"])
+
+        csv = parse_csv(test_file)
+
+        assert numpy.all(csv["lp__"] == numpy.array([-1.5, -4.5]))
+        assert numpy.isnan(csv["x"][1, 1])
+
+    def test_parse_csv_in_chunks(self):
+        test_file = self._write_cmdstan_csv("TestParseCSVChunks.csv",
+                                            ["-%d.5,0.9,%d,2,11,21,12,22" % (i, i) for i in range(5)])
+
+        chunks = list(parse_csv_in_chunks(test_file, ["x", "M"], chunk_length=2, skip_rows=1))
+
+        assert count_csv_rows(test_file) == 5
+        assert [chunk["x"].shape[0] for chunk in chunks] == [2, 2]
+        assert "lp__" not in chunks[0]
+        x = numpy.concatenate([chunk["x"] for chunk in chunks])
+        assert numpy.all(x == parse_csv(test_file)["x"][1:])
+        assert chunks[1]["M"].shape == (2, 2, 2)
@@ -3,6 +3,7 @@ import numpy
 from tvb_fit.base.config import InputConfig
 from tvb_fit.base.model.virtual_patient.sensors import SensorTypes
 from tvb_fit.base.model.simulation_settings import SimulationSettings
+from tvb_fit.base.model.timeseries import Timeseries
 from tvb_fit.io.h5_reader import H5Reader
 from tvb_fit.io.h5_writer import H5Writer
 from tvb_fit.tests.base import BaseTest
@@ -94,3 +95,18 @@ class TestCustomH5Reader(BaseTest):
         assert dummy_sim_settings.monitor_type == sim_settings.monitor_type
         assert dummy_sim_settings.monitor_sampling_period == sim_settings.monitor_sampling_period
         assert dummy_sim_settings.monitor_vois.size == sim_settings.monitor_vois.size
+
+    def test_read_timeseries_lazy(self):
+        test_file = os.path.join(self.config.out.FOLDER_TEMP, "TestTimeseriesLazy.h5")
+        data = numpy.random.normal(size=(100, 3, 2))
+        ts = Timeseries(data, {"space": numpy.array(["a", "b", "c"]), "variables": numpy.array(["x1", "z"])},
+                        0.0, 1.0)
+        self.writer.write_timeseries(ts, test_file)
+
+        lazy_ts = self.reader.read_timeseries(test_file, lazy=True)
+
+        assert not isinstance(lazy_ts.data, numpy.ndarray)
+        assert lazy_ts.shape == ts.shape
+        assert numpy.all(lazy_ts.get_time_window(10, 20).data == ts.get_time_window(10, 20).data)
+        assert numpy.all(lazy_ts.get_subspace_by_labels(["c", "a"]).data == ts.get_subspace_by_labels(["c", "a"]).data)
+        assert numpy.all(lazy_ts.z.data == ts.z.data)
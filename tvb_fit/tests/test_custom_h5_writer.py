@@ -1,5 +1,7 @@
 import os
+import h5py
 import numpy
+from tvb_fit.base.model.timeseries import Timeseries
 from tvb_fit.io.h5_writer import H5Writer
 from tvb_fit.tests.base import BaseTest
 
@@ -67,6 +69,23 @@ class TestCustomH5writer(BaseTest):
 
         assert os.path.exists(test_file)
 
+    def test_write_timeseries_compressed(self):
+        test_file = os.path.join(self.config.out.FOLDER_TEMP, "TestTimeseriesCompressed.h5")
+        data = numpy.random.normal(size=(1000, 3, 2))
+        ts = Timeseries(data, {"space": numpy.array(["a", "b", "c"]), "variables": numpy.array(["x1", "z"])},
+                        0.0, 1.0)
+
+        assert not os.path.exists(test_file)
+
+        self.writer.write_timeseries(ts, test_file, chunks_time_length=100, compression="gzip")
+
+        assert os.path.exists(test_file)
+        h5_file = h5py.File(test_file, 'r', libver='latest')
+        assert h5_file["/data"].chunks == (100, 3, 2, 1)
+        assert h5_file["/data"].compression == "gzip"
+        assert numpy.all(h5_file["/data"][()] == ts.data)
+        h5_file.close()
+
     @classmethod
     def teardown_class(cls):
         head_dir = os.path.join(cls.config.out.FOLDER_TEMP, "test_head")
@@ -0,0 +1,124 @@
+from itertools import product
+import numpy
+from tvb_fit.base.computations.analyzers_utils import interval_scaling
+from tvb_fit.tvb_epilepsy.base.model.epileptor_models import EpileptorDP, EpileptorDPrealistic, EpileptorDP2D, \
+    _fz, _fz_z_neg
+from tvb_fit.tvb_epilepsy.base.computation_utils.calculations_utils import calc_jac
+
+
+class TestEpileptorModels(object):
+    n_regions = 4
+
+    def _finite_differences_jacobian(self, model, state_variables, coupling, local_coupling, step=1e-6):
+        n_vars = state_variables.shape[0]
+        jac = numpy.zeros((n_vars * self.n_regions, n_vars * self.n_regions))
+        for i_var in range(n_vars):
+            for i_region in range(self.n_regions):
+                dy = numpy.zeros(state_variables.shape)
+                dy[i_var, i_region] = step
+                jac[:, i_var * self.n_regions + i_region] = \
+                    ((model.dfun(state_variables + dy, coupling, local_coupling) -
+                      model.dfun(state_variables - dy, coupling, local_coupling)) / (2 * step)).flatten()
+        return jac
+
+    def test_jacobian(self):
+        for model in [EpileptorDP(), EpileptorDPrealistic(), EpileptorDP2D()]:
+            for zmode in [0, 1]:
+                model.zmode = numpy.array([zmode])
+                if isinstance(model, EpileptorDPrealistic):
+                    model.pmode = numpy.array([3])
+                state_variables = numpy.random.normal(0.0, 1.0, (model._nvar, self.n_regions, 1))
+                state_variables[0, :2] = -numpy.abs(state_variables[0, :2])
+                state_variables[0, 2:] = numpy.abs(state_variables[0, 2:])
+                coupling = numpy.random.normal(0.0, 1.0, (2, self.n_regions, 1))
+                jac = model.jacobian(state_variables, coupling, 0.1)
+                assert jac.shape == (model._nvar * self.n_regions, model._nvar * self.n_regions)
+                assert numpy.allclose(jac, self._finite_differences_jacobian(model, state_variables, coupling, 0.1),
+                                      atol=1e-6)
+
+    def test_jacobian_2d_calc_jac(self):
+        model = EpileptorDP2D()
+        x1 = numpy.array([-1.5, -0.5, 0.3])
+        z = numpy.array([3.0, 2.5, 4.5])
+        jac = calc_jac(x1, z, model.yc * numpy.ones(3), model.Iext1 * numpy.ones(3), model.x0 * numpy.ones(3),
+                       numpy.zeros(3), numpy.zeros((3, 3)), 2, zmode=model.zmode, x1_neg=x1 < 0.0,
+                       slope=model.slope, a=model.a, b=model.b, d=model.d, tau1=model.tau1, tau0=model.tau0)
+        assert numpy.allclose(model.jacobian(numpy.array([x1, z])[:, :, numpy.newaxis], numpy.zeros((2, 3, 1))),
+                              jac)
+
+    def _fun_slope_Iext2(self, z, g, pmode, slope, Iext2):
+        # The feedback of one node at a time
+        iz = numpy.ones(z.shape)
+        pmode = numpy.array(pmode) * iz
+        slope = numpy.array(slope) * iz
+        Iext2 = numpy.array(Iext2) * iz
+        slope_eq = numpy.array(slope) * iz
+        Iext2_eq = numpy.array(Iext2) * iz
+        for iv in range(z.size):
+            if pmode[iv] > 0:
+                if pmode[iv] == 1:
+                    xp = 1.0 / (1.0 + numpy.exp(1) ** (-10 * (z[iv] - 3.00)))
+                    xp1 = 0
+                    xp2 = 1
+                elif pmode[iv] == 2:
+                    xp = 1.0 / (1.0 + numpy.exp(1) ** (-10 * (g[iv] + 0.0)))
+                    xp1 = 0
+                    xp2 = 1
+                elif pmode[iv] == 3:
+                    xp = z[iv] * g[iv]
+                    xp1 = -0.7
+                    xp2 = 0.1
+                slope_eq[iv] = interval_scaling(xp, 1.0, slope[iv], xp1, xp2)
+                Iext2_eq[iv] = interval_scaling(xp, 0.0, Iext2[iv], xp1, xp2)
+        return slope_eq, Iext2_eq
+
+    def test_fz(self):
+        numpy.random.seed(0)
+        x1 = numpy.random.uniform(-2.0, 1.0, (self.n_regions, 1))
+        z = numpy.random.uniform(-1.5, 5.0, (self.n_regions, 1))
+        x0 = numpy.random.uniform(-3.0, -1.0, (self.n_regions, 1))
+        for zmode in [numpy.array([0]), numpy.array([1]), numpy.array([[1], [0], [0], [1]])]:
+            expected = numpy.where(zmode, 3.0 / (1.0 + numpy.exp(-10 * (x1 + 0.5))) - x0, 4 * (x1 - x0)) + \
+                       numpy.where(z < 0.0, -0.1 * z ** 7, 0.0)
+            fz = _fz(x1, x0, zmode) + _fz_z_neg(z)
+            assert fz.shape == expected.shape
+            assert numpy.allclose(fz, expected, rtol=1e-12, atol=1e-12)
+
+    def test_fun_slope_Iext2(self):
+        numpy.random.seed(0)
+        n = 20
+        z = numpy.random.uniform(2.0, 4.0, (n,))
+        g = numpy.random.uniform(-0.5, 0.5, (n,))
+        for pmode, slope, Iext2 in [(numpy.arange(n) % 4, numpy.random.uniform(0.0, 1.0, (n,)),
+                                     numpy.random.uniform(0.0, 1.0, (n,))),
+                                    (numpy.array([3]), 0.5, 0.45), (numpy.array([0]), 0.5, 0.45)]:
+            slope_eq, Iext2_eq = EpileptorDPrealistic.fun_slope_Iext2(z, g, pmode, slope, Iext2)
+            expected_slope_eq, expected_Iext2_eq = self._fun_slope_Iext2(z, g, pmode, slope, Iext2)
+            assert numpy.allclose(slope_eq, expected_slope_eq, rtol=1e-12, atol=1e-12)
+            assert numpy.allclose(Iext2_eq, expected_Iext2_eq, rtol=1e-12, atol=1e-12)
+
+    def test_mixed_modes(self):
+        numpy.random.seed(0)
+        zmode = numpy.array([[1], [0], [0], [1]])
+        pmode = numpy.array([[1], [3], [2], [3]])
+        for model in [EpileptorDP(), EpileptorDPrealistic(), EpileptorDP2D()]:
+            modes = {"zmode": [0, 1]}
+            if isinstance(model, EpileptorDPrealistic):
+                modes["pmode"] = [1, 2, 3]
+            state_variables = numpy.random.normal(0.0, 1.0, (model._nvar, self.n_regions, 1))
+            # z of both signs:
+            state_variables[model.state_variables.index("z")] = numpy.random.uniform(-1.0, 4.0, (self.n_regions, 1))
+            coupling = numpy.random.normal(0.0, 1.0, (2, self.n_regions, 1))
+            # The derivatives of each node are those of the model with the modes of the node:
+            expected_dfun = numpy.zeros(state_variables.shape)
+            for node_modes in product(*modes.values()):
+                for name, mode in zip(modes.keys(), node_modes):
+                    setattr(model, name, numpy.array([mode]))
+                nodes = numpy.ones((self.n_regions,), dtype="bool")
+                for name, mode in zip(modes.keys(), node_modes):
+                    nodes &= {"zmode": zmode, "pmode": pmode}[name][:, 0] == mode
+                expected_dfun[:, nodes] = model.dfun(state_variables, coupling, 0.1)[:, nodes]
+            model.zmode = zmode
+            if "pmode" in modes:
+                model.pmode = pmode
+            assert numpy.allclose(model.dfun(state_variables, coupling, 0.1), expected_dfun, rtol=1e-12, atol=1e-12)
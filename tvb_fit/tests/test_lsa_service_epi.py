@@ -0,0 +1,114 @@
+from copy import deepcopy
+import numpy
+from tvb_fit.tvb_epilepsy.base.computation_utils.calculations_utils import calc_fz_jac_square_taylor, \
+    calc_fz_jac_square_taylor_stack
+from tvb_fit.tvb_epilepsy.service.hypothesis_builder import HypothesisBuilder
+from tvb_fit.tvb_epilepsy.service.model_configuration_builder import ModelConfigurationBuilder
+from tvb_fit.tvb_epilepsy.service.lsa_service import LSAService
+from tvb_fit.tvb_epilepsy.service.pse.lsa_pse_service import LSAPSEService
+from tvb_fit.tests.base import BaseTest
+
+
+class TestLSAService(BaseTest):
+    n_regions = 8
+    n_samples = 5
+
+    def _prepare_model_configurations(self):
+        numpy.random.seed(0)
+        connectivity = numpy.random.uniform(0.0, 1.0, (self.n_regions, self.n_regions))
+        connectivity = connectivity + connectivity.T
+        numpy.fill_diagonal(connectivity, 0.0)
+        hypothesis = self._hypothesis(0.9)
+        model_configuration_builder = ModelConfigurationBuilder("EpileptorDP2D", connectivity)
+        model_configurations = []
+        for K_unscaled in numpy.random.uniform(1.0, 10.0, (self.n_samples,)):
+            model_configuration_builder.set_K_unscaled(K_unscaled * numpy.ones((self.n_regions,)))
+            model_configurations.append(model_configuration_builder.build_model_from_E_hypothesis(hypothesis))
+        return hypothesis, connectivity, model_configuration_builder, model_configurations
+
+    def _hypothesis(self, e_value):
+        return HypothesisBuilder(self.n_regions, self.config).set_e_hypothesis([1, 4], [e_value, 0.5]). \
+            build_hypothesis()
+
+    def test_jacobians_stack(self):
+        hypothesis, connectivity, model_configuration_builder, model_configurations = \
+            self._prepare_model_configurations()
+        for lsa_method in ["1D", "2D"]:
+            lsa_service = LSAService(lsa_method=lsa_method)
+            jacobians = lsa_service._compute_jacobians(model_configurations)
+            assert numpy.allclose(jacobians, [lsa_service._compute_jacobian(model_configuration)
+                                              for model_configuration in model_configurations],
+                                  rtol=1e-8, atol=1e-8)
+
+        zeq = numpy.array([model_configuration.zeq for model_configuration in model_configurations])
+        K = numpy.array([model_configuration.K for model_configuration in model_configurations])
+        model_configuration = model_configurations[0]
+        jacobians = calc_fz_jac_square_taylor_stack(zeq, model_configuration.yc, model_configuration.Iext1, K,
+                                                    model_configuration.connectivity)
+        for sample_zeq, sample_K, jacobian in zip(zeq, K, jacobians):
+            assert numpy.allclose(jacobian,
+                                  calc_fz_jac_square_taylor(sample_zeq, model_configuration.yc,
+                                                            model_configuration.Iext1, sample_K,
+                                                            model_configuration.connectivity),
+                                  rtol=1e-8, atol=1e-8)
+
+    def test_run_lsa_batch(self):
+        hypothesis, connectivity, model_configuration_builder, model_configurations = \
+            self._prepare_model_configurations()
+        for lsa_method, eigen_vectors_number, weighted_eigenvector_sum in \
+                [("1D", None, True), ("1D", 2, False), ("1D", self.n_regions, True), ("2D", None, True)]:
+            lsa_service = LSAService(lsa_method=lsa_method, eigen_vectors_number=eigen_vectors_number,
+                                     weighted_eigenvector_sum=weighted_eigenvector_sum)
+            lsa_propagation_strengths = lsa_service.run_lsa_batch(hypothesis, model_configurations)
+            assert lsa_propagation_strengths.shape == (self.n_samples, self.n_regions)
+            for model_configuration, lsa_propagation_strength in \
+                    zip(model_configurations, lsa_propagation_strengths):
+                # A service of its own per sample, since run_lsa updates the number of eigenvectors:
+                lsa_hypothesis = deepcopy(lsa_service).run_lsa(hypothesis, model_configuration)
+                assert numpy.allclose(lsa_propagation_strength, lsa_hypothesis.lsa_propagation_strengths,
+                                      rtol=1e-8, atol=1e-8)
+
+    def test_run_lsa_batch_per_sample(self):
+        hypothesis, connectivity, model_configuration_builder, model_configurations = \
+            self._prepare_model_configurations()
+        # Sub- and supercritical samples, with different disease regions:
+        hypotheses = [self._hypothesis(e_value) for e_value in [0.0, 0.9, 1.5, 0.0, 3.0]]
+        model_configurations = [model_configuration_builder.build_model_from_E_hypothesis(hypothesis)
+                                for hypothesis in hypotheses]
+        for lsa_method in ["auto", "1D"]:
+            for eigen_vectors_number_selection in ["auto_eigenvals", "auto_disease"]:
+                lsa_service = LSAService(lsa_method=lsa_method,
+                                         eigen_vectors_number_selection=eigen_vectors_number_selection)
+                for disease_hypotheses in [hypotheses[1], hypotheses]:
+                    lsa_propagation_strengths = lsa_service.run_lsa_batch(disease_hypotheses, model_configurations)
+                    assert lsa_service.lsa_method == lsa_method
+                    if not isinstance(disease_hypotheses, list):
+                        disease_hypotheses = [disease_hypotheses] * len(model_configurations)
+                    for hypothesis, model_configuration, lsa_propagation_strength in \
+                            zip(disease_hypotheses, model_configurations, lsa_propagation_strengths):
+                        lsa_hypothesis = deepcopy(lsa_service).run_lsa(hypothesis, model_configuration)
+                        assert numpy.allclose(lsa_propagation_strength, lsa_hypothesis.lsa_propagation_strengths,
+                                              rtol=1e-8, atol=1e-8)
+
+    def test_run_pse_batch(self):
+        hypothesis, connectivity, model_configuration_builder, model_configurations = \
+            self._prepare_model_configurations()
+        lsa_hypothesis = LSAService().run_lsa(hypothesis, model_configurations[0])
+        # The disease regions of the samples without epileptogenicity differ from those of the hypothesis:
+        pse_params = [{"path": "hypothesis.e_values", "indices": [0], "name": "Epileptogenicity",
+                       "samples": numpy.array([0.0, 0.4, 0.0, 0.9, 0.6])},
+                      {"path": "model_configuration_builder.K_unscaled", "indices": range(self.n_regions),
+                       "name": "Global coupling", "samples": numpy.random.uniform(1.0, 10.0, (self.n_samples,))}]
+        lsa_service = LSAService(eigen_vectors_number_selection="auto_disease", eigen_vectors_number=None,
+                                 weighted_eigenvector_sum=True)
+        results = LSAPSEService(hypothesis=lsa_hypothesis, params_pse=pse_params). \
+            run_pse(connectivity, False, model_configuration_builder, lsa_service)[0]
+        batch_results, execution_status = LSAPSEService(hypothesis=lsa_hypothesis, params_pse=pse_params). \
+            run_pse_batch(connectivity, False, model_configuration_builder, lsa_service)
+
+        assert numpy.all(execution_status)
+        assert len(batch_results) == len(results) == self.n_samples
+        for result, batch_result in zip(results, batch_results):
+            assert sorted(batch_result.keys()) == sorted(result.keys())
+            for key in result.keys():
+                assert numpy.allclose(batch_result[key], result[key], rtol=1e-8, atol=1e-8)
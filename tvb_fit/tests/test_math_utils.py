@@ -0,0 +1,37 @@
+import numpy
+from itertools import product
+from tvb_fit.base.computations.math_utils import compute_gain_matrix
+
+
+class TestMathUtils(object):
+
+    def _compute_gain_matrix(self, locations1, locations2, normalize=100.0, ceil=False):
+        # The inverse squared distances of one pair of locations at a time
+        n1 = locations1.shape[0]
+        n2 = locations2.shape[0]
+        projection = numpy.zeros((n1, n2))
+        for i1, i2 in product(range(n1), range(n2)):
+            projection[i1, i2] = 1 / numpy.abs(numpy.sum((locations1[i1, :] - locations2[i2, :]) ** 2))
+        if normalize:
+            projection /= numpy.percentile(projection, normalize)
+        if ceil:
+            if ceil is True:
+                ceil = 1.0
+            projection[projection > ceil] = ceil
+        return projection
+
+    def test_compute_gain_matrix(self):
+        numpy.random.seed(0)
+        locations1 = numpy.random.uniform(-50.0, 50.0, (7, 3))
+        locations2 = numpy.random.uniform(-50.0, 50.0, (5, 3))
+        for normalize, ceil in product([100.0, 95.0, False], [False, True, 0.5]):
+            gain_matrix = compute_gain_matrix(locations1, locations2, normalize=normalize, ceil=ceil)
+            expected = self._compute_gain_matrix(locations1, locations2, normalize=normalize, ceil=ceil)
+            assert gain_matrix.shape == (7, 5)
+            assert numpy.allclose(gain_matrix, expected, rtol=1e-12, atol=0.0)
+            if ceil and normalize:
+                assert numpy.any(gain_matrix == (1.0 if ceil is True else ceil))
+        # Integer locations and lists of locations:
+        locations1 = numpy.round(locations1).astype("i")
+        assert numpy.allclose(compute_gain_matrix(locations1.tolist(), locations2.tolist()),
+                              self._compute_gain_matrix(locations1, locations2), rtol=1e-12, atol=0.0)
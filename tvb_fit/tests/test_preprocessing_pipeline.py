@@ -0,0 +1,196 @@
+import numpy
+from tvb_fit.base.model.timeseries import Timeseries, TimeseriesDimensions
+from tvb_fit.service.timeseries_service import TimeseriesService, NORMALIZATION_METHODS
+from tvb_fit.service.preprocessing_pipeline import PreprocessingPipeline
+from tvb_fit.tvb_epilepsy.base.constants.model_inversion_constants import \
+    SEIZURE_LENGTH, HIGH_HPF, LOW_HPF, LOW_LPF, HIGH_LPF, WIN_LEN_RATIO
+from tvb_fit.tvb_epilepsy.top.scripts.fitting_data_scripts import build_signal_observable_pipeline, \
+    prepare_signal_observable
+
+
+class FigureNamesPlotter(object):
+
+    def __init__(self):
+        self.figure_names = []
+
+    def plot_raster(self, *args, **kwargs):
+        self.figure_names.append(kwargs["figure_name"])
+
+    def plot_timeseries(self, *args, **kwargs):
+        self.figure_names.append(kwargs["figure_name"])
+
+
+class TestPreprocessingPipeline(object):
+    ts_service = TimeseriesService()
+    on_off_set = [1000.0, 3000.0]
+
+    def _timeseries(self, n_times=4096, sampling_frequency=1024.0, time_start=0.0):
+        numpy.random.seed(0)
+        time = numpy.arange(n_times) / sampling_frequency
+        data = numpy.sin(2 * numpy.pi * 3.0 * time)[:, numpy.newaxis] * numpy.array([[1.0, 2.0, 3.0]]) + \
+               numpy.sin(2 * numpy.pi * 60.0 * time)[:, numpy.newaxis] + \
+               0.1 * numpy.random.normal(size=(n_times, 3))
+        return Timeseries(data, {TimeseriesDimensions.SPACE.value: numpy.array(["r1", "r2", "r3"])},
+                          time_start, 1000.0 / sampling_frequency)
+
+    def _baseline_preprocessing(self, data, preprocessing, seizure_length=SEIZURE_LENGTH):
+        # The sequence of calls of the original implementation of prepare_signal_observable, one step after the other
+        duration = self.on_off_set[1] - self.on_off_set[0]
+        temp_on_off = [numpy.maximum(data.time_start, self.on_off_set[0] - 2 * duration / WIN_LEN_RATIO),
+                       numpy.minimum(data.time_end, self.on_off_set[1] + 2 * duration / WIN_LEN_RATIO)]
+        data = data.get_time_window_by_units(temp_on_off[0], temp_on_off[1])
+        figure_names = ["_Selected"]
+        for i_preproc, preproc in enumerate(preprocessing):
+            if preproc == "hpf":
+                data = self.ts_service.filter(data, LOW_HPF, numpy.minimum(HIGH_HPF, 256.0), "bandpass", order=3)
+                figure_names.append("_%dHpf" % (i_preproc + 1))
+            if preproc == "mean-center":
+                data = self.ts_service.normalize(data, "mean")
+                figure_names.append("_%dMeanCentered" % (i_preproc + 1))
+            if preproc == "hilbert_envelope":
+                data = self.ts_service.hilbert_envelope(data)
+                figure_names.append("_%dhilbert_envelope" % (i_preproc + 1))
+            if preproc == "abs_envelope":
+                data = self.ts_service.abs_envelope(data)
+                figure_names.append("_%dabs_envelope" % (i_preproc + 1))
+            if preproc == "log":
+                data = self.ts_service.log(data)
+                figure_names.append("_%dLog" % (i_preproc + 1))
+            if preproc == "convolve":
+                win_len = int(numpy.round(1.0 * data.time_length / WIN_LEN_RATIO))
+                data = self.ts_service.convolve(data, win_len)
+                figure_names.append("_%d_%dpointWinConvol" % (i_preproc + 1, win_len))
+            elif preproc == "lpf":
+                data = self.ts_service.filter(data, LOW_LPF, numpy.minimum(HIGH_LPF, 512.0), "bandpass", order=3)
+                figure_names.append("_%dLpf" % (i_preproc + 1))
+        if "decimate" in preprocessing:
+            temp_duration = temp_on_off[1] - temp_on_off[0]
+            decim_ratio = numpy.maximum(1, int(numpy.round((1.0 * data.time_length / seizure_length) *
+                                                           (duration / temp_duration))))
+            if decim_ratio > 1:
+                data = self.ts_service.decimate(data, decim_ratio)
+                figure_names.append("_%d_%dxDecim" % (len(preprocessing), decim_ratio))
+        data = data.get_time_window_by_units(self.on_off_set[0], self.on_off_set[1])
+        for preproc in preprocessing:
+            if preproc in NORMALIZATION_METHODS:
+                data = self.ts_service.normalize(data, preproc)
+        return data, figure_names
+
+    def test_in_place_steps_ownership(self):
+        data = numpy.random.uniform(1.0, 2.0, (100, 3))
+        ts = Timeseries(data.copy(), {TimeseriesDimensions.SPACE.value: numpy.array(["r1", "r2", "r3"])}, 0.0, 1.0)
+        in_place_flags = []
+
+        def log(timeseries, in_place):
+            in_place_flags.append(in_place)
+            return self.ts_service.log(timeseries, in_place=in_place)
+
+        pipeline = PreprocessingPipeline()
+        pipeline.add_step("window", lambda timeseries: timeseries.get_time_window(10, 90), view=True)
+        pipeline.add_step("log", log, in_place=True)
+        pipeline.add_step("hilbert envelope", self.ts_service.hilbert_envelope)
+        pipeline.add_step("decimate", lambda timeseries: self.ts_service.decimate(timeseries, 2), view=True)
+        pipeline.add_step("log", log, in_place=True)
+        output = pipeline.run(ts)
+
+        # The steps work in place only on the data allocated by a previous step, even through a view:
+        assert in_place_flags == [False, True]
+        assert numpy.all(ts.squeezed == data)
+        expected = numpy.log(self.ts_service.hilbert_envelope(
+            self.ts_service.log(ts.get_time_window(10, 90))).data[::2])
+        assert numpy.allclose(output.data, expected)
+        assert list(pipeline.timings.keys()) == ["1. window", "2. log", "3. hilbert envelope", "4. decimate",
+                                                 "5. log"]
+
+    def test_run_context(self):
+        contexts = []
+
+        def count(timeseries, context):
+            context["count"] = context.get("count", 0) + 1
+            contexts.append(context)
+            return timeseries
+
+        pipeline = PreprocessingPipeline()
+        pipeline.add_step("count", count, context=True)
+        pipeline.add_step("log", lambda timeseries, in_place, context: count(timeseries, context), in_place=True,
+                          context=True)
+        ts = self._timeseries()
+        pipeline.run(ts)
+        pipeline.run(ts)
+        # The steps of a run share its context, which is new for each run:
+        assert contexts[0] is contexts[1]
+        assert contexts[2] is contexts[3]
+        assert contexts[0] is not contexts[2]
+        assert contexts[0]["count"] == contexts[2]["count"] == 2
+
+    def test_signal_observable_pipeline_reruns(self):
+        for preprocessing, decimate_before_lpf in \
+                [(["hpf", "mean-center", "hilbert_envelope", "log", "convolve", "decimate", "zscore"], False),
+                 (["hpf", "abs_envelope", "lpf", "decimate", "baseline-amplitude"], True),
+                 (["spectrogram", "log", "lpf", "decimate"], False)]:
+            ts = self._timeseries()
+            plotter = FigureNamesPlotter()
+            pipeline = build_signal_observable_pipeline(ts, on_off_set=self.on_off_set, preprocessing=preprocessing,
+                                                        plotter=plotter, title_prefix="Test",
+                                                        decimate_before_lpf=decimate_before_lpf)
+            outputs = [pipeline.run(ts), pipeline.run(ts)]
+            # Running the same pipeline again gives the same output, figures included:
+            assert numpy.all(outputs[1].data == outputs[0].data)
+            assert outputs[1].time_start == outputs[0].time_start
+            assert outputs[1].time_step == outputs[0].time_step
+            assert plotter.figure_names[:len(plotter.figure_names) / 2] == \
+                   plotter.figure_names[len(plotter.figure_names) / 2:]
+            # ...and other data are preprocessed as by a pipeline built for them:
+            other_ts = self._timeseries(n_times=3072, time_start=800.0)
+            expected = build_signal_observable_pipeline(other_ts, on_off_set=self.on_off_set,
+                                                        preprocessing=preprocessing,
+                                                        decimate_before_lpf=decimate_before_lpf).run(other_ts)
+            output = pipeline.run(other_ts)
+            assert output.data.shape == expected.data.shape
+            assert numpy.all(output.data == expected.data)
+            assert output.time_start == expected.time_start
+            assert output.time_step == expected.time_step
+
+    def test_signal_observable_pipeline(self):
+        for preprocessing in [["hpf", "mean-center", "hilbert_envelope", "log", "convolve", "decimate", "zscore"],
+                              ["hpf", "abs_envelope", "lpf", "decimate", "baseline-amplitude"]]:
+            ts = self._timeseries()
+            data = ts.data.copy()
+            plotter = FigureNamesPlotter()
+            pipeline = build_signal_observable_pipeline(ts, on_off_set=self.on_off_set, preprocessing=preprocessing,
+                                                        plotter=plotter, title_prefix="Test")
+            output = pipeline.run(ts)
+
+            expected, figure_names = self._baseline_preprocessing(ts, preprocessing)
+            assert numpy.all(ts.data == data)
+            assert numpy.all(output.data == expected.data)
+            assert output.time_start == expected.time_start
+            assert output.time_step == expected.time_step
+            assert plotter.figure_names == ["Test" + figure_name + suffix
+                                            for figure_name in figure_names for suffix in ["Raster", "TS"]]
+
+    def test_decimate_before_lpf(self):
+        preprocessing = ["hpf", "abs_envelope", "lpf", "decimate", "baseline-amplitude"]
+        ts = self._timeseries()
+        expected = self._baseline_preprocessing(ts, preprocessing)[0]
+        assert numpy.all(prepare_signal_observable(ts, on_off_set=self.on_off_set,
+                                                   preprocessing=preprocessing).data == expected.data)
+        # The option reaches the pipeline through prepare_signal_observable:
+        decimated_first = build_signal_observable_pipeline(ts, on_off_set=self.on_off_set,
+                                                           preprocessing=preprocessing,
+                                                           decimate_before_lpf=True).run(ts)
+        output = prepare_signal_observable(ts, on_off_set=self.on_off_set, preprocessing=preprocessing,
+                                           decimate_before_lpf=True)
+        assert numpy.all(output.data == decimated_first.data)
+        assert output.data.shape == expected.data.shape
+
+    def test_decimate_before_lpf_low_sampling_frequency(self):
+        # Too low sampling frequencies for decimation before low pass filtering fall back to filtering only:
+        for preprocessing, sampling_frequency, on_off_set in \
+                [(["abs_envelope", "lpf", "decimate"], 100.0, [10000.0, 30000.0]),
+                 (["spectrogram", "log", "lpf", "decimate"], 1024.0, self.on_off_set)]:
+            ts = self._timeseries(sampling_frequency=sampling_frequency)
+            outputs = [build_signal_observable_pipeline(ts, on_off_set=on_off_set, preprocessing=preprocessing,
+                                                        decimate_before_lpf=decimate_before_lpf).run(ts)
+                       for decimate_before_lpf in [False, True]]
+            assert numpy.all(outputs[0].data == outputs[1].data)
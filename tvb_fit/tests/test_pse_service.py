@@ -0,0 +1,93 @@
+import os
+import numpy
+import pytest
+from multiprocessing import pool
+from tvb_fit.service.pse import pse_service
+from tvb_fit.service.pse.pse_service import ABCPSEService
+
+
+class DummyPSEService(ABCPSEService):
+
+    def __init__(self, params_pse, failing_value=None):
+        super(DummyPSEService, self).__init__()
+        self.prepare_params(params_pse)
+        self.failing_value = failing_value
+
+    def run(self, params, conn_matrix, scale=1.0, **kwargs):
+        if params[0] == self.failing_value:
+            raise ValueError("Failing loop for " + str(params) + "!")
+        output = {"value": scale * numpy.dot(conn_matrix, params), "pid": os.getpid()}
+        return params[0] >= 0.0, output
+
+    def prepare_run_results(self, *kwargs):
+        pass
+
+    def update_model_config(self, params, conn_matrix=None, model_config_builder_input=None, **kwargs):
+        pass
+
+
+class TerminatedPool(pool.Pool):
+    pools = []
+
+    def __init__(self, *args, **kwargs):
+        self.terminated = False
+        super(TerminatedPool, self).__init__(*args, **kwargs)
+        TerminatedPool.pools.append(self)
+
+    def terminate(self):
+        self.terminated = True
+        super(TerminatedPool, self).terminate()
+
+
+class TestPSEService(object):
+    n_loops = 12
+    conn_matrix = numpy.array([[1.0, 2.0], [3.0, 4.0]])
+
+    def _params_pse(self):
+        numpy.random.seed(0)
+        return [{"path": "model_configuration_builder.x0", "indices": [0], "name": "x0",
+                 "samples": numpy.linspace(-1.0, 1.0, self.n_loops)},
+                {"path": "model_configuration_builder.K", "indices": [1], "name": "K",
+                 "samples": numpy.random.uniform(1.0, 10.0, (self.n_loops,))}]
+
+    def _assert_results(self, results, expected_results):
+        results = numpy.array(results).flatten()
+        expected_results = numpy.array(expected_results).flatten()
+        assert len(results) == len(expected_results) == self.n_loops
+        for result, expected_result in zip(results, expected_results):
+            assert numpy.all(result["value"] == expected_result["value"])
+
+    def test_run_pse_parallel(self):
+        pse = DummyPSEService(self._params_pse())
+        expected_results, expected_status = pse.run_pse(self.conn_matrix, False, 2.0)
+        results, execution_status = pse.run_pse_parallel(self.conn_matrix, False, 2, 2.0)
+
+        # The results of the worker processes are gathered in the order of the parameter samples:
+        self._assert_results(results, expected_results)
+        assert execution_status == expected_status
+        assert execution_status == list(pse.params_vals[:, 0] >= 0.0)
+        assert os.getpid() not in [result["pid"] for result in results]
+
+    def test_run_pse_parallel_grid_mode(self):
+        pse = DummyPSEService(self._params_pse())
+        pse.n_params_vals = [3, 4]
+        expected_results, expected_status = pse.run_pse(self.conn_matrix, True)
+        results, execution_status = pse.run_pse_parallel(self.conn_matrix, True, 2)
+
+        assert results.shape == execution_status.shape == expected_results.shape == (3, 4)
+        self._assert_results(results, expected_results)
+        assert numpy.all(execution_status == expected_status)
+
+    def test_run_pse_parallel_failed(self, monkeypatch):
+        params_pse = self._params_pse()
+        pse = DummyPSEService(params_pse, failing_value=params_pse[0]["samples"][5])
+        with pytest.raises(ValueError):
+            pse.run_pse(self.conn_matrix)
+
+        # The exception of a worker reaches the caller, after the pool is terminated:
+        monkeypatch.setattr(pse_service, "Pool", TerminatedPool)
+        with pytest.raises(ValueError):
+            pse.run_pse_parallel(self.conn_matrix, False, 2)
+        assert len(TerminatedPool.pools) == 1
+        assert TerminatedPool.pools[0].terminated
+        assert not numpy.any([worker.is_alive() for worker in TerminatedPool.pools[0]._pool])
@@ -0,0 +1,90 @@
+import sys
+import numpy
+from tvb_fit.base.config import GenericConfig
+
+sys.path.insert(0, GenericConfig.MODEL_COMPARISON_PATH)
+from information_criteria import ComputePSIS
+
+
+class TestPSIS(object):
+    n_samples = 1000
+
+    def _tail_constants(self, n, Reff=1.0):
+        # The constants of psislw:
+        cutoff_ind = - int(numpy.ceil(min(0.2 * n, 3 * numpy.sqrt(n / Reff)))) - 1
+        return cutoff_ind, numpy.log(numpy.finfo(float).tiny), 1.0 / 3
+
+    def _log_weights(self):
+        numpy.random.seed(0)
+        cutoff_ind = self._tail_constants(self.n_samples)[0]
+        # Heavy and light tailed columns, whose tails are smoothed or not:
+        lw = numpy.concatenate([numpy.random.standard_t(3, (self.n_samples, 6)) *
+                                numpy.random.uniform(0.5, 3.0, (6,)),
+                                numpy.random.normal(0.0, 0.1, (self.n_samples, 3))], axis=1)
+        # A column with ties at the cutoff:
+        ties = numpy.random.standard_t(3, (self.n_samples,))
+        sort_ind = numpy.argsort(ties)
+        ties[sort_ind[cutoff_ind - 3:cutoff_ind + 3]] = ties[sort_ind[cutoff_ind]]
+        # A column whose cutoff is raised to the smallest log weight with a positive weight:
+        raised = - 1000.0 - numpy.random.uniform(0.0, 1.0, (self.n_samples,))
+        raised[:50] = numpy.random.standard_t(3, (50,))
+        return numpy.concatenate([lw, ties[:, numpy.newaxis], raised[:, numpy.newaxis]], axis=1)
+
+    def _psislw_per_column(self, lw, Reff=1.0):
+        cutoff_ind, cutoffmin, k_min = self._tail_constants(lw.shape[0], Reff)
+        lw_out = numpy.copy(lw, order="F")
+        kss = numpy.array([ComputePSIS._psislw_column(lw_out[:, i], cutoff_ind, cutoffmin, k_min)
+                           for i in range(lw.shape[1])])
+        return lw_out, kss
+
+    def _assert_psislw(self, lw, **kwargs):
+        expected_lw, expected_kss = self._psislw_per_column(numpy.reshape(lw, (lw.shape[0], -1)))
+        lw_out, kss = ComputePSIS.psislw(lw, **kwargs)
+        assert lw_out.shape == lw.shape
+        assert numpy.allclose(lw_out, numpy.reshape(expected_lw, lw.shape), rtol=1e-10, atol=1e-10)
+        assert numpy.allclose(kss, numpy.reshape(expected_kss, numpy.shape(kss)), rtol=1e-10, atol=1e-10)
+        return kss
+
+    def test_psislw_columns(self):
+        lw = self._log_weights()
+        cutoff_ind, cutoffmin, k_min = self._tail_constants(self.n_samples)
+        x = lw - numpy.max(lw, axis=0)
+        x_sorted = numpy.sort(x, axis=0)
+        # The last two columns are smoothed one by one:
+        assert x_sorted[cutoff_ind, -2] == x_sorted[cutoff_ind + 1, -2]
+        assert x_sorted[cutoff_ind, -1] < cutoffmin
+        assert numpy.all(x_sorted[cutoff_ind, :-2] < x_sorted[cutoff_ind + 1, :-2])
+
+        kss = self._assert_psislw(lw)
+        # Both smoothed and unsmoothed columns are tested:
+        assert numpy.any(kss[:-2] >= k_min) and numpy.any(kss[:-2] < k_min)
+        self._assert_psislw(lw, n_processes=2)
+        lw_in = numpy.copy(lw, order="F")
+        lw_out = ComputePSIS.psislw(lw_in, overwrite_lw=True)[0]
+        assert lw_out is lw_in
+        assert numpy.allclose(lw_out, self._psislw_per_column(lw)[0], rtol=1e-10, atol=1e-10)
+
+    def test_psislw_1D(self):
+        lw = self._log_weights()
+        for i_col in [0, lw.shape[1] - 2, lw.shape[1] - 1]:
+            kss = self._assert_psislw(lw[:, i_col])
+            assert numpy.ndim(kss) == 0
+
+    def test_psislw_batches(self, monkeypatch):
+        lw = self._log_weights()
+        n2 = - self._tail_constants(self.n_samples)[0] - 1
+        # At most 2 columns per batch of the fit of the generalized Pareto distribution:
+        monkeypatch.setattr(ComputePSIS, "GPDFIT_BATCH_SIZE", 2 * (30 + int(numpy.sqrt(n2))) * n2)
+        self._assert_psislw(lw)
+        self._assert_psislw(lw, n_processes=3)
+        # The batched fit of the generalized Pareto distribution and its inverse cdf, column by column:
+        x2 = numpy.sort(numpy.exp(numpy.random.standard_t(3, (n2, 5))), axis=0)
+        x2 -= x2[0] * 0.99
+        k, sigma = ComputePSIS.gpdfitnew_columns(x2)
+        p = numpy.arange(0.5, n2) / n2
+        qq = ComputePSIS.gpinv_columns(p, k, sigma)
+        for i_col in range(x2.shape[1]):
+            expected_k, expected_sigma = ComputePSIS.gpdfitnew(x2[:, i_col].copy())
+            assert numpy.allclose([k[i_col], sigma[i_col]], [expected_k, expected_sigma], rtol=1e-10, atol=1e-10)
+            assert numpy.allclose(qq[:, i_col], ComputePSIS.gpinv(p, expected_k, expected_sigma),
+                                  rtol=1e-10, atol=1e-10)
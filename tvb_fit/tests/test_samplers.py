@@ -0,0 +1,102 @@
+import numpy
+import scipy.stats as ss
+from tvb_fit.samplers.sampler_base import SamplerBase
+from tvb_fit.samplers.deterministic_sampler import DeterministicSampler
+from tvb_fit.samplers.probabilistic_sampler import ProbabilisticSampler
+
+
+class TestSamplers(object):
+
+    def test_compute_stats(self):
+        numpy.random.seed(0)
+        samples = numpy.round(numpy.random.normal(1.0, 2.0, (3, 4, 200)), 1)
+
+        stats = SamplerBase().compute_stats(samples)
+
+        assert numpy.allclose(stats["mean"], samples.mean(axis=-1))
+        assert numpy.allclose(stats["std"], samples.std(axis=-1))
+        assert numpy.allclose(stats["skew"], ss.skew(samples, axis=-1))
+        assert numpy.allclose(stats["kurt"], ss.kurtosis(samples, axis=-1))
+        assert numpy.allclose(stats["median"], numpy.median(samples, axis=-1))
+        for key, q in zip(["1%", "p25", "p95"], [1, 25, 95]):
+            assert numpy.allclose(stats[key], numpy.percentile(samples, q, axis=-1))
+        assert numpy.all(stats["min"] == samples.min(axis=-1))
+        assert stats["mode"].shape == (3, 4, 1)
+        assert numpy.all(stats["mode"][1, 2] == ss.mode(samples[1, 2])[0])
+
+        # The statistics of samples with NaNs are NaN, except for the mode of the rest of the samples:
+        samples[0, 1, [5, 100]] = numpy.nan
+        samples[2, 3, 0] = numpy.nan
+        nan_samples = numpy.isnan(samples).any(axis=-1)
+        stats = SamplerBase().compute_stats(samples)
+        for key, q in zip(["min", "1%", "5%", "10%", "p25", "median", "p50", "p75", "p90", "p95", "p99", "max"],
+                          [0, 1, 5, 10, 25, 50, 50, 75, 90, 95, 99, 100]):
+            assert numpy.all(numpy.isnan(stats[key]) == nan_samples)
+            assert numpy.allclose(stats[key][~nan_samples], numpy.percentile(samples[~nan_samples], q, axis=-1))
+        for key in ["mean", "std", "var", "skew", "kurt"]:
+            assert numpy.all(numpy.isnan(stats[key]) == nan_samples)
+        assert numpy.all(stats["mode"][0, 1] == ss.mode(samples[0, 1][~numpy.isnan(samples[0, 1])])[0])
+
+    def test_space_filling_samplers(self):
+        def sample(sampler):
+            return sampler.generate_samples(low=[1.0, 10.0, 100.0], high=[2.0, 20.0, 200.0], shape=(3,))
+
+        for sampler in ["latin", "sobol", "halton"]:
+            for scramble in [False, True]:
+                deterministic_sampler = DeterministicSampler(n_samples=64, sampler=sampler, scramble=scramble,
+                                                             random_seed=0)
+                samples = sample(deterministic_sampler)
+                assert samples.shape == (3, 64)
+                assert numpy.all(samples >= numpy.array([[1.0], [10.0], [100.0]]))
+                assert numpy.all(samples < numpy.array([[2.0], [20.0], [200.0]]))
+                if sampler != "halton":
+                    # Latin hypercube and Sobol samples of 2 ** m points are stratified in each dimension:
+                    strata = numpy.floor(64 * (samples - numpy.array([[1.0], [10.0], [100.0]])) /
+                                         numpy.array([[1.0], [10.0], [100.0]]))
+                    assert numpy.all(numpy.sort(strata, axis=1) == numpy.arange(64))
+                assert numpy.all(samples == sample(DeterministicSampler(n_samples=64, sampler=sampler,
+                                                                        scramble=scramble, random_seed=0)))
+            # Without a seed, samples are reproducible by default, or from the seed drawn by the sampler:
+            deterministic_sampler = DeterministicSampler(n_samples=64, sampler=sampler)
+            assert numpy.all(sample(deterministic_sampler) ==
+                             sample(DeterministicSampler(n_samples=64, sampler=sampler,
+                                                         random_seed=deterministic_sampler.random_seed)))
+            deterministic_sampler = DeterministicSampler(n_samples=64, sampler=sampler, scramble=True)
+            assert deterministic_sampler.random_seed is not None
+            assert numpy.all(sample(deterministic_sampler) ==
+                             sample(DeterministicSampler(n_samples=64, sampler=sampler, scramble=True,
+                                                         random_seed=deterministic_sampler.random_seed)))
+        assert DeterministicSampler(n_samples=64, sampler="sobol").random_seed is None
+
+    def test_probabilistic_sampler_random_streams(self):
+        def sample(sampler):
+            return sampler.generate_samples(parameter=(0.0, 1.0), probability_distribution="norm", low=-1.0, shape=(2,))
+
+        numpy.random.seed(0)
+        global_state = numpy.random.get_state()
+        sampler = ProbabilisticSampler(n_samples=10, random_seed=1)
+        samples1 = sample(sampler)
+        samples2 = sample(sampler)
+        # The global random state is left untouched:
+        state = numpy.random.get_state()
+        assert state[0] == global_state[0]
+        assert numpy.all(state[1] == global_state[1])
+        assert state[2:] == global_state[2:]
+        assert numpy.all(samples1 != samples2)
+        assert numpy.all(sample(ProbabilisticSampler(n_samples=10, random_seed=1)) == samples1)
+
+        children = ProbabilisticSampler(n_samples=10, random_seed=1).spawn(2)
+        # Spawned streams are independent of each other and of the execution order:
+        samples_child1 = sample(children[1])
+        assert numpy.all(samples_child1 != sample(children[0]))
+        assert numpy.all(samples_child1 == sample(ProbabilisticSampler(n_samples=10, random_seed=1).spawn(2)[1]))
+
+        # Without a seed, the samples of the sampler and of its spawned ones are reproduced from the seed drawn:
+        sampler = ProbabilisticSampler(n_samples=10)
+        assert sampler.random_seed is not None
+        samples = sample(sampler)
+        samples_children = [sample(child) for child in sampler.spawn(2)]
+        sampler = ProbabilisticSampler(n_samples=10, random_seed=sampler.random_seed)
+        assert numpy.all(sample(sampler) == samples)
+        for child, samples_child in zip(sampler.spawn(2), samples_children):
+            assert numpy.all(sample(child) == samples_child)
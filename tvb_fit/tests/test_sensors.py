@@ -0,0 +1,61 @@
+import numpy
+from tvb_fit.base.utils.data_structures_utils import split_string_text_numbers, labels_to_inds
+from tvb_fit.base.model.virtual_patient.sensors import Sensors
+
+
+class TestSensors(object):
+    # Unsorted labels of electrodes with and without primes, of one and two digit contacts, and a duplicate label:
+    labels = numpy.array(["B'2", "A1", "B'1", "A'3", "A2", "C10", "A'1", "C2", "B'3", "A10", "A'2", "A1"])
+
+    def _sensors(self, labels):
+        return Sensors(labels, numpy.zeros((len(labels), 3)))
+
+    def _group_sensors_to_electrodes(self, labels):
+        # The grouping with one search per electrode
+        sensor_names = numpy.array(split_string_text_numbers(labels))
+        elec_labels = numpy.unique(sensor_names[:, 0])
+        elec_inds = []
+        for chlbl in elec_labels:
+            elec_inds.append(numpy.where(sensor_names[:, 0] == chlbl)[0])
+        return elec_labels, elec_inds
+
+    def _assert_electrodes(self, sensors, labels):
+        expected_elec_labels, expected_elec_inds = self._group_sensors_to_electrodes(labels)
+        for elec_labels, elec_inds in [sensors.group_sensors_to_electrodes(labels), sensors._get_electrodes()]:
+            assert list(elec_labels) == list(expected_elec_labels)
+            assert len(elec_inds) == len(expected_elec_inds)
+            for inds, expected_inds in zip(elec_inds, expected_elec_inds):
+                assert list(inds) == list(expected_inds)
+        assert sensors.number_of_electrodes == len(expected_elec_labels)
+
+    def _assert_labels_index(self, sensors, labels):
+        for lbls in [labels[0], list(labels[3:7]), ["A1", "B'3-B'2", "X1"], list(labels)]:
+            assert list(sensors.get_sensors_inds_by_sensors_labels(lbls)) == \
+                   list(labels_to_inds(labels, [lbl.split("-")[0] for lbl in numpy.atleast_1d(lbls)]))
+        assert sensors.sensor_label_to_index(labels[5:6]) == 5
+        assert sensors.sensor_label_to_index(labels) == [numpy.where(labels == label)[0][0] for label in labels]
+
+    def test_group_sensors_to_electrodes(self):
+        sensors = self._sensors(self.labels)
+        self._assert_electrodes(sensors, self.labels)
+        self._assert_labels_index(sensors, self.labels)
+        assert list(sensors.elec_labels) == ["A", "A'", "B'", "C"]
+        # The same labels are grouped only once:
+        assert sensors._get_electrodes()[1] is sensors._get_electrodes()[1]
+        assert sensors._get_labels_index() is sensors._get_labels_index()
+
+    def test_labels_reassignment(self):
+        sensors = self._sensors(self.labels)
+        self._assert_labels_index(sensors, self.labels)
+        elec_inds = sensors._get_electrodes()[1]
+        labels_index = sensors._get_labels_index()
+        # Other labels, and the same labels in another array, invalidate the caches:
+        for labels in [numpy.array(["D1", "D'2", "E3", "D3", "E1", "D'1", "D2", "E2", "D10", "F1", "D'3", "E4"]),
+                       self.labels.copy()]:
+            sensors.labels = labels
+            self._assert_electrodes(sensors, labels)
+            self._assert_labels_index(sensors, labels)
+            assert sensors._get_electrodes()[1] is not elec_inds
+            assert sensors._get_labels_index() is not labels_index
+            elec_inds = sensors._get_electrodes()[1]
+            labels_index = sensors._get_labels_index()
@@ -0,0 +1,56 @@
+import os
+import numpy
+from tvb_fit.io.csv import parse_csv
+from tvb_fit.samplers.stan.stan_interface import StanInterface
+from tvb_fit.tests.base import BaseTest
+
+
+class DummyStanInterface(StanInterface):
+
+    def compile_stan_model(self, save_model=True, **kwargs):
+        pass
+
+    def set_model_from_file(self, **kwargs):
+        pass
+
+    def fit(self, model_data, **kwargs):
+        pass
+
+
+class TestStanInterface(BaseTest):
+
+    def _write_chains_csv(self, n_chains=3, n_samples=300, n_data=6):
+        numpy.random.seed(0)
+        header = ["lp__", "x"] + ["log_likelihood." + str(i_data + 1) + ".1" for i_data in range(n_data)]
+        filepaths = []
+        for chain_id in range(1, n_chains + 1):
+            # Heavy tailed log likelihoods, so that the Pareto smoothing of psis-loo is at work:
+            log_likelihood = 3.0 - numpy.random.standard_t(4, (n_samples, n_data)) * \
+                                   numpy.random.uniform(0.2, 2.0, (n_data,))
+            filepath = os.path.join(self.config.out.FOLDER_TEMP, "TestChains" + str(chain_id) + ".csv")
+            with open(filepath, "w") as fd:
+                fd.write("# model = test\n# method = sample (Default)\n")
+                fd.write(",".join(header) + "\n")
+                fd.write("# Adaptation terminated\n# Step size = 0.5\n")
+                for i_sample, sample in enumerate(log_likelihood):
+                    fd.write(",".join(["-1.0", str(0.1 * i_sample)] + ["%.17g" % value for value in sample]) + "\n")
+                fd.write("\n#  Elapsed Time: 0.1 seconds (Warm-up)\n")
+            filepaths.append(filepath)
+        return filepaths
+
+    def test_compute_information_criteria_from_files(self):
+        stan_interface = DummyStanInterface(model_name="Test", config=self.config)
+        filepaths = self._write_chains_csv()
+        samples = [parse_csv(filepath) for filepath in filepaths]
+        for merge_chains_or_runs_flag in [False, True]:
+            expected = stan_interface.compute_information_criteria(
+                samples, nparams=10, parameters=["x"], skip_samples=50,
+                merge_chains_or_runs_flag=merge_chains_or_runs_flag)
+            # 250 samples per file are read in chunks of 64 samples:
+            results = stan_interface.compute_information_criteria_from_files(
+                filepaths, nparams=10, skip_samples=50, merge_chains_or_runs_flag=merge_chains_or_runs_flag,
+                chunk_length=64)
+            assert sorted(results.keys()) == sorted([key for key in expected.keys() if key != "dic"])
+            for key, value in results.items():
+                assert numpy.array(value).shape == numpy.array(expected[key]).shape
+                assert numpy.allclose(value, expected[key], rtol=1e-10, atol=1e-10)
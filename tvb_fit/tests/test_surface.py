@@ -0,0 +1,23 @@
+import numpy
+from tvb_fit.base.model.virtual_patient.surface import Surface
+
+
+class TestSurface(object):
+    # A unit octahedron, whose vertex normals are its vertices' positions
+    vertices = numpy.array([[1.0, 0.0, 0.0], [-1.0, 0.0, 0.0], [0.0, 1.0, 0.0],
+                            [0.0, -1.0, 0.0], [0.0, 0.0, 1.0], [0.0, 0.0, -1.0]])
+    triangles = numpy.array([[0, 2, 4], [2, 1, 4], [1, 3, 4], [3, 0, 4],
+                             [2, 0, 5], [1, 2, 5], [3, 1, 5], [0, 3, 5]])
+
+    def test_vertex_normals(self):
+        surface = Surface(self.vertices, self.triangles)
+
+        assert numpy.allclose(surface.vertex_normals, self.vertices)
+
+    def test_vertex_areas(self):
+        surface = Surface(self.vertices, self.triangles)
+        vertex_areas = surface.get_vertex_areas()
+
+        assert vertex_areas.shape == (6,)
+        assert numpy.allclose(vertex_areas, 4 * numpy.sqrt(3) / 2 / 3)
+        assert numpy.allclose(vertex_areas.sum(), surface.compute_surface_area())
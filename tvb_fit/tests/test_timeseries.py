@@ -196,3 +196,29 @@ class TestTimeseries(object):
                            time_start=self.time_start, time_step=self.time_step, time_unit=self.time_unit)
         assert ts_4D.data.shape == (3, 4, 3, 4)
         assert ts_4D.x1.data.shape == (3, 4, 1, 4)
+
+    def test_timeseries_labels_index(self):
+        ts = Timeseries(self.data_3D,
+                        dimension_labels={TimeseriesDimensions.SPACE.value: numpy.array(["r1", "r2", "r3", "r4"]),
+                                          TimeseriesDimensions.VARIABLES.value: numpy.array(["sv1", "sv2", "sv3"])},
+                        time_start=self.time_start, time_step=self.time_step, time_unit=self.time_unit)
+        assert ts._get_indices_for_labels(["r3", "r1"]) == [2, 0]
+        assert ts._get_index_of_state_variable("sv2") == 1
+
+        # The labels' indices are passed on when the labels of a dimension do not change...
+        ts_time_window = ts.get_time_window(0, 2)
+        assert ts_time_window._labels_index[TimeseriesDimensions.SPACE.value][1] is \
+               ts._labels_index[TimeseriesDimensions.SPACE.value][1]
+        ts_sv2 = ts.get_state_variable("sv2")
+        assert ts_sv2._labels_index[TimeseriesDimensions.SPACE.value][1] is \
+               ts._labels_index[TimeseriesDimensions.SPACE.value][1]
+        assert ts_sv2.r4.data.shape == (3, 1, 1, 1)
+
+        # ...and rebuilt when they are replaced
+        ts_r3r1 = ts.get_subspace_by_labels(["r3", "r1"])
+        assert ts_r3r1._get_indices_for_labels(["r1"]) == [1]
+        ts.dimension_labels[TimeseriesDimensions.SPACE.value] = numpy.array(["r4", "r3", "r2", "r1"])
+        assert ts._get_indices_for_labels(["r1"]) == [3]
+
+        with pytest.raises(IndexError):
+            ts._get_indices_for_labels(["r5"])
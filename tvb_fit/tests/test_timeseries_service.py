@@ -0,0 +1,54 @@
+import numpy
+import pytest
+from tvb_fit.base.model.timeseries import Timeseries, TimeseriesDimensions
+from tvb_fit.service.timeseries_service import TimeseriesService
+
+
+class TestTimeseriesService(object):
+    ts_service = TimeseriesService()
+
+    def _timeseries(self, data):
+        return Timeseries(data, {TimeseriesDimensions.SPACE.value: numpy.array(["r1", "r2", "r3"])}, 0.0, 1.0)
+
+    def test_normalize(self):
+        data = numpy.random.normal(1.0, 2.0, (100, 3))
+        ts = self._timeseries(data.copy())
+
+        ts_normalized = self.ts_service.normalize(ts, "zscore")
+        assert ts_normalized is not ts
+        assert numpy.all(ts.squeezed == data)
+
+        ts_in_place = self.ts_service.normalize(ts, "zscore", in_place=True)
+        assert ts_in_place is ts
+        assert numpy.allclose(ts_in_place.data, ts_normalized.data)
+
+        ts_abs_envelope = self.ts_service.abs_envelope(ts)
+        assert numpy.allclose(ts.squeezed, ts_normalized.squeezed)
+        assert numpy.allclose(self.ts_service.abs_envelope(ts, in_place=True).data, ts_abs_envelope.data)
+
+    def test_elementwise_in_place(self):
+        data = numpy.random.uniform(1.0, 2.0, (100, 3))
+        ts = self._timeseries(data.copy())
+
+        ts_log = self.ts_service.log(ts)
+        assert self.ts_service.log(ts, in_place=True) is ts
+        assert numpy.allclose(ts.data, ts_log.data)
+        assert numpy.allclose(self.ts_service.square(ts, in_place=True).squeezed, numpy.log(data) ** 2)
+
+        with pytest.raises(ValueError):
+            self.ts_service.square(self._timeseries(numpy.ones((10, 3), dtype="i")), in_place=True)
+
+    def test_decimate_by_filtering(self):
+        time = numpy.arange(4000.0)
+        data = numpy.sin(2 * numpy.pi * 0.002 * time)[:, numpy.newaxis] * numpy.ones((1, 3)) + \
+               numpy.sin(2 * numpy.pi * 0.4 * time)[:, numpy.newaxis]
+        ts = self._timeseries(data)
+
+        for passband_ratio in [None, 0.2]:
+            ts_decim = self.ts_service.decimate_by_filtering(ts, 10, passband_ratio)
+            assert ts_decim.time_length == 400
+            assert ts_decim.time_start == 0.0
+            assert ts_decim.time_step == 10.0
+            # The low frequency component is kept, whereas the high frequency one is filtered out:
+            assert numpy.allclose(ts_decim.squeezed[50:-50],
+                                  numpy.sin(2 * numpy.pi * 0.002 * time[500:-500:10])[:, numpy.newaxis], atol=0.01)
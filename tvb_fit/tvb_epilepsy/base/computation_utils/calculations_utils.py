@@ -655,6 +655,17 @@ def calc_fz_jac_square_taylor(zeq, yc, Iext1, K, w, a=A_DEF, b=B_DEF, d=D_DEF, t
         return eqtn_fz_square_taylor(zeq, yc, Iext1, K, w, tau1, tau0)
 
 
+def calc_fz_jac_square_taylor_stack(zeq, yc, Iext1, K, w, tau1=TAU1_DEF, tau0=TAU0_DEF):
+    # zeq: (n_samples, n_regions) stack of equilibria, w: (n_regions, n_regions) or (n_samples, n_regions, n_regions),
+    # and all other parameters broadcastable to zeq's shape
+    zeq = np.array(zeq, dtype="float64")
+    shape = zeq.shape
+    yc, Iext1, K, tau1, tau0 = [np.ones(shape) * np.array(param, dtype="float64")
+                                for param in [yc, Iext1, K, tau1, tau0]]
+    w = np.ones((shape[0], shape[1], shape[1])) * np.array(w, dtype="float64")
+    return eqtn_fz_square_taylor_stack(zeq, yc, Iext1, K, w, tau1, tau0)
+
+
 def calc_fpop2(x2, y2=0.0, z=0.0, g=0.0, Iext2=I_EXT2_DEF, s=S_DEF, tau1=TAU1_DEF, tau2=1.0, x2_neg=None, shape=None,
                calc_mode="non_symbol"):
     return calc_fx2(x2, y2, z, g, Iext2, tau1, shape, calc_mode), \
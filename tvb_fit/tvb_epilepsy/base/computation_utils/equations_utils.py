@@ -131,8 +131,8 @@ def eqtn_jac_x1_2d(x1, z, slope, a, b, d, tau1, x1_neg=True):
     b = b - d
     jac_x1 = np.diag(
         np.multiply(np.where(x1_neg, np.multiply(-3.0 * np.multiply(a, x1) + 2.0 * np.multiply(b, 1.0), x1),
-                             + else_ydot0_2d(x1, z, slope, d)), tau1).flatten())
-    jac_z = - np.diag(np.multiply(np.ones(x1.shape, dtype=x1.dtype) +
+                             else_ydot0_2d(x1, z, slope, d) - np.multiply(d, x1)), tau1).flatten())
+    jac_z = - np.diag(np.multiply(np.ones(x1.shape, dtype=x1.dtype) -
                                   np.where(x1_neg, 0.0, 1.2 * np.multiply(z - 4.0, x1)), tau1).flatten())
     return np.concatenate([jac_x1, jac_z], axis=1)
 
@@ -193,7 +193,7 @@ def eqtn_jac_fz_2d(x1, z, tau1, tau0, zmode=np.array([ZMODE_DEF]), z_pos=True, K
             jac_z -= 0.7 * np.power(z, 6.0)
     elif np.any(zmode == 1):
         jac_x1 = np.divide(30 * np.power(np.exp(1), (-10.0 * (x1 + 0.5))),
-                           1 + np.power(np.exp(1), (-10.0 * (x1 + 0.5))))
+                           np.power(1 + np.power(np.exp(1), (-10.0 * (x1 + 0.5))), 2))
     else:
         raise_value_error('zmode is neither [0] nor [1]')
     # Assuming that wii = 0
@@ -346,3 +346,17 @@ def eqtn_fz_square_taylor(zeq, yc, Iext1, K, w, tau1, tau0):
     except:
         pass
     return np.multiply(fz_jac, tau)
+
+
+def eqtn_fz_square_taylor_stack(zeq, yc, Iext1, K, w, tau1, tau0):
+    # Same as eqtn_fz_square_taylor for a stack of n_samples sets of equilibria and parameters, i.e.,
+    # zeq, yc, Iext1, K, tau1, tau0 of shape (n_samples, n_regions) and w of shape (n_samples, n_regions, n_regions)
+    n_regions = zeq.shape[1]
+    tau = np.divide(tau1, tau0)
+    dfz = -np.divide(0.5, np.power(2.0 * (zeq - yc - Iext1) + 64.0 / 27.0, 0.5))
+    # Off diagonal elements (wii are also subtracted from the diagonal elements): -K_i * wij * dfz_j
+    fz_jac = -np.expand_dims(K, 2) * np.expand_dims(dfz, 1) * w
+    # Diagonal elements: -1 + dfz_i * (4 + K_i * sum_j_not_i{wij})
+    diag_inds = np.arange(n_regions)
+    fz_jac[:, diag_inds, diag_inds] += -1.0 + dfz * (4.0 + K * np.sum(w, axis=2))
+    return fz_jac * np.expand_dims(tau, 2)
@@ -90,6 +90,20 @@ def calc_eq_g(x1eq, gamma=GAMMA_DEF):
     return calc_fg(x1eq, 0.0, gamma, tau1=1.0)
 
 
+def calc_eq_x2_symbol(Iext2, zeq, geq, s=S_DEF, x2_neg=True):
+    # Per region symbolic solution, to be used only for validation purposes
+    n = zeq.size
+    fx2y2, v = symbol_eqtn_fx2y2(n, x2_neg)[1:]
+    fx2y2 = fx2y2.tolist()
+    x2eq = []
+    for iv in range(n):
+        fx2y2[iv] = fx2y2[iv].subs([(v["z"][iv], zeq[iv]), (v["g"][iv], geq[iv]), (v["Iext2"][iv], Iext2[iv]),
+                                    (v["s"][iv], s[iv]), (v["tau1"][iv], 1.0)])
+        fx2y2[iv] = list(solveset(fx2y2[iv], v["x2"][iv], S.Reals))
+        x2eq.append(numpy.min(numpy.array(fx2y2[iv], dtype=zeq.dtype)))
+    return numpy.array(x2eq)
+
+
 def calc_eq_x2(Iext2, y2eq=None, zeq=None, geq=None, x1eq=None, s=S_DEF, x2_neg=True):
     if geq is None:
         geq = calc_eq_g(x1eq)
@@ -97,121 +111,88 @@ def calc_eq_x2(Iext2, y2eq=None, zeq=None, geq=None, x1eq=None, s=S_DEF, x2_neg=
     shape = zeq.shape
     n = zeq.size
     zeq, geq, Iext2, s = assert_arrays([zeq, geq, Iext2, s], (n,))
-    if CalculusConfig.SYMBOLIC_CALCULATIONS_FLAG:
-        fx2y2, v = symbol_eqtn_fx2y2(n, x2_neg)[1:]
-        fx2y2 = fx2y2.tolist()
-        x2eq = []
-        for iv in range(n):
-            fx2y2[iv] = fx2y2[iv].subs([(v["z"][iv], zeq[iv]), (v["g"][iv], geq[iv]), (v["Iext2"][iv], Iext2[iv]),
-                                      (v["s"][iv], s[iv]), (v["tau1"][iv], 1.0)])
-            fx2y2[iv] = list(solveset(fx2y2[iv], v["x2"][iv], S.Reals))
-            x2eq.append(numpy.min(numpy.array(fx2y2[iv], dtype=zeq.dtype)))
+    # fx2 = tau1 * (-y2 + Iext2 + 2 * g - x2 ** 3 + x2 - 0.3 * z + 1.05)
+    # if x2_neg = True, so that y2eq = 0.0:
+    #   fx2 = tau1 * (Iext2 + 2 * g - x2 ** 3 + x2 - 0.3 * z + 1.05) =>
+    #     0 = x2eq ** 3 - x2eq - (Iext2 + 2 * geq -0.3 * zeq + 1.05)
+    # if x2_neg = False , so that y2eq = s*(x2+0.25):
+    #   fx2 = tau1 * (-s * (x2 + 0.25) + Iext2 + 2 * g - x2 ** 3 + x2 - 0.3 * z + 1.05) =>
+    #   fx2 = tau1 * (-0.25 * s  + Iext2 + 2 * g - x2 ** 3 + (1 - s) * x2 - 0.3 * z + 1.05 =>
+    #     0 = x2eq ** 3 + (s - 1) * x2eq - (Iext2 + 2 * geq -0.3 * zeq - 0.25 * s + 1.05)
+    # According to http://mathworld.wolfram.com/CubicFormula.html
+    # and given that there is no square term (x2eq^2; "depressed cubic"), we write the equation in the form:
+    # x^3 + 3 * Q * x -2 * R = 0
+    Q = (-numpy.ones((n, ))/3.0)
+    R = ((Iext2 + 2.0 * geq - 0.3 * zeq + 1.05) / 2)
+    if y2eq is None:
+        ss = numpy.where(x2_neg, 0.0, s)
+        Q += ss / 3
+        R -= 0.25 * ss / 2
     else:
-        # fx2 = tau1 * (-y2 + Iext2 + 2 * g - x2 ** 3 + x2 - 0.3 * z + 1.05)
-        # if x2_neg = True, so that y2eq = 0.0:
-        #   fx2 = tau1 * (Iext2 + 2 * g - x2 ** 3 + x2 - 0.3 * z + 1.05) =>
-        #     0 = x2eq ** 3 - x2eq - (Iext2 + 2 * geq -0.3 * zeq + 1.05)
-        # if x2_neg = False , so that y2eq = s*(x2+0.25):
-        #   fx2 = tau1 * (-s * (x2 + 0.25) + Iext2 + 2 * g - x2 ** 3 + x2 - 0.3 * z + 1.05) =>
-        #   fx2 = tau1 * (-0.25 * s  + Iext2 + 2 * g - x2 ** 3 + (1 - s) * x2 - 0.3 * z + 1.05 =>
-        #     0 = x2eq ** 3 + (s - 1) * x2eq - (Iext2 + 2 * geq -0.3 * zeq - 0.25 * s + 1.05)
-        # According to http://mathworld.wolfram.com/CubicFormula.html
-        # and given that there is no square term (x2eq^2; "depressed cubic"), we write the equation in the form:
-        # x^3 + 3 * Q * x -2 * R = 0
-        Q = (-numpy.ones((n, ))/3.0)
-        R = ((Iext2 + 2.0 * geq - 0.3 * zeq + 1.05) / 2)
-        if y2eq is None:
-            ss = numpy.where(x2_neg, 0.0, s)
-            Q += ss / 3
-            R -= 0.25 * ss / 2
-        else:
-            y2eq = (assert_arrays([y2eq], (n, )))
-            R += y2eq / 2
-        # Then the determinant is :
-        # delta = Q^3 + R^2 =>
-        delta = Q ** 3 + R ** 2
-        # and S = cubic_root(R+sqrt(D), T = cubic_root(R-sqrt(D)
-        delta_sq = numpy.sqrt(delta.astype("complex")).astype("complex")
-        ST = [R + delta_sq, R - delta_sq]
-        for ii in range(2):
-            for iv in range(n):
-                if numpy.imag(ST[ii][iv]) == 0.0:
-                    ST[ii][iv] = numpy.sign(ST[ii][iv]) * numpy.power(numpy.abs(ST[ii][iv]), 1.0/3)
-                else:
-                    ST[ii][iv] = numpy.power(ST[ii][iv], 1.0 / 3)
-        # and B = S+T, A = S-T
-        B = ST[0]+ST[1]
-        A = ST[0]-ST[1]
-        # The roots then are:
-        # x1 = -1/3 * a2 + B
-        # x21 = -1/3 * a2 - 1/2 * B + 1/2 * sqrt(3) * A * j
-        # x22 = -1/3 * a2 - 1/2 * B - 1/2 * sqrt(3) * A * j
-        # where j = sqrt(-1)
-        # But, in our case a2 = 0.0, so that:
-        B2 = - 0.5 *B
-        AA = (0.5 * numpy.sqrt(3.0) * A * 1j)
-        sol = numpy.concatenate([[B.flatten()], [B2 + AA], [B2 - AA]]).T
-        x2eq = []
-        for ii in range(delta.size):
-            temp = sol[ii, numpy.abs(numpy.imag(sol[ii])) < 10 ** (-6)]
-            if temp.size == 0:
-                raise_value_error("No real roots for x2eq_" + str(ii))
-            else:
-                x2eq.append(numpy.min(numpy.real(temp)))
-        # zeq = zeq.flatten()
-        # geq = geq.flatten()
-        # Iext2 = Iext2.flatten()
-        # x2eq = []
-        # for ii in range(n):
-        #
-        #     if y2eq is None:
-        #
-        #         fx2 = lambda x2: calc_fx2(x2, y2=calc_eq_y2(x2, x2_neg=x2_neg), z=zeq[ii], g=geq[ii],
-        #                                   Iext2=Iext2[ii], tau1=1.0)
-        #
-        #         jac = lambda x2: -3 * x2 ** 2 + 1.0 - numpy.where(x2_neg, 0.0, -s)
-        #
-        #     else:
-        #
-        #         fx2 = lambda x2: calc_fx2(x2, y2=0.0, z=zeq[ii], g=geq[ii], Iext2=Iext2[ii], tau1=1.0)
-        #         jac = lambda x2: -3 * x2 ** 2 + 1.0
-        #
-        #     sol = root(fx2, -0.5, method='lm', jac=jac, tol=10 ** (-6), callback=None, options=None)
-        #
-        #     if sol.success:
-        #
-        #         if numpy.any([numpy.any(numpy.isnan(sol.x)), numpy.any(numpy.isinf(sol.x))]):
-        #             raise_value_error("nan or inf values in solution x\n" + sol.message)
-        #
-        #         x2eq.append(numpy.min(numpy.real(numpy.array(sol.x))))
-        #
-        #     else:
-        #         raise_value_error(sol.message)
+        y2eq = (assert_arrays([y2eq], (n, )))
+        R += y2eq / 2
+    # Then the determinant is :
+    # delta = Q^3 + R^2 =>
+    delta = Q ** 3 + R ** 2
+    # and S = cubic_root(R+sqrt(D), T = cubic_root(R-sqrt(D)
+    delta_sq = numpy.sqrt(delta.astype("complex")).astype("complex")
+    ST = numpy.array([R + delta_sq, R - delta_sq])
+    # Real cubic roots for the real values, principal complex cubic roots otherwise
+    ST = numpy.where(numpy.imag(ST) == 0.0,
+                     numpy.sign(ST) * numpy.power(numpy.abs(ST), 1.0 / 3), numpy.power(ST, 1.0 / 3))
+    # and B = S+T, A = S-T
+    B = ST[0]+ST[1]
+    A = ST[0]-ST[1]
+    # The roots then are:
+    # x1 = -1/3 * a2 + B
+    # x21 = -1/3 * a2 - 1/2 * B + 1/2 * sqrt(3) * A * j
+    # x22 = -1/3 * a2 - 1/2 * B - 1/2 * sqrt(3) * A * j
+    # where j = sqrt(-1)
+    # But, in our case a2 = 0.0, so that:
+    B2 = - 0.5 *B
+    AA = (0.5 * numpy.sqrt(3.0) * A * 1j)
+    sol = numpy.concatenate([[B.flatten()], [B2 + AA], [B2 - AA]]).T
+    # Select the minimum real root of each region
+    real_sol = numpy.where(numpy.abs(numpy.imag(sol)) < 10 ** (-6), numpy.real(sol), numpy.inf)
+    x2eq = numpy.min(real_sol, axis=1)
+    no_real_roots = numpy.where(numpy.isinf(x2eq))[0]
+    if no_real_roots.size > 0:
+        raise_value_error("No real roots for x2eq_" + str(no_real_roots[0]))
+    if CalculusConfig.SYMBOLIC_CALCULATIONS_FLAG and y2eq is None:
+        x2eq_symbol = calc_eq_x2_symbol(Iext2, zeq, geq, s, x2_neg)
+        if not numpy.allclose(x2eq, x2eq_symbol):
+            logger.warning("\nAnalytic x2eq = " + str(x2eq) + "\ndiffers from the symbolic solution x2eq = " +
+                           str(x2eq_symbol) + "!")
     if numpy.array(x2_neg).size == 1:
         x2_neg = numpy.tile(x2_neg, (n, ))
-    for iv in range(n):
-        if x2_neg[iv] == False and x2eq[iv] < -0.25:
-            logger.warning("\nx2eq["+str(iv)+"] = " + str(x2eq[iv]) + " < -0.25, although x2_neg[" + str(iv)+"] = False!" +
-                    "\n" + "Rerunning with x2_neg[" + str(iv)+"] = True...")
-            temp, _ = calc_eq_x2(Iext2[iv], zeq=zeq[iv], geq=geq[iv], s=s[iv], x2_neg=True)
-            if temp < -0.25:
-                x2eq[iv] = temp
-                x2_neg[iv] = True
-            else:
-                logger.warning("\nThe value of x2eq returned after rerunning with x2_neg[" + str(iv)+"] = True, " +
-                        "is " + str(temp) + ">= -0.25!" +
-                        "\n" + "We will use the original x2eq!")
-        if x2_neg[iv] == True and x2eq[iv] > -0.25:
-            logger.warning("\nx2eq["+str(iv)+"] = " + str(x2eq[iv]) + " > -0.25, although x2_neg[" + str(iv)+"] = True!" +
-                    "\n" + "Rerunning with x2_neg[" + str(iv)+"] = False...")
-            temp, _ = calc_eq_x2(Iext2[iv], zeq=zeq[iv], geq=geq[iv], s=s[iv], x2_neg=False)
-            if temp > -0.25:
-                x2eq[iv] = temp
-                x2_neg[iv] = True
-            else:
-                logger.warning("\nThe value of x2eq returned after rerunning with x2_neg[" + str(iv)+"] = False, " +
-                        "is " + str(temp) + "=< -0.25!" +
-                        "\n" + "We will use the original x2eq!")
+    else:
+        x2_neg = numpy.asarray(x2_neg)
+    inds = numpy.where(numpy.logical_and(x2_neg == False, x2eq < -0.25))[0]
+    if inds.size > 0:
+        logger.warning("\nx2eq" + str(inds.tolist()) + " = " + str(x2eq[inds]) + " < -0.25, although x2_neg" +
+                       str(inds.tolist()) + " = False!" +
+                       "\n" + "Rerunning with x2_neg" + str(inds.tolist()) + " = True...")
+        temp, _ = calc_eq_x2(Iext2[inds], zeq=zeq[inds], geq=geq[inds], s=s[inds], x2_neg=True)
+        accept = temp < -0.25
+        x2eq[inds[accept]] = temp[accept]
+        x2_neg[inds[accept]] = True
+        if not numpy.all(accept):
+            logger.warning("\nThe values of x2eq returned after rerunning with x2_neg" +
+                           str(inds[~accept].tolist()) + " = True, " + "are " + str(temp[~accept]) + ">= -0.25!" +
+                           "\n" + "We will use the original x2eq!")
+    inds = numpy.where(numpy.logical_and(x2_neg == True, x2eq > -0.25))[0]
+    if inds.size > 0:
+        logger.warning("\nx2eq" + str(inds.tolist()) + " = " + str(x2eq[inds]) + " > -0.25, although x2_neg" +
+                       str(inds.tolist()) + " = True!" +
+                       "\n" + "Rerunning with x2_neg" + str(inds.tolist()) + " = False...")
+        temp, _ = calc_eq_x2(Iext2[inds], zeq=zeq[inds], geq=geq[inds], s=s[inds], x2_neg=False)
+        accept = temp > -0.25
+        x2eq[inds[accept]] = temp[accept]
+        x2_neg[inds[accept]] = True
+        if not numpy.all(accept):
+            logger.warning("\nThe values of x2eq returned after rerunning with x2_neg" +
+                           str(inds[~accept].tolist()) + " = False, " + "are " + str(temp[~accept]) + "=< -0.25!" +
+                           "\n" + "We will use the original x2eq!")
     x2eq = numpy.reshape(x2eq, shape)
     return x2eq, x2_neg
 
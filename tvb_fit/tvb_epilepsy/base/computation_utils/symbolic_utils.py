@@ -1,4 +1,7 @@
 
+from functools import wraps
+from inspect import getcallargs
+
 import numpy as np
 from sympy import Symbol, solve, solveset, lambdify, series, Matrix  # diff, ArraySymbol
 from sympy.tensor.array import Array
@@ -9,6 +12,47 @@ from tvb_fit.tvb_epilepsy.base.computation_utils.equations_utils import eqtn_x0c
     eqtn_fy1, eqtn_fz, eqtn_fx2, eqtn_fy2, eqtn_fg, eqtn_fx0, eqtn_fslope, eqtn_fIext1, eqtn_fIext2, eqtn_fK
 
 
+# Cache of the outputs of the symbolic builders, keyed by their name and structural arguments
+_SYMBOL_BUILDERS_CACHE = {}
+
+
+def _symbol_cache_key(arg):
+    # A hashable representation of a builder's argument, e.g., of zmode and pmode arrays or of index lists
+    if isinstance(arg, np.ndarray):
+        return (arg.dtype.str, arg.shape, arg.tobytes())
+    elif isinstance(arg, (list, tuple)):
+        return tuple(_symbol_cache_key(a) for a in arg)
+    elif isinstance(arg, np.generic):
+        return arg.item()
+    return arg
+
+
+def memoize_symbol_builder(builder):
+    """
+    Cache the symbolic expressions and lambdified functions built by builder, so that repeated calls
+    with the same structural arguments (number of regions, model, flags, modes, shape) do not rebuild them.
+    The variables' dictionaries returned are (shallow) copies, so that callers can update them freely.
+    """
+    @wraps(builder)
+    def memoized_builder(*args, **kwargs):
+        call_args = getcallargs(builder, *args, **kwargs)
+        key = (builder.__name__, _symbol_cache_key(sorted(call_args.items())))
+        try:
+            output = _SYMBOL_BUILDERS_CACHE.get(key, None)
+        except TypeError:
+            # Unhashable arguments, build without caching:
+            return builder(*args, **kwargs)
+        if output is None:
+            output = builder(*args, **kwargs)
+            _SYMBOL_BUILDERS_CACHE[key] = output
+        return tuple(dict(out) if isinstance(out, dict) else out for out in output)
+    return memoized_builder
+
+
+def clear_symbol_builders_cache():
+    _SYMBOL_BUILDERS_CACHE.clear()
+
+
 def symbol_vars(n_regions, vars_str, dims=1, ind_str="_", shape=None, output_flag="numpy_array"):
     vars_out = list()
     vars_dict = {}
@@ -60,6 +104,7 @@ def symbol_vars(n_regions, vars_str, dims=1, ind_str="_", shape=None, output_fla
     return tuple(vars_out)
 
 
+@memoize_symbol_builder
 def symbol_eqtn_coupling(n, ix=None, jx=None, K="K", shape=None):
     # Only difference coupling for the moment.
     # TODO: Extend for different coupling forms
@@ -74,6 +119,7 @@ def symbol_eqtn_coupling(n, ix=None, jx=None, K="K", shape=None):
     return lambdify([x1, K, w], coupling, "numpy"), coupling, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_x0cr_r(n, zmode=np.array([ZMODE_DEF]), shape=None):
     Iext1, yc, a, b, d, x1_rest, x1_cr, x0_rest, x0_cr, vars_dict = \
         symbol_vars(n, ["Iext1", "yc", "a", "b", "d", "x1_rest", "x1_cr", "x0_rest", "x0_cr"], shape=shape)
@@ -85,6 +131,7 @@ def symbol_eqtn_x0cr_r(n, zmode=np.array([ZMODE_DEF]), shape=None):
     return (x0cr_lambda, r_lambda), (x0cr, r), vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_x0(n, zmode=np.array([ZMODE_DEF]), z_pos=True, K="K", shape=None):
     x1, z, K, vars_dict = symbol_vars(n, ["x1", "z", K], shape=shape)
     w, temp = symbol_vars(n, ["w"], dims=2)
@@ -94,6 +141,7 @@ def symbol_eqtn_x0(n, zmode=np.array([ZMODE_DEF]), z_pos=True, K="K", shape=None
     return x0_lambda, x0, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fx1(n, model="2d", x1_neg=True, slope="slope", Iext1="Iext1", shape=None):
     x1, z, y1, slope, Iext1, a, b, d, tau1, vars_dict = symbol_vars(n, ["x1", "z", "y1", slope, Iext1, "a", "b", "d",
                                                                         "tau1"], shape=shape)
@@ -107,12 +155,14 @@ def symbol_eqtn_fx1(n, model="2d", x1_neg=True, slope="slope", Iext1="Iext1", sh
         return lambdify([x1, z, y1, x2, Iext1, slope, a, b, d, tau1], fx1, "numpy"), fx1, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fy1(n, shape=None):
     x1, y1, yc, d, tau1, vars_dict = symbol_vars(n, ["x1", "y1", "yc", "d", "tau1"], shape=shape)
     fy1 = Array(eqtn_fy1(x1, yc, y1, d, tau1))
     return lambdify([x1, y1, yc, d, tau1], fy1, "numpy"), fy1, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fz(n, zmode=np.array([ZMODE_DEF]), z_pos=True, x0="x0", K="K", shape=None):
     x1, z, x0, K, tau1, tau0, vars_dict = symbol_vars(n, ["x1", "z", x0, K, "tau1", "tau0"], shape=shape)
     w, temp = symbol_vars(n, ["w"], dims=2)
@@ -122,30 +172,35 @@ def symbol_eqtn_fz(n, zmode=np.array([ZMODE_DEF]), z_pos=True, x0="x0", K="K", s
     return fz_lambda, fz, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fx2(n, Iext2="Iext2", shape=None):
     x2, y2, z, g, Iext2, tau1, vars_dict = symbol_vars(n, ["x2", "y2", "z", "g", Iext2, "tau1"], shape=shape)
     fx2 = Array(eqtn_fx2(x2, y2, z, g, Iext2, tau1))
     return lambdify([x2, y2, z, g, Iext2, tau1], fx2, "numpy"), fx2, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fy2(n, x2_neg=False, shape=None):
     x2, y2, s, tau1, tau2, vars_dict = symbol_vars(n, ["x2", "y2", "s", "tau1", "tau2"], shape=shape)
     fy2 = Array(eqtn_fy2(x2, y2, s, tau1, tau2, x2_neg))
     return lambdify([x2, y2, s, tau1, tau2], fy2, "numpy"), fy2, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fg(n, shape=None):
     x1, g, gamma, tau1, vars_dict = symbol_vars(n, ["x1", "g", "gamma", "tau1"], shape=shape)
     fg = Array(eqtn_fg(x1, g, gamma, tau1))
     return lambdify([x1, g, gamma, tau1], fg, "numpy"), fg, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fx0(n, shape=None):
     x0_var, x0, tau1, vars_dict = symbol_vars(n, ["x0_var", "x0", "tau1"], shape=shape)
     fx0 = Array(eqtn_fx0(x0_var, x0, tau1))
     return lambdify([x0_var, x0, tau1], fx0, "numpy"), fx0, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fslope(n, pmode=np.array([PMODE_DEF]), shape=None):
     slope_var, z, g, slope, tau1, vars_dict = symbol_vars(n, ["slope_var", "z", "g", "slope", "tau1"], shape=shape)
     from tvb_fit.tvb_epilepsy.base.model.epileptor_models import EpileptorDPrealistic
@@ -164,12 +219,14 @@ def symbol_eqtn_fslope(n, pmode=np.array([PMODE_DEF]), shape=None):
     return fslope_lambda, fslope, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fIext1(n, shape=None):
     Iext1_var, Iext1, tau1, tau0, vars_dict = symbol_vars(n, ["Iext1_var", "Iext1", "tau1", "tau0"], shape=shape)
     fIext1 = Array(eqtn_fIext1(Iext1_var, Iext1, tau1, tau0))
     return lambdify([Iext1_var, Iext1, tau1, tau0], fIext1, "numpy"), fIext1, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fIext2(n, pmode=np.array([PMODE_DEF]), shape=None):
     Iext2_var, z, g, Iext2, tau1, vars_dict = symbol_vars(n, ["Iext2_var", "z", "g", "Iext2", "tau1"], shape=shape)
     from tvb_fit.tvb_epilepsy.base.model.epileptor_models import EpileptorDPrealistic
@@ -188,12 +245,14 @@ def symbol_eqtn_fIext2(n, pmode=np.array([PMODE_DEF]), shape=None):
     return fIext2_lambda, fIext2, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fK(n, shape=None):
     K_var, K, tau1, tau0, vars_dict = symbol_vars(n, ["K_var", "K", "tau1", "tau0"], shape=shape)
     fK = Array(eqtn_fK(K_var, K, tau1, tau0))
     return lambdify([K_var, K, tau1, tau0], fK, "numpy"), fK, vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fparam_vars(n, pmode=np.array([PMODE_DEF]), shape=None):
     fx0_lambda, fx0, vars_dict = symbol_eqtn_fx0(n, shape)
     slope_lambda, fslope, temp = symbol_eqtn_fslope(n, pmode, shape)
@@ -208,6 +267,7 @@ def symbol_eqtn_fparam_vars(n, pmode=np.array([PMODE_DEF]), shape=None):
            (fx0, fslope, fIext1, fIext2, fK), vars_dict
 
 
+@memoize_symbol_builder
 def symbol_eqnt_dfun(n, model_vars, zmode=np.array([ZMODE_DEF]), x1_neg=True, x2_neg=False, z_pos=True,
                      pmode=np.array([PMODE_DEF]), output_mode="array", shape=None):
     f_sym = []
@@ -286,6 +346,7 @@ def symbol_eqnt_dfun(n, model_vars, zmode=np.array([ZMODE_DEF]), x1_neg=True, x2
     return f_lambda, f_sym, v
 
 
+@memoize_symbol_builder
 def symbol_calc_jac(n_regions, model_vars, zmode=np.array([ZMODE_DEF]), x1_neg=True, x2_neg=False, z_pos=True,
                     pmode=np.array([PMODE_DEF])):
     dfun_sym, v = symbol_eqnt_dfun(n_regions, model_vars, zmode, x1_neg, x2_neg, z_pos, pmode)[1:]
@@ -355,6 +416,7 @@ def symbol_calc_jac(n_regions, model_vars, zmode=np.array([ZMODE_DEF]), x1_neg=T
     return jac_lambda, jac_sym, v
 
 
+@memoize_symbol_builder
 def symbol_calc_coupling_diff(n, ix=None, jx=None, K="K"):
     if ix is None:
         ix = range(n)
@@ -366,6 +428,7 @@ def symbol_calc_coupling_diff(n, ix=None, jx=None, K="K"):
     return lambdify([v["K"], v["w"]], dcoupl_dx, "numpy"), dcoupl_dx, v
 
 
+@memoize_symbol_builder
 def symbol_calc_2d_taylor(n, x_taylor="x1lin", order=2, x1_neg=True, slope="slope", Iext1="Iext1", shape=None):
     fx1ser, v = symbol_eqtn_fx1(n, model="2d", x1_neg=x1_neg, slope=slope, Iext1=Iext1)[1:]
     fx1ser = fx1ser.tolist()
@@ -383,6 +446,7 @@ def symbol_calc_2d_taylor(n, x_taylor="x1lin", order=2, x1_neg=True, slope="slop
                     fx1ser, "numpy"), fx1ser, v
 
 
+@memoize_symbol_builder
 def symbol_calc_fx1z_2d_x1neg_zpos_jac(n, ix0, iE):
     fx1, v = symbol_eqtn_fx1(n, model="2d", x1_neg=True, slope="slope", Iext1="Iext1", shape=None)[1:]
     fx1 = fx1.tolist()
@@ -404,6 +468,7 @@ def symbol_calc_fx1z_2d_x1neg_zpos_jac(n, ix0, iE):
                      v["tau0"]], jac, "numpy"), jac, v
 
 
+@memoize_symbol_builder
 def symbol_calc_fx1y1_6d_diff_x1(n, shape=None):
     fx1, v = symbol_eqtn_fx1(n, model="6d", x1_neg=True, slope="slope", Iext1="Iext1", shape=None)[1:]
     fx1 = fx1.tolist()
@@ -425,6 +490,7 @@ def symbol_calc_fx1y1_6d_diff_x1(n, shape=None):
     return lambdify([v["x1"], v["yc"], v["Iext1"], v["a"], v["b"], v["d"], v["tau1"]], dfx1, "numpy"), dfx1, v
 
 
+@memoize_symbol_builder
 def symbol_calc_x0cr_r(n, zmode=np.array([ZMODE_DEF]), shape=None):
     # Define the z equilibrium expression...
     zeq, vx = symbol_eqtn_fx1(n, model="2d", x1_neg=True, slope="slope", Iext1="Iext1")[1:]
@@ -475,6 +541,7 @@ def symbol_calc_x0cr_r(n, zmode=np.array([ZMODE_DEF]), shape=None):
            (x0cr, r), v
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fx1z(n, model="6d", zmode=np.array([ZMODE_DEF]), shape=None):  # x1_neg=True, z_pos=True,
     # TODO: for the extreme z_pos = False case where we have terms like 0.1 * z ** 7
     # TODO: for the extreme x1_neg = False case where we have to solve for x2 as well
@@ -513,6 +580,7 @@ def symbol_eqtn_fx1z(n, model="6d", zmode=np.array([ZMODE_DEF]), shape=None):  #
     return fx1z_lambda, fx1z, v
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fx1z_diff(n, model, zmode=np.array([ZMODE_DEF])):  # x1_neg=True, , z_pos=True
     # TODO: for the extreme z_pos = False case where we have terms like 0.1 * z ** 7
     # TODO: for the extreme x1_neg = False case where we have to solve for x2 as well
@@ -524,6 +592,7 @@ def symbol_eqtn_fx1z_diff(n, model, zmode=np.array([ZMODE_DEF])):  # x1_neg=True
     return dfx1z_dx1_lambda, dfx1z_dx1, v
 
 
+@memoize_symbol_builder
 def symbol_eqtn_fx2y2(n, x2_neg=False, shape=None):
     y2eq, vy = symbol_eqtn_fy2(n, x2_neg=x2_neg)[1:]
     y2eq = y2eq.tolist()
@@ -544,6 +613,7 @@ def symbol_eqtn_fx2y2(n, x2_neg=False, shape=None):
     return lambdify([v["x2"], v["z"], v["g"], v["Iext2"], v["s"], v["tau1"]], fx2, 'numpy'), fx2, v
 
 
+@memoize_symbol_builder
 def symbol_calc_fz_jac_square_taylor(n):
     fx1sq, v = symbol_calc_2d_taylor(n, x_taylor="x1sq", order=3, x1_neg=True, slope="slope", Iext1="Iext1")[1:]
     fx1sq = fx1sq.tolist()
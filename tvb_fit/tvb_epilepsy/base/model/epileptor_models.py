@@ -8,12 +8,47 @@ import tvb.basic.traits.types_basic as basic
 import tvb.datatypes.arrays as arrays
 from tvb.simulator.common import get_logger
 from tvb.simulator.models import Model
-from tvb_fit.base.utils.log_error_utils import raise_not_implemented_error
 from tvb_fit.tvb_epilepsy.base.constants.model_constants import *
 
 LOG = get_logger(__name__)
 
 
+def _fz(x1, x0, zmode, where=numpy.where):
+    # The sigmoidal or linear fz, computing the exponential only if any node needs it
+    if numpy.all(zmode):
+        return 3.0 / (1.0 + numpy.exp(-10 * (x1 + 0.5))) - x0
+    elif not numpy.any(zmode):
+        return 4 * (x1 - x0)
+    return where(zmode, 3.0 / (1.0 + numpy.exp(-10 * (x1 + 0.5))) - x0, 4 * (x1 - x0))
+
+
+def _fz_z_neg(z):
+    # The -0.1 * z ** 7 term of fz for z < 0, computing the power only where z < 0
+    fz_z_neg = numpy.zeros_like(z)
+    z_neg = z < 0.0
+    if numpy.any(z_neg):
+        fz_z_neg[z_neg] = -0.1 * z[z_neg] ** 7
+    return fz_z_neg
+
+
+def _dfz_dx1(x1, zmode, where=numpy.where):
+    # Derivative of the sigmoidal or linear fz with respect to x1
+    exp_fun = numpy.exp(-10.0 * (x1 + 0.5))
+    return where(zmode, 30.0 * exp_fun / (1.0 + exp_fun) ** 2, 4.0)
+
+
+def _local_jacobian_to_matrix(jac):
+    # Arrange the (n_vars, n_vars, n_nodes) array of the Jacobians of all nodes into a (n_vars * n_nodes) square
+    # matrix, ordered like calc_jac, i.e., by state variable first, and then by node
+    n_vars, n_nodes = jac.shape[1:]
+    i_var = numpy.arange(n_vars)[:, numpy.newaxis, numpy.newaxis] * n_nodes
+    j_var = numpy.arange(n_vars)[numpy.newaxis, :, numpy.newaxis] * n_nodes
+    i_node = numpy.arange(n_nodes)[numpy.newaxis, numpy.newaxis, :]
+    jac_matrix = numpy.zeros((n_vars * n_nodes, n_vars * n_nodes), dtype=jac.dtype)
+    jac_matrix[i_var + i_node, j_var + i_node] = jac
+    return jac_matrix
+
+
 class EpileptorDP(Model):
     r"""
     The Epileptor is a composite neural mass model of six dimensions which
@@ -309,24 +344,23 @@ class EpileptorDP(Model):
 
         # TVB Epileptor in commented lines below
 
+        # Shared by the equations below:
+        x1_sq = y[0] ** 2
+
         # population 1
         # if_ydot0 = - self.a * y[0] ** 2 + self.b * y[0]
-        if_ydot0 = -self.a * y[0] ** 2 + self.b * y[0]  # self.a=1.0, self.b=3.0
+        if_ydot0 = -self.a * x1_sq + self.b * y[0]  # self.a=1.0, self.b=3.0
         # else_ydot0 = self.slope - y[3] + 0.6 * (y[2] - 4.0) ** 2
         else_ydot0 = self.slope - y[3] + 0.6 * (y[2] - 4.0) ** 2
         # ydot[0] = self.tt * (y[1] - y[2] + Iext + self.Kvf * c_pop1 + where(y[0] < 0., if_ydot0, else_ydot0) * y[0])
         ydot[0] = self.tau1 * (y[1] - y[2] + Iext1 + self.Kvf * c_pop1 + where(y[0] < 0.0, if_ydot0, else_ydot0) * y[0])
         # ydot[1] = self.tt * (self.c - self.d * y[0] ** 2 - y[1])
-        ydot[1] = self.tau1 * (self.yc - self.d * y[0] ** 2 - y[1])  # self.d=5
+        ydot[1] = self.tau1 * (self.yc - self.d * x1_sq - y[1])  # self.d=5
 
         # energy
         # self.r * (4 * (y[0] - self.x0_values) - y[2]      + where(y[2] < 0., if_ydot2, else_ydot2)
-        # if_ydot2 = - 0.1 * y[2] ** 7
-        if_ydot2 = - 0.1 * y[2] ** 7
-        # else_ydot2 = 0
-        else_ydot2 = 0
-        fz = where(self.zmode, 3.0 / (1.0 + numpy.exp(-10 * (y[0] + 0.5))) - self.x0, 4 * (y[0] - self.x0)) + \
-             where(y[2] < 0., if_ydot2, else_ydot2)
+        # if_ydot2 = - 0.1 * y[2] ** 7, else_ydot2 = 0
+        fz = _fz(y[0], self.x0, self.zmode, where) + _fz_z_neg(y[2])
 
         # ydot[2] = self.tt * (        ...+ self.Ks * c_pop1))
         ydot[2] = self.tau1 * ((fz - y[2] + self.K * c_pop1) / self.tau0)
@@ -349,7 +383,48 @@ class EpileptorDP(Model):
 
     def jacobian(self, state_variables, coupling, local_coupling=0.0,
                  array=numpy.array, where=numpy.where, concat=numpy.concatenate):
-        raise_not_implemented_error("Jacobian calculation of model " + self._ui_name + " is not implemented yet!")
+        r"""
+        Computes the Jacobian of the derivatives of the state variables of the Epileptor
+        with respect to the state variables, for all nodes at once.
+        The coupling is treated as an input, i.e., the terms due to the coupling from other nodes,
+        which depend on the connectivity, are not included (see calc_jac for their difference coupling form).
+
+        The Jacobian is returned as a (6 n, 6 n) matrix, where n is the number of nodes,
+        with rows and columns ordered by state variable first, and then by node, like in calc_jac.
+        """
+
+        y = state_variables.reshape((self._nvar, -1))
+        jac = numpy.zeros((self._nvar, ) + y.shape, dtype=y.dtype)
+        x1_neg = y[0] < 0.0
+
+        # population 1
+        jac[0, 0] = where(x1_neg, -3.0 * self.a * y[0] ** 2 + 2.0 * self.b * y[0],
+                          self.slope - y[3] + 0.6 * (y[2] - 4.0) ** 2) + local_coupling
+        jac[0, 1] = 1.0
+        jac[0, 2] = -1.0 + where(x1_neg, 0.0, 1.2 * (y[2] - 4.0) * y[0])
+        jac[0, 3] = where(x1_neg, 0.0, -y[0])
+        jac[1, 0] = -2.0 * self.d * y[0]
+        jac[1, 1] = -1.0
+
+        # energy
+        jac[2, 0] = _dfz_dx1(y[0], self.zmode, where) / self.tau0
+        jac[2, 2] = (-1.0 + where(y[2] < 0.0, -0.7 * y[2] ** 6, 0.0)) / self.tau0
+
+        # population 2
+        jac[3, 2] = -0.3
+        jac[3, 3] = 1.0 - 3.0 * y[3] ** 2
+        jac[3, 4] = -1.0
+        jac[3, 5] = 2.0
+        jac[4, 3] = where(y[3] < -0.25, 0.0, self.s) / self.tau2
+        jac[4, 4] = -1.0 / self.tau2
+
+        # filter
+        jac[5, 0] = 0.01 * self.gamma
+        jac[5, 5] = -0.01
+
+        jac *= self.tau1
+
+        return _local_jacobian_to_matrix(jac)
 
 
 class EpileptorDPrealistic(Model):
@@ -614,31 +689,54 @@ class EpileptorDPrealistic(Model):
         slope_eq = numpy.array(slope) * iz
         Iext2_eq = numpy.array(Iext2) * iz
 
-        for iv in range(z.size):
+        # All nodes of the same pmode at once:
+        for this_pmode in [1, 2, 3]:
 
-            if pmode[iv] > 0:
+            inds = pmode == this_pmode
+            if not numpy.any(inds):
+                continue
 
-                if pmode[iv] == 1:
-                    xp = 1.0 / (1.0 + numpy.exp(1) ** (-10 * (z[iv] - 3.00)))
-                    xp1 = 0
-                    xp2 = 1
+            if this_pmode == 1:
+                xp = 1.0 / (1.0 + numpy.exp(1) ** (-10 * (z[inds] - 3.00)))
+                xp1 = 0
+                xp2 = 1
 
-                elif pmode[iv] ==2:
-                    xp = 1.0 / (1.0 + numpy.exp(1) ** (-10 * (g[iv] + 0.0)))
-                    xp1 = 0  # -0.175
-                    xp2 = 1  # 0.025
+            elif this_pmode == 2:
+                xp = 1.0 / (1.0 + numpy.exp(1) ** (-10 * (g[inds] + 0.0)))
+                xp1 = 0  # -0.175
+                xp2 = 1  # 0.025
 
-                elif pmode[iv] == 3:
-                    xp = z[iv] * g[iv]
-                    xp1 = -0.7
-                    xp2 = 0.1
-                #                           targ min,max  orig      min,max
-                slope_eq[iv] = interval_scaling(xp, 1.0, slope[iv], xp1, xp2)
-                # slope_eq = slope * numpy.ones(z.shape)
-                Iext2_eq[iv] = interval_scaling(xp, 0.0, Iext2[iv], xp1, xp2)
+            else:
+                xp = z[inds] * g[inds]
+                xp1 = -0.7
+                xp2 = 0.1
+            #                           targ min,max  orig      min,max
+            slope_eq[inds] = interval_scaling(xp, 1.0, slope[inds], xp1, xp2)
+            # slope_eq = slope * numpy.ones(z.shape)
+            Iext2_eq[inds] = interval_scaling(xp, 0.0, Iext2[inds], xp1, xp2)
 
         return slope_eq, Iext2_eq
 
+    @staticmethod
+    def fun_slope_Iext2_jac(z, g, pmode, slope, Iext2):
+        # Derivatives of the slope_eq and Iext2_eq of fun_slope_Iext2 with respect to z and g
+
+        iz = numpy.ones(z.shape)
+        pmode = numpy.array(pmode) * iz
+
+        # Derivatives of the feedback variable xp:
+        xp_z = 1.0 / (1.0 + numpy.exp(-10 * (z - 3.00)))
+        xp_g = 1.0 / (1.0 + numpy.exp(-10 * (g + 0.0)))
+        dxp_dz = numpy.where(pmode == 1, 10 * xp_z * (1.0 - xp_z), numpy.where(pmode == 3, g, 0.0))
+        dxp_dg = numpy.where(pmode == 2, 10 * xp_g * (1.0 - xp_g), numpy.where(pmode == 3, z, 0.0))
+
+        # ...scaled from the (xp1, xp2) interval to the (1.0, slope) and (0.0, Iext2) ones:
+        xp_range = numpy.where(pmode == 3, 0.1 - (-0.7), 1.0 - 0.0)
+        dslope_dxp = (numpy.array(slope) - 1.0) / xp_range
+        dIext2_dxp = (numpy.array(Iext2) - 0.0) / xp_range
+
+        return dslope_dxp * dxp_dz, dslope_dxp * dxp_dg, dIext2_dxp * dxp_dz, dIext2_dxp * dxp_dg
+
     def dfun(self, state_variables, coupling, local_coupling=0.0,
              array=numpy.array, where=numpy.where, concat=numpy.concatenate):
         r"""
@@ -704,18 +802,18 @@ class EpileptorDPrealistic(Model):
         c_pop1 = coupling[0, :]
         c_pop2 = coupling[1, :]
 
+        # Shared by the equations below:
+        x1_sq = y[0] ** 2
+
         # population 1
-        if_ydot0 = -self.a * y[0] ** 2 + self.b * y[0]  # self.a=1.0, self.b=3.0
+        if_ydot0 = -self.a * x1_sq + self.b * y[0]  # self.a=1.0, self.b=3.0
         else_ydot0 = slope - y[3] + 0.6 * (y[2] - 4.0) ** 2
         ydot[0] = self.tau1 * (y[1] - y[2] + Iext1_local_coupling + self.Kvf * c_pop1 + where(y[0] < 0.0, if_ydot0, else_ydot0) * y[0])
-        ydot[1] = self.tau1 * (self.yc - self.d * y[0] ** 2 - y[1])  # self.d=5
+        ydot[1] = self.tau1 * (self.yc - self.d * x1_sq - y[1])  # self.d=5
 
         # energy
-        if_ydot2 = - 0.1 * y[2] ** 7
-        else_ydot2 = 0
-
-        fz = where(self.zmode, 3.0 / (1.0 + numpy.exp(-10 * (y[0] + 0.5))) - x0, 4 * (y[0] - x0)) + \
-             where(y[2] < 0., if_ydot2, else_ydot2)
+        # if_ydot2 = - 0.1 * y[2] ** 7, else_ydot2 = 0
+        fz = _fz(y[0], x0, self.zmode, where) + _fz_z_neg(y[2])
 
         ydot[2] = self.tau1 * ((fz - y[2] + K * c_pop1) / self.tau0)
 
@@ -747,7 +845,68 @@ class EpileptorDPrealistic(Model):
 
     def jacobian(self, state_variables, coupling, local_coupling=0.0,
                  array=numpy.array, where=numpy.where, concat=numpy.concatenate):
-        raise_not_implemented_error("Jacobian calculation of model " + self._ui_name + " is not implemented yet!")
+        r"""
+        Computes the Jacobian of the derivatives of the state variables of the Epileptor
+        with respect to the state variables, for all nodes at once.
+        The coupling is treated as an input, i.e., the terms due to the coupling from other nodes,
+        which depend on the connectivity, are not included (see calc_jac for their difference coupling form).
+
+        The Jacobian is returned as a (11 n, 11 n) matrix, where n is the number of nodes,
+        with rows and columns ordered by state variable first, and then by node, like in calc_jac.
+        """
+
+        y = state_variables.reshape((self._nvar, -1))
+        c_pop1 = coupling[0].flatten()
+        jac = numpy.zeros((self._nvar, ) + y.shape, dtype=y.dtype)
+        x1_neg = y[0] < 0.0
+
+        # population 1
+        jac[0, 0] = where(x1_neg, -3.0 * self.a * y[0] ** 2 + 2.0 * self.b * y[0],
+                          y[7] - y[3] + 0.6 * (y[2] - 4.0) ** 2) + local_coupling
+        jac[0, 1] = 1.0
+        jac[0, 2] = -1.0 + where(x1_neg, 0.0, 1.2 * (y[2] - 4.0) * y[0])
+        jac[0, 3] = where(x1_neg, 0.0, -y[0])
+        jac[0, 7] = where(x1_neg, 0.0, y[0])
+        jac[0, 8] = 1.0
+        jac[1, 0] = -2.0 * self.d * y[0]
+        jac[1, 1] = -1.0
+
+        # energy
+        jac[2, 0] = _dfz_dx1(y[0], self.zmode, where) / self.tau0
+        jac[2, 2] = (-1.0 + where(y[2] < 0.0, -0.7 * y[2] ** 6, 0.0)) / self.tau0
+        jac[2, 6] = -where(self.zmode, 1.0, 4.0) / self.tau0
+        jac[2, 10] = c_pop1 / self.tau0
+
+        # population 2
+        jac[3, 2] = -0.3
+        jac[3, 3] = 1.0 - 3.0 * y[3] ** 2
+        jac[3, 4] = -1.0
+        jac[3, 5] = 2.0
+        jac[3, 9] = 1.0
+        jac[4, 3] = where(y[3] < -0.25, 0.0, self.s) / self.tau2
+        jac[4, 4] = -1.0 / self.tau2
+
+        # filter
+        jac[5, 0] = 0.01 * self.gamma
+        jac[5, 5] = -0.01
+
+        # parameters
+        tau0_feedback = numpy.where(numpy.any(self.pmode > 0), 1.0, self.tau0 / 100)
+        dslope_dz, dslope_dg, dIext2_dz, dIext2_dg = \
+            self.fun_slope_Iext2_jac(y[2], y[5], self.pmode, self.slope, self.Iext2)
+        jac[6, 6] = -1000.0 / self.tau0
+        jac[7, 2] = 10.0 * dslope_dz / tau0_feedback
+        jac[7, 5] = 10.0 * dslope_dg / tau0_feedback
+        jac[7, 7] = -10.0 / tau0_feedback
+        jac[8, 8] = -1000.0 / self.tau0
+        jac[9, 2] = 10.0 * dIext2_dz / tau0_feedback
+        jac[9, 5] = 10.0 * dIext2_dg / tau0_feedback
+        jac[9, 9] = -10.0 / tau0_feedback
+        jac[10, 10] = -1000.0 / self.tau0
+
+        jac *= self.tau1
+
+        return _local_jacobian_to_matrix(jac)
 
 
 class EpileptorDP2D(Model):
@@ -997,11 +1156,8 @@ class EpileptorDP2D(Model):
         self.yc - y[1] + Iext1 + self.Kvf * c_pop1 - where(y[0] < 0.0, if_ydot0, else_ydot0) * y[0])
 
         # energy
-        if_ydot1 = - 0.1 * y[1] ** 7
-        else_ydot1 = 0
-
-        fz = where(self.zmode, 3.0 / (1.0 + numpy.exp(-10 * (y[0] + 0.5))) - self.x0, 4 * (y[0] - self.x0)) + \
-             where(y[1] < 0., if_ydot1, else_ydot1)
+        # if_ydot1 = - 0.1 * y[1] ** 7, else_ydot1 = 0
+        fz = _fz(y[0], self.x0, self.zmode, where) + _fz_z_neg(y[1])
 
         ydot[1] = self.tau1 * (fz - y[1] + self.K * c_pop1) / self.tau0
 
@@ -1009,66 +1165,36 @@ class EpileptorDP2D(Model):
 
     def jacobian(self, state_variables, coupling, local_coupling=0.0,
                  array=numpy.array, where=numpy.where, concat=numpy.concatenate):
-        raise_not_implemented_error("Jacobian calculation of model " + self._ui_name + " is not implemented yet!")
-    #     r"""
-    #     Computes the Jacobian of the state variables of the Epileptor
-    #     with respect to time.
-    #
-    #     Implementation note: we expect this version of the Epileptor to be used
-    #     in a vectorized manner. Concretely, y has a shape of (2, n) where n is
-    #     the number of nodes in the network. An consequence is that
-    #     the original use of if/else is translated by calculated both the true
-    #     and false forms and mixing them using a boolean mask.
-    #
-    #     Variables of interest to be used by monitors: -y[0] + y[3]
-    #
-    #         .. math::
-    #         \dot{y_{0}} &=& yc - f_{1}(y_{0}, y_{1}) - y_{2} + I_{ext1} \\
-    #         \dot{y_{1}} &=&
-    #         \begin{cases}
-    #         (f_z(y_{0}) - y_{1}-0.1 y_{1}^{7})/tau0 & \text{if } y_{0}<5/3 \\
-    #         (f_z(y_{0}) - y_{1})/tau0           & \text{if } y_{0} \geq 5/3
-    #         \end{cases} \\
-    #
-    #     where:
-    #         .. math::
-    #             f_{1}(y_{0}, y_{3}) =
-    #             \begin{cases}
-    #             a ( y_{0} -5/3 )^{3} - b ( y_{0} -5/3 )^2 & \text{if } y_{0} <5/3\\
-    #             ( 5*( y_{0} -5/3 ) - 0.6(y_{1}-4)^2 -slope) ( y_{0} - 5/3 ) &\text{if }y_{0} \geq 5/3
-    #             \end{cases}
-    #     and:
-    #
-    #         .. math::
-    #             f_z(y_{0})  =
-    #             \begin{cases}
-    #             4 * (y_{0} - r*x0_values + x0_{cr}) & \text{linear} \\
-    #             \frac{3}{1+e^{-10*(y_{0}-7/6)}} - r*x0_values + x0_{cr} & \text{sigmoidal} \\
-    #             \end{cases}
-    #
-    #
-    #     """
-    #
-    #     y = state_variables
-    #
-    #     n_ep = state_variables.shape[1]
-    #
-    #     # population 1
-    #     jac_xx = where(y[0] < 0.0, numpy.diag(3*y[0]**2 + 4.0*y[0]), numpy.diag(5*y[0]+0.6*(y[1]-4.0)**2-self.slope))
-    #     jac_xz = where(y[0] < 0.0, numpy.diag(numpy.zeros((n_ep,), dtype=y.dtype)), numpy.diag(1.2*(y[1]-4.0)*y[0]))
-    #
-    #     # energy
-    #     # The terms resulting from coupling from other regions, have to be added later on
-    #     if_fz = - 0.1 * y[1] ** 7
-    #     else_fz = 0
-    #     jac_zz = -numpy.diag(numpy.ones((n_ep,)), dtype=y.dtype) / self.tau0
-    #     if np.any(zmode == 0):
-    #         jac_zx = numpy.diag(4.0) / self.tau0
-    #         jac_zz -= numpy.diag(where(y[1] < 0.0, if_fz, else_fz))
-    #     elif np.any(zmoode == 1):
-    #         exp_fun = numpy.exp(-10.0 * (y[0] + 0.5))
-    #         jac_zx = numpy.diag(30.0 * exp_fun / (1.0 + exp_fun) ** 2)/ self.tau0
-    #     else:
-    #         raise_value_error('zmode has to be either 0 or 1 for linear and sigmoidal fz(), respectively')
-    #
-    #     return concat([numpy.hstack([jac_xx, jac_xz]),numpy.hstack([jac_zx, jac_zz])],axis=0)
+        r"""
+        Computes the Jacobian of the derivatives of the state variables of the Epileptor
+        with respect to the state variables, for all nodes at once.
+        The coupling is treated as an input, i.e., the terms due to the coupling from other nodes,
+        which depend on the connectivity, are not included (see calc_jac for their difference coupling form).
+
+        The Jacobian is returned as a (2 n, 2 n) matrix, where n is the number of nodes,
+        with rows and columns ordered by state variable first, and then by node, like in calc_jac:
+
+            .. math::
+                J = \begin{bmatrix} diag(\partial \dot{y_{0}} / \partial y_{0}) &
+                                    diag(\partial \dot{y_{0}} / \partial y_{1}) \\
+                                    diag(\partial \dot{y_{1}} / \partial y_{0}) &
+                                    diag(\partial \dot{y_{1}} / \partial y_{1}) \end{bmatrix}
+
+        """
+
+        y = state_variables.reshape((self._nvar, -1))
+        jac = numpy.zeros((self._nvar, ) + y.shape, dtype=y.dtype)
+        x1_neg = y[0] < 0.0
+
+        # population 1
+        jac[0, 0] = -where(x1_neg, 3.0 * self.a * y[0] ** 2 + 2.0 * (self.d - self.b) * y[0],
+                           2.0 * self.d * y[0] - 0.6 * (y[1] - 4.0) ** 2 - self.slope) + local_coupling
+        jac[0, 1] = -1.0 + where(x1_neg, 0.0, 1.2 * (y[1] - 4.0) * y[0])
+
+        # energy
+        jac[1, 0] = _dfz_dx1(y[0], self.zmode, where) / self.tau0
+        jac[1, 1] = (-1.0 + where(y[1] < 0.0, -0.7 * y[1] ** 6, 0.0)) / self.tau0
+
+        jac *= self.tau1
+
+        return _local_jacobian_to_matrix(jac)
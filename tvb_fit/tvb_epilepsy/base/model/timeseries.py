@@ -47,7 +47,8 @@ class Timeseries(TimeseriesBase):
             source_dim_labels = OrderedDict(
                 {TimeseriesDimensions.SPACE.value: self.dimension_labels[TimeseriesDimensions.SPACE.value],
                  TimeseriesDimensions.VARIABLES.value: [PossibleVariables.SOURCE.value]})
-            return Timeseries(source_data, source_dim_labels, self.time_start, self.time_step, self.time_unit)
+            return self._carry_labels_index(Timeseries(source_data, source_dim_labels,
+                                                       self.time_start, self.time_step, self.time_unit))
         self.logger.error(
             "%s is not computed and cannot be computed now because state variables %s and %s are not defined!" % (
                 PossibleVariables.SOURCE.value, PossibleVariables.X1.value, PossibleVariables.X2.value))
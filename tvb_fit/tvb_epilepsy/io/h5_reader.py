@@ -100,8 +100,8 @@ class H5Reader(H5ReaderBase):
         h5_file.close()
         return lsa_service
 
-    def read_timeseries(self, path, timeseries=Timeseries):
-        return super(H5Reader, self).read_timeseries(path, timeseries)
+    def read_timeseries(self, path, timeseries=Timeseries, lazy=False):
+        return super(H5Reader, self).read_timeseries(path, timeseries, lazy)
 
     def read_model_inversion_service(self, path):
         """
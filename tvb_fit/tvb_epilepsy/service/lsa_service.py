@@ -5,13 +5,15 @@ Service to do LSA computation.
 TODO: it might be useful to store eigenvalues and eigenvectors, as well as the parameters of the computation,
 such as eigen_vectors_number and LSAService in a h5 file
 """
+from copy import deepcopy
 import numpy
 from tvb_fit.base.config import CalculusConfig
 from tvb_fit.tvb_epilepsy.base.constants.model_constants import X1EQ_CR_DEF
 from tvb_fit.base.utils.log_error_utils import initialize_logger, raise_value_error, warning
 from tvb_fit.base.utils.data_structures_utils import formal_repr
 from tvb_fit.base.computations.analyzers_utils import interval_scaling
-from tvb_fit.tvb_epilepsy.base.computation_utils.calculations_utils import calc_fz_jac_square_taylor, calc_jac
+from tvb_fit.tvb_epilepsy.base.computation_utils.calculations_utils import calc_fz_jac_square_taylor, calc_jac, \
+    calc_fz_jac_square_taylor_stack
 from tvb_fit.tvb_epilepsy.base.computation_utils.equilibrium_computation import calc_eq_z
 from tvb_fit.base.computations.math_utils import weighted_vector_sum, curve_elbow_point
 from tvb_fit.tvb_epilepsy.service.hypothesis_builder import HypothesisBuilder
@@ -54,26 +56,59 @@ class LSAService(object):
     def get_curve_elbow_point(self, values_array):
         return curve_elbow_point(values_array)
 
-    def _ensure_eigen_vectors_number(self, eigen_values, e_values, x0_values, disease_indices):
-        if self.eigen_vectors_number is None:
-            if self.eigen_vectors_number_selection is "auto_eigenvals":
-                self.eigen_vectors_number = self.get_curve_elbow_point(numpy.abs(eigen_values))
+    def _compute_eigen_vectors_number(self, eigen_values, e_values, x0_values, disease_indices):
+        if self.eigen_vectors_number_selection is "auto_eigenvals":
+            return self.get_curve_elbow_point(numpy.abs(eigen_values))
 
-            elif self.eigen_vectors_number_selection is "auto_disease":
-                self.eigen_vectors_number = len(disease_indices)
+        elif self.eigen_vectors_number_selection is "auto_disease":
+            return len(disease_indices)
 
-            elif self.eigen_vectors_number_selection is "auto_epileptogenicity":
-                self.eigen_vectors_number = self.get_curve_elbow_point(e_values)
+        elif self.eigen_vectors_number_selection is "auto_epileptogenicity":
+            return self.get_curve_elbow_point(e_values)
 
-            elif self.eigen_vectors_number_selection is "auto_excitability":
-                self.eigen_vectors_number = self.get_curve_elbow_point(x0_values)
+        elif self.eigen_vectors_number_selection is "auto_excitability":
+            return self.get_curve_elbow_point(x0_values)
 
-            else:
-                raise_value_error("\n" + self.eigen_vectors_number_selection +
-                                  "is not a valid option when for automatic computation of self.eigen_vectors_number")
+        else:
+            raise_value_error("\n" + self.eigen_vectors_number_selection +
+                              "is not a valid option when for automatic computation of self.eigen_vectors_number")
+
+    def _ensure_eigen_vectors_number(self, eigen_values, e_values, x0_values, disease_indices):
+        if self.eigen_vectors_number is None:
+            self.eigen_vectors_number = \
+                self._compute_eigen_vectors_number(eigen_values, e_values, x0_values, disease_indices)
         else:
             self.eigen_vectors_number_selection = "user_defined"
 
+    def _ensure_lsa_method(self, x1eq):
+        if self.lsa_method == "auto":
+            if numpy.any(x1eq > X1EQ_CR_DEF):
+                self.lsa_method = "2D"
+            else:
+                self.lsa_method = "1D"
+
+        if self.lsa_method == "2D" and numpy.all(x1eq <= X1EQ_CR_DEF):
+            warning("LSA with the '2D' method (on the 2D Epileptor model) will not produce interpretable results when"
+                    " the equilibrium point of the system is not supercritical (unstable)!")
+
+    def _compute_subcritical_zeq(self, model_configuration):
+        # Check if any of the equilibria are in the supercritical regime (beyond the separatrix)
+        # and set it right before the bifurcation.
+        x1eq = numpy.array(model_configuration.x1eq)
+        zeq = numpy.array(model_configuration.zeq)
+        correction_value = X1EQ_CR_DEF - 10 ** (-3)
+        if numpy.any(x1eq > correction_value):
+            x1eq_min = numpy.min(x1eq)
+            x1eq = interval_scaling(x1eq, min_targ=x1eq_min, max_targ=correction_value,
+                                          min_orig=x1eq_min, max_orig=numpy.max(x1eq))
+            self.logger.warning("Equilibria x1eq are rescaled for LSA to value: X1EQ_CR_DEF - 10 ** (-3) = "
+                                + str(correction_value) + " to be sub-critical!")
+            zeq = calc_eq_z(x1eq, model_configuration.yc, model_configuration.Iext1,
+                                  "2d", numpy.zeros(model_configuration.x1eq.shape),
+                                  model_configuration.slope, model_configuration.a,
+                                  model_configuration.b, model_configuration.d)
+        return zeq
+
     def _compute_jacobian(self, model_configuration):
 
         if self.lsa_method == "2D":
@@ -83,21 +118,7 @@ class LSAService(object):
                                    a=model_configuration.a, b=model_configuration.b, d=model_configuration.d,
                                    tau1= model_configuration.tau1, tau0=model_configuration.tau0)
         else:
-            # Check if any of the equilibria are in the supercritical regime (beyond the separatrix)
-            # and set it right before the bifurcation.
-            x1eq = numpy.array(model_configuration.x1eq)
-            zeq = numpy.array(model_configuration.zeq)
-            correction_value = X1EQ_CR_DEF - 10 ** (-3)
-            if numpy.any(x1eq > correction_value):
-                x1eq_min = numpy.min(x1eq)
-                x1eq = interval_scaling(x1eq, min_targ=x1eq_min, max_targ=correction_value,
-                                              min_orig=x1eq_min, max_orig=numpy.max(x1eq))
-                self.logger.warning("Equilibria x1eq are rescaled for LSA to value: X1EQ_CR_DEF - 10 ** (-3) = "
-                                    + str(correction_value) + " to be sub-critical!")
-                zeq = calc_eq_z(x1eq, model_configuration.yc, model_configuration.Iext1,
-                                      "2d", numpy.zeros(model_configuration.x1eq.shape),
-                                      model_configuration.slope, model_configuration.a,
-                                      model_configuration.b, model_configuration.d)
+            zeq = self._compute_subcritical_zeq(model_configuration)
             fz_jacobian = calc_fz_jac_square_taylor(zeq, model_configuration.yc, model_configuration.Iext1,
                                                     model_configuration.K, model_configuration.connectivity,
                                                     model_configuration.a, model_configuration.b, model_configuration.d)
@@ -107,60 +128,61 @@ class LSAService(object):
 
         return fz_jacobian
 
-    def run_lsa(self, disease_hypothesis, model_configuration):
-
-        if self.lsa_method == "auto":
-            if numpy.any(model_configuration.x1eq > X1EQ_CR_DEF):
-                self.lsa_method = "2D"
-            else:
-                self.lsa_method = "1D"
+    def _compute_jacobians(self, model_configurations):
+        # Stack of jacobians of shape (n_samples, n, n) for a list of model configurations
+        if self.lsa_method == "2D":
+            return numpy.array([self._compute_jacobian(model_configuration)
+                                for model_configuration in model_configurations])
+        n_regions = model_configurations[0].number_of_regions
+        zeq = numpy.array([numpy.array(self._compute_subcritical_zeq(model_configuration)).flatten()
+                           for model_configuration in model_configurations])
+        yc, Iext1, K = [numpy.array([numpy.ones((n_regions,)) * numpy.array(getattr(model_configuration, p)).flatten()
+                                     for model_configuration in model_configurations])
+                        for p in ["yc", "Iext1", "K"]]
+        w = numpy.array([model_configuration.connectivity for model_configuration in model_configurations])
+        fz_jacobians = calc_fz_jac_square_taylor_stack(zeq, yc, Iext1, K, w)
+
+        if numpy.any([numpy.any(numpy.isnan(fz_jacobians)), numpy.any(numpy.isinf(fz_jacobians))]):
+            raise_value_error("nan or inf values in dfz")
 
-        if self.lsa_method == "2D" and numpy.all(model_configuration.x1eq <= X1EQ_CR_DEF):
-            warning("LSA with the '2D' method (on the 2D Epileptor model) will not produce interpretable results when"
-                    " the equilibrium point of the system is not supercritical (unstable)!")
+        return fz_jacobians
 
-        jacobian = self._compute_jacobian(model_configuration)
-
-        # Perform eigenvalue decomposition
-        eigen_values, eigen_vectors = numpy.linalg.eig(jacobian)
+    def _sort_eigen_decomposition(self, eigen_values, eigen_vectors):
+        # Works both for a single and for a stack of eigenvalue decompositions
         eigen_values = numpy.real(eigen_values)
         eigen_vectors = numpy.real(eigen_vectors)
-        sorted_indices = numpy.argsort(eigen_values, kind='mergesort')
+        sorted_indices = numpy.argsort(eigen_values, axis=-1, kind='mergesort')
         if self.lsa_method == "2D":
-            sorted_indices = sorted_indices[::-1]
-        self.eigen_vectors = eigen_vectors[:, sorted_indices]
-        self.eigen_values = eigen_values[sorted_indices]
-
-        self._ensure_eigen_vectors_number(self.eigen_values[:disease_hypothesis.number_of_regions],
-                                          model_configuration.e_values, model_configuration.x0_values,
-                                          disease_hypothesis.regions_disease_indices)
+            sorted_indices = sorted_indices[..., ::-1]
+        return numpy.take_along_axis(eigen_values, sorted_indices, -1), \
+               numpy.take_along_axis(eigen_vectors, numpy.expand_dims(sorted_indices, -2), -1)
 
-        if self.eigen_vectors_number == disease_hypothesis.number_of_regions:
+    def _compute_propagation_strength(self, eigen_values, eigen_vectors, eigen_vectors_number, n_regions):
+        if eigen_vectors_number == n_regions:
             # Calculate the propagation strength index by summing all eigenvectors
-            lsa_propagation_strength = numpy.abs(numpy.sum(self.eigen_vectors, axis=1))
+            lsa_propagation_strength = numpy.abs(numpy.sum(eigen_vectors, axis=1))
 
         else:
-            sorted_indices = max(self.eigen_vectors_number, 1)
             # Calculate the propagation strength index by summing the first n eigenvectors (minimum 1)
             if self.weighted_eigenvector_sum:
                 lsa_propagation_strength = \
-                    numpy.abs(weighted_vector_sum(numpy.array(self.eigen_values[:self.eigen_vectors_number]),
-                                                  numpy.array(self.eigen_vectors[:, :self.eigen_vectors_number]),
+                    numpy.abs(weighted_vector_sum(numpy.array(eigen_values[:eigen_vectors_number]),
+                                                  numpy.array(eigen_vectors[:, :eigen_vectors_number]),
                                                               normalize=True))
             else:
                 lsa_propagation_strength = \
-                    numpy.abs(numpy.sum(self.eigen_vectors[:, :self.eigen_vectors_number], axis=1))
+                    numpy.abs(numpy.sum(eigen_vectors[:, :eigen_vectors_number], axis=1))
 
         if self.lsa_method == "2D":
-            # lsa_propagation_strength = lsa_propagation_strength[:disease_hypothesis.number_of_regions]
+            # lsa_propagation_strength = lsa_propagation_strength[:n_regions]
             # or
-            # lsa_propagation_strength = numpy.where(lsa_propagation_strength[:disease_hypothesis.number_of_regions] >=
-            #                                        lsa_propagation_strength[disease_hypothesis.number_of_regions:],
-            #                                        lsa_propagation_strength[:disease_hypothesis.number_of_regions],
-            #                                        lsa_propagation_strength[disease_hypothesis.number_of_regions:])
+            # lsa_propagation_strength = numpy.where(lsa_propagation_strength[:n_regions] >=
+            #                                        lsa_propagation_strength[n_regions:],
+            #                                        lsa_propagation_strength[:n_regions],
+            #                                        lsa_propagation_strength[n_regions:])
             # or
-            lsa_propagation_strength = numpy.sqrt(lsa_propagation_strength[:disease_hypothesis.number_of_regions]**2 +
-                                                  lsa_propagation_strength[disease_hypothesis.number_of_regions:]**2)
+            lsa_propagation_strength = numpy.sqrt(lsa_propagation_strength[:n_regions]**2 +
+                                                  lsa_propagation_strength[n_regions:]**2)
             lsa_propagation_strength = numpy.log10(lsa_propagation_strength)
             lsa_propagation_strength -= lsa_propagation_strength.min()
 
@@ -169,6 +191,26 @@ class LSAService(object):
             # Normalize by the maximum
             lsa_propagation_strength /= numpy.max(lsa_propagation_strength)
 
+        return lsa_propagation_strength
+
+    def run_lsa(self, disease_hypothesis, model_configuration):
+
+        self._ensure_lsa_method(model_configuration.x1eq)
+
+        jacobian = self._compute_jacobian(model_configuration)
+
+        # Perform eigenvalue decomposition
+        eigen_values, eigen_vectors = numpy.linalg.eig(jacobian)
+        self.eigen_values, self.eigen_vectors = self._sort_eigen_decomposition(eigen_values, eigen_vectors)
+
+        self._ensure_eigen_vectors_number(self.eigen_values[:disease_hypothesis.number_of_regions],
+                                          model_configuration.e_values, model_configuration.x0_values,
+                                          disease_hypothesis.regions_disease_indices)
+
+        lsa_propagation_strength = self._compute_propagation_strength(self.eigen_values, self.eigen_vectors,
+                                                                      self.eigen_vectors_number,
+                                                                      disease_hypothesis.number_of_regions)
+
         # # TODO: this has to be corrected
         # if self.eigen_vectors_number < 0.2 * disease_hypothesis.number_of_regions:
         #     propagation_strength_elbow = numpy.max([self.get_curve_elbow_point(lsa_propagation_strength),
@@ -184,6 +226,67 @@ class LSAService(object):
 
         return hypothesis_builder.build_lsa_hypothesis()
 
+    def run_lsa_batch(self, disease_hypotheses, model_configurations):
+        """
+        Performs LSA for a stack of model configurations (e.g., the samples of a parameter search exploration)
+        with a stacked jacobian computation and eigenvalue decomposition.
+        Contrary to run_lsa, the state of the service (method, eigenvalues, eigenvectors and their number)
+        is not updated. For lsa_method "auto", the method is selected per model configuration, as run_lsa would.
+        :param disease_hypotheses: DiseaseHypothesis object, or list of DiseaseHypothesis objects,
+                                   one per model configuration
+        :param model_configurations: list of EpileptorModelConfiguration objects
+        :return: lsa_propagation_strengths numpy.ndarray of shape (n_samples, n_regions)
+        """
+        n_samples = len(model_configurations)
+        if not isinstance(disease_hypotheses, (list, tuple)):
+            disease_hypotheses = [disease_hypotheses] * n_samples
+        if self.lsa_method == "auto":
+            lsa_methods = [numpy.where(numpy.any(model_configuration.x1eq > X1EQ_CR_DEF), "2D", "1D").item()
+                           for model_configuration in model_configurations]
+        else:
+            lsa_methods = [self.lsa_method] * n_samples
+
+        lsa_propagation_strengths = [None] * n_samples
+        for lsa_method in numpy.unique(lsa_methods):
+            indices = [i_sample for i_sample, sample_lsa_method in enumerate(lsa_methods)
+                       if sample_lsa_method == lsa_method]
+            lsa_service = deepcopy(self)
+            lsa_service.lsa_method = lsa_method
+            for i_sample, lsa_propagation_strength in \
+                    zip(indices, lsa_service._run_lsa_stack([disease_hypotheses[i_sample] for i_sample in indices],
+                                                           [model_configurations[i_sample] for i_sample in indices])):
+                lsa_propagation_strengths[i_sample] = lsa_propagation_strength
+
+        return numpy.array(lsa_propagation_strengths)
+
+    def _run_lsa_stack(self, disease_hypotheses, model_configurations):
+        # LSA of a stack of model configurations with the same lsa_method
+        self._ensure_lsa_method(numpy.array([model_configuration.x1eq
+                                             for model_configuration in model_configurations]))
+
+        jacobians = self._compute_jacobians(model_configurations)
+
+        # Perform stacked eigenvalue decomposition
+        eigen_values, eigen_vectors = numpy.linalg.eig(jacobians)
+        eigen_values, eigen_vectors = self._sort_eigen_decomposition(eigen_values, eigen_vectors)
+
+        lsa_propagation_strengths = []
+        for disease_hypothesis, model_configuration, sample_eigen_values, sample_eigen_vectors in \
+                zip(disease_hypotheses, model_configurations, eigen_values, eigen_vectors):
+            n_regions = disease_hypothesis.number_of_regions
+            if self.eigen_vectors_number is None:
+                eigen_vectors_number = \
+                    self._compute_eigen_vectors_number(sample_eigen_values[:n_regions],
+                                                       model_configuration.e_values, model_configuration.x0_values,
+                                                       disease_hypothesis.regions_disease_indices)
+            else:
+                eigen_vectors_number = self.eigen_vectors_number
+            lsa_propagation_strengths.append(
+                self._compute_propagation_strength(sample_eigen_values, sample_eigen_vectors,
+                                                   eigen_vectors_number, n_regions))
+
+        return lsa_propagation_strengths
+
     def update_for_pse(self, values, paths, indices):
         for i, val in enumerate(paths):
             vals = val.split(".")
@@ -1,7 +1,6 @@
 import numpy
 from copy import deepcopy
 from tvb_fit.tvb_epilepsy.base.constants.config import CalculusConfig
-from tvb_fit.base.utils.log_error_utils import raise_not_implemented_error
 from tvb_fit.base.utils.data_structures_utils import formal_repr
 from tvb_fit.tvb_epilepsy.service.pse.pse_service import PSEService
 from tvb_fit.tvb_epilepsy.service.lsa_service import LSAService
@@ -27,9 +26,6 @@ class LSAPSEService(PSEService):
     def __str__(self):
         return self.__repr__()
 
-    def run_pse_parallel(self):
-        raise_not_implemented_error("PSE parallel not implemented!", self.logger)
-
     def run(self, params, conn_matrix, model_config_service_input=None, lsa_service_input=None,
             x1eq_mode="optimize", lsa_method=CalculusConfig.LSA_METHOD,
             n_eigenvectors=CalculusConfig.EIGENVECTORS_NUMBER_SELECTION,
@@ -52,11 +48,42 @@ class LSAPSEService(PSEService):
        # except:
       #      return False, None
 
+    def run_pse_batch(self, conn_matrix, grid_mode=False, model_config_service_input=None, lsa_service_input=None,
+                      x1eq_mode="optimize", lsa_method=CalculusConfig.LSA_METHOD,
+                      n_eigenvectors=CalculusConfig.EIGENVECTORS_NUMBER_SELECTION,
+                      weighted_eigenvector_sum=CalculusConfig.WEIGHTED_EIGENVECTOR_SUM):
+        # The model configurations are built loop by loop, but the LSA is run once for all of them
+        if numpy.any([path.split(".")[0] == "lsa_service" for path in self.params_paths]):
+            self.logger.warning("\nLSAService parameters are explored! Falling back to sequential PSE!")
+            return self.run_pse(conn_matrix, grid_mode, model_config_service_input, lsa_service_input, x1eq_mode,
+                                lsa_method, n_eigenvectors, weighted_eigenvector_sum)
+        if isinstance(lsa_service_input, LSAService):
+            lsa_service = deepcopy(lsa_service_input)
+        else:
+            lsa_service = LSAService(lsa_method=lsa_method, eigen_vectors_number=n_eigenvectors,
+                                     weighted_eigenvector_sum=weighted_eigenvector_sum)
+        model_configurations = []
+        hypotheses = []
+        for iloop in range(self.n_loops):
+            model_configuration, hypo_copy = self.update_model_config(self.params_vals[iloop], conn_matrix,
+                                                                      model_config_service_input, self.hypothesis,
+                                                                      x1eq_mode)
+            model_configurations.append(model_configuration)
+            hypotheses.append(hypo_copy)
+        lsa_propagation_strengths = lsa_service.run_lsa_batch(hypotheses, model_configurations)
+        results = [self._prepare_results(lsa_propagation_strength, model_configuration)
+                   for model_configuration, lsa_propagation_strength
+                   in zip(model_configurations, lsa_propagation_strengths)]
+        return self._prepare_pse_results(results, [True] * self.n_loops, grid_mode)
+
     def prepare_run_results(self, lsa_hypothesis, model_configuration=None):
         if model_configuration is None:
             return {"lsa_propagation_strengths": lsa_hypothesis.propagation_strenghts}
 
-        return {"lsa_propagation_strengths": lsa_hypothesis.lsa_propagation_strengths,
+        return self._prepare_results(lsa_hypothesis.lsa_propagation_strengths, model_configuration)
+
+    def _prepare_results(self, lsa_propagation_strengths, model_configuration):
+        return {"lsa_propagation_strengths": lsa_propagation_strengths,
                 "x0_values": model_configuration.x0_values,
                 "e_values": model_configuration.e_values, "x1eq": model_configuration.x1eq,
                 "zeq": model_configuration.zeq, "Ceq": model_configuration.Ceq}
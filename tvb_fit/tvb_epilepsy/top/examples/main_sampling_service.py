@@ -24,6 +24,13 @@ def main_sampling_service(config=Config()):
         logger.info("\n" + key + ": " + str(value))
     logger.info(sampler.__repr__())
 
+    logger.info("\nDeterministic scrambled Sobol sampling:")
+    sampler = DeterministicSampler(n_samples=128, sampler="sobol", scramble=True, random_seed=0)
+    samples, stats = sampler.generate_samples(low=1.0, high=2.0, shape=(2,), stats=True)
+    for key, value in stats.items():
+        logger.info("\n" + key + ": " + str(value))
+    logger.info(sampler.__repr__())
+
     logger.info("\nStochastic uniform sampling with numpy:")
     sampler = ProbabilisticSampler(n_samples=n_samples, sampling_module="numpy")
     #                                      a (low), b (high)
@@ -3,6 +3,7 @@ import numpy as np
 from tvb_fit.base.utils.log_error_utils import initialize_logger
 from tvb_fit.base.utils.data_structures_utils import isequal_string
 from tvb_fit.service.timeseries_service import TimeseriesService, NORMALIZATION_METHODS
+from tvb_fit.service.preprocessing_pipeline import PreprocessingPipeline
 from tvb_fit.io.edf import read_edf_to_Timeseries
 
 from tvb_fit.tvb_epilepsy.base.constants.model_inversion_constants import \
@@ -11,40 +12,87 @@ from tvb_fit.tvb_epilepsy.base.constants.model_inversion_constants import \
 
 logger = initialize_logger(__name__)
 
+# When decimating before low pass filtering, the band up to LPF_ALIASING_BAND_RATIO times the high cutoff of the
+# (3rd order Butterworth) filter is protected from aliasing, and the sampling frequency is kept at least
+# LPF_MIN_SAMPLING_RATIO times the high cutoff.
+# The result only approximates low pass filtering at the full sampling rate, so decimate_before_lpf is off by default.
+LPF_ALIASING_BAND_RATIO = 4.0
+LPF_MIN_SAMPLING_RATIO = 16.0
 
-def prepare_signal_observable(data, seizure_length=SEIZURE_LENGTH, on_off_set=[], rois=[],
-                              preprocessing=TARGET_DATA_PREPROCESSING, low_hpf=LOW_HPF, high_hpf=HIGH_HPF,
-                              low_lpf=LOW_LPF, high_lpf=HIGH_LPF, win_len_ratio=WIN_LEN_RATIO,
-                              plotter=None, title_prefix=""):
+# Preprocessing steps that depend on the sampling frequency of the data
+RATE_DEPENDENT_PREPROCESSING = ["hpf", "spectrogram", "envelope", "convolve", "lpf"]
 
-    title_prefix = title_prefix + str(np.where(len(title_prefix) > 0, "_", "")) + "fit_data_preproc"
 
+def build_signal_observable_pipeline(data, seizure_length=SEIZURE_LENGTH, on_off_set=[],
+                                     preprocessing=TARGET_DATA_PREPROCESSING, low_hpf=LOW_HPF, high_hpf=HIGH_HPF,
+                                     low_lpf=LOW_LPF, high_lpf=HIGH_LPF, win_len_ratio=WIN_LEN_RATIO,
+                                     plotter=None, title_prefix="", decimate_before_lpf=False):
     ts_service = TimeseriesService()
 
-    # Select rois if any:
-    n_rois = len(rois)
-    if n_rois > 0:
-        if data.number_of_labels > n_rois:
-            logger.info("Selecting signals...")
-            if isinstance(rois[0], basestring):
-                data = data.get_subspace_by_labels(rois)
-            else:
-                data = data.get_subspace_by_index(rois)
+    # All parameters that depend on the data are computed at run time, and kept in the context of the run,
+    # so that the pipeline can preprocess other data than those it was built for
+    pipeline = PreprocessingPipeline(plotter=plotter, title_prefix=title_prefix, logger=logger)
 
-    # First cut data close to the desired interval
-    if len(on_off_set) == 0:
-        on_off_set = [data.time_start, data.time_end]
-    duration = on_off_set[1] - on_off_set[0]
-    temp_on_off = [np.maximum(data.time_start, on_off_set[0] - 2 * duration/win_len_ratio),
-                   np.minimum(data.time_end, on_off_set[1] + 2 * duration/win_len_ratio)]
-    data = data.get_time_window_by_units(temp_on_off[0], temp_on_off[1])
-    if plotter:
-        plotter.plot_raster({"SelectedTimeInterval": data.squeezed}, data.time, time_units=data.time_unit,
-                            special_idx=[], title='Selected time interval time series', offset=0.1,
-                            figure_name=title_prefix + '_SelectedRaster', labels=data.space_labels)
-        plotter.plot_timeseries({"SelectedTimeInterval": data.squeezed}, data.time, time_units=data.time_unit,
-                                special_idx=[], title='Selected time interval time series',
-                                figure_name=title_prefix + '_SelectedTS', labels=data.space_labels)
+    def select_time_interval(data, context):
+        # First cut data close to the desired interval
+        if len(on_off_set) == 0:
+            context["on_off_set"] = [data.time_start, data.time_end]
+        else:
+            context["on_off_set"] = on_off_set
+        context["duration"] = context["on_off_set"][1] - context["on_off_set"][0]
+        # The time interval of the data before the final cut, which is updated by the spectrogram step:
+        context["temp_on_off"] = \
+            [np.maximum(data.time_start, context["on_off_set"][0] - 2 * context["duration"]/win_len_ratio),
+             np.minimum(data.time_end, context["on_off_set"][1] + 2 * context["duration"]/win_len_ratio)]
+        return data.get_time_window_by_units(context["temp_on_off"][0], context["temp_on_off"][1])
+
+    pipeline.add_step("time interval selection", select_time_interval, view=True, context=True,
+                      plot_title='Selected time interval time series', figure_name='_Selected')
+
+    def spectrogram_envelope(data, context):
+        temp_duration = context["temp_on_off"][1] - context["temp_on_off"][0]
+        decim_ratio = np.maximum(1, int(
+            np.floor((1.0 * data.time_length / seizure_length) * (context["duration"] / temp_duration))))
+        data = ts_service.spectrogram_envelope(data.__class__(np.array(data.data).astype("float64"),
+                                                              data.dimension_labels, data.time_start,
+                                                              data.time_step, data.time_unit),
+                                               high_hpf, low_hpf, decim_ratio)
+        data.data /= data.data.std()
+        data.data = data.data.astype("float32")
+        context["temp_on_off"] = [data.time_start, data.time_end]
+        return data
+
+    def decimation_ratio(data, context):
+        # The decimation ratio that gets the data close to seizure_length points within the on_off_set interval
+        temp_duration = context["temp_on_off"][1] - context["temp_on_off"][0]
+        return np.maximum(1, int(np.round((1.0 * data.time_length / seizure_length) *
+                                          (context["duration"] / temp_duration))))
+
+    def decimate_and_lpf(data, context, high_lpf):
+        # Filtering at the full sampling rate, only to subsample afterwards, is wasteful:
+        # decimate first, as much as the final decimation ratio allows,
+        # while keeping the sampling frequency well above the band of the filter, and then filter.
+        # If the sampling frequency is already too low for that, just filter, as without decimate_before_lpf.
+        # The final decimation ratio and the part of it already performed here are kept for the decimation step:
+        decim_ratio = decimation_ratio(data, context)
+        context["decimation_ratio"] = decim_ratio
+        context["decimation_done"] = np.max([1] + [q for q in range(2, decim_ratio + 1)
+                                                   if decim_ratio % q == 0 and
+                                                   data.sampling_frequency / q >= LPF_MIN_SAMPLING_RATIO * high_lpf])
+        if context["decimation_done"] > 1:
+            logger.info("Decimating signals " + str(context["decimation_done"]) +
+                        " times before low-pass filtering...")
+            # Only the band of the filter, including its transition band, needs to be protected from aliasing:
+            data = ts_service.decimate_by_filtering(data, context["decimation_done"],
+                                                    2.0 * LPF_ALIASING_BAND_RATIO * high_lpf *
+                                                    context["decimation_done"] / data.sampling_frequency)
+        return ts_service.filter(data, low_lpf, high_lpf, "bandpass", order=3)
+
+    def convolve(data, context):
+        # The window length also names the figures of the step:
+        context["win_len"] = int(np.round(1.0 * data.time_length / win_len_ratio))
+        logger.info("Convolving signals with a square window of " + str(context["win_len"]) + " points...")
+        return ts_service.convolve(data, context["win_len"])
 
     for i_preproc, preproc in enumerate(preprocessing):
 
@@ -53,155 +101,123 @@ def prepare_signal_observable(data, seizure_length=SEIZURE_LENGTH, on_off_set=[]
         # Now filter, if needed, before decimation introduces any artifacts
         if isequal_string(preproc, "hpf"):
             high_hpf = np.minimum(high_hpf, 256.0)
-            logger.info("High-pass filtering signals...")
-            data = ts_service.filter(data, low_hpf, high_hpf, "bandpass", order=3)
-            if plotter:
-                plotter.plot_raster({"High-pass filtering": data.squeezed}, data.time, time_units=data.time_unit,
-                                    special_idx=[], title='High-pass filtered Time Series', offset=0.1,
-                                    figure_name=title_prefix + '_%sHpfRaster' % stri_preproc,
-                                    labels=data.space_labels)
-                plotter.plot_timeseries({"High-pass filtering": data.squeezed}, data.time, time_units=data.time_unit,
-                                        special_idx=[], title='High-pass filtered Time Series',
-                                        figure_name=title_prefix + '_%sHpfTS' % stri_preproc,
-                                        labels=data.space_labels)
+            pipeline.add_step("high-pass filtering",
+                              lambda data, high_hpf=high_hpf: ts_service.filter(data, low_hpf, high_hpf, "bandpass",
+                                                                                order=3),
+                              plot_title='High-pass filtered Time Series', figure_name='_%sHpf' % stri_preproc)
 
         if isequal_string(preproc, "mean-center"):
-            logger.info("Mean center data...")
-            data = ts_service.normalize(data, "mean")
-            if plotter:
-                plotter.plot_raster({"Mean centered signals": data.squeezed}, data.time, time_units=data.time_unit,
-                                    special_idx=[], title='Mean centered Time Series', offset=0.1,
-                                    figure_name=title_prefix + '_%sMeanCenteredRaster' % stri_preproc,
-                                    labels=data.space_labels)
-                plotter.plot_timeseries({"Mean centered signals": data.squeezed}, data.time, time_units=data.time_unit,
-                                        special_idx=[], title='Mean centered Time Series',
-                                        figure_name=title_prefix + '_%sMeanCenteredTS' % stri_preproc,
-                                        labels=data.space_labels)
+            pipeline.add_step("mean centering",
+                              lambda data, in_place: ts_service.normalize(data, "mean", in_place=in_place),
+                              in_place=True, plot_title='Mean centered Time Series',
+                              figure_name='_%sMeanCentered' % stri_preproc)
 
         if isequal_string(preproc, "spectrogram"):
-            # or
-            # ...get the signals' envelope via Hilbert transform
-            temp_duration = temp_on_off[1] - temp_on_off[0]
-            decim_ratio = np.maximum(1, int(
-                np.floor((1.0 * data.time_length / seizure_length) * (duration / temp_duration))))
-            data.data = np.array(data.data).astype("float64")
-            data = ts_service.spectrogram_envelope(data, high_hpf, low_hpf, decim_ratio)
-            data.data /= data.data.std()
-            data.data = np.array(data.data).astype("float32")
-            temp_on_off = [data.time_start, data.time_end]
-            if plotter:
-                plotter.plot_raster({"Spetrogram signals": data.squeezed}, data.time, time_units=data.time_unit,
-                                    special_idx=[], title='Spectrogram Time Series', offset=0.1,
-                                    figure_name=title_prefix + '_%sSpectrogramRaster' % stri_preproc,
-                                    labels=data.space_labels)
-                plotter.plot_timeseries({"Spectrogram signals": data.squeezed}, data.time, time_units=data.time_unit,
-                                        special_idx=[], title='Spectrogram Time Series',
-                                        figure_name=title_prefix + '_%sSpectrogramTS' % stri_preproc,
-                                        labels=data.space_labels)
-        plot_envelope = ""
-        if preproc.lower().find("envelope") >= 0: # isequal_string(preproc, "hilbert_envelope") or isequal_string(preproc, "abs_envelope"):
-            plot_envelope = preproc
+            pipeline.add_step("spectrogram envelope", spectrogram_envelope, context=True,
+                              plot_title='Spectrogram Time Series', figure_name='_%sSpectrogram' % stri_preproc)
+
+        if preproc.lower().find("envelope") >= 0:
+            figure_name = "_%s" % stri_preproc + preproc.replace(" ", "_")
             if isequal_string(preproc, "hilbert_envelope"):
-                # or
                 # ...get the signals' envelope via Hilbert transform
-                data = ts_service.hilbert_envelope(data)
-                # or
-            # elif isequal_string(preproc, "square"):
-            #     # Square data to get positive "power like" timeseries (introducing though higher frequencies)
-            #     data = ts_service.square(data)
-            else: # isequal_string(preproc, "abs_envelope"): # "abs_envelope"
-                data = ts_service.abs_envelope(data)
-            if plotter:
-                plot_envelop_ = plot_envelope.replace(" ", "_")
-                plotter.plot_raster({plot_envelop_: data.squeezed}, data.time,
-                                    time_units=data.time_unit, special_idx=[],
-                                    title=plot_envelope, offset=0.1,
-                                    figure_name=title_prefix + "_%s" % stri_preproc + plot_envelop_ + "Raster",
-                                    labels=data.space_labels)
-                plotter.plot_timeseries({plot_envelop_: data.squeezed}, data.time,
-                                        time_units=data.time_unit, special_idx=[], title=plot_envelope,
-                                        figure_name=title_prefix + "_%s" % stri_preproc + plot_envelop_ + "TS",
-                                        labels=data.space_labels)
+                pipeline.add_step(preproc, ts_service.hilbert_envelope, plot_title=preproc, figure_name=figure_name)
+            else:  # isequal_string(preproc, "abs_envelope"): # "abs_envelope"
+                pipeline.add_step(preproc,
+                                  lambda data, in_place: ts_service.abs_envelope(data, in_place=in_place),
+                                  in_place=True, plot_title=preproc, figure_name=figure_name)
 
         if isequal_string(preproc, "log"):
-            logger.info("Computing log of signals...")
-            data = ts_service.log(data)
-            if plotter:
-                plotter.plot_raster({"LogTimeSeries": data.squeezed}, data.time, time_units=data.time_unit,
-                                    special_idx=[], title='Log of Time Series', offset=0.1,
-                                    figure_name=title_prefix + '_%sLogRaster' % stri_preproc,
-                                    labels=data.space_labels)
-                plotter.plot_timeseries({"LogTimeSeries": data.squeezed}, data.time, time_units=data.time_unit,
-                                        special_idx=[], title='Log of Time Series',
-                                        figure_name=title_prefix + '_%sLogTS' % stri_preproc,
-                                        labels=data.space_labels)
+            pipeline.add_step("log", lambda data, in_place: ts_service.log(data, in_place=in_place), in_place=True,
+                              plot_title='Log of Time Series', figure_name='_%sLog' % stri_preproc)
 
         # Now convolve or low pass filter to smooth...
         if isequal_string(preproc, "convolve"):
-            win_len = int(np.round(1.0*data.time_length/win_len_ratio))
-            str_win_len = str(win_len)
-            data = ts_service.convolve(data, win_len)
-            logger.info("Convolving signals with a square window of " + str_win_len + " points...")
-            if plotter:
-                plotter.plot_raster({"ConvolutionSmoothing": data.squeezed}, data.time,
-                                    time_units=data.time_unit, special_idx=[], offset=0.1,
-                                    title='Convolved Time Series with a window of ' + str_win_len + " points",
-                                    figure_name=
-                                       title_prefix + '_%s_%spointWinConvolRaster' % (stri_preproc, str_win_len),
-                                    labels=data.space_labels)
-                plotter.plot_timeseries({"ConvolutionSmoothing": data.squeezed}, data.time,
-                                        time_units=data.time_unit, special_idx=[],
-                                        title='Convolved Time Series with a window of ' + str_win_len + " points",
-                                        figure_name=
-                                            title_prefix + '_%s_%spointWinConvolTS' % (stri_preproc, str_win_len),
-                                        labels=data.space_labels)
+            pipeline.add_step("convolution", convolve, context=True,
+                              plot_title=lambda context: 'Convolved Time Series with a window of ' +
+                                                         str(context["win_len"]) + " points",
+                              figure_name=lambda context, stri_preproc=stri_preproc:
+                                              '_%s_%spointWinConvol' % (stri_preproc, context["win_len"]))
 
         elif isequal_string(preproc, "lpf"):
             high_lpf = np.minimum(high_lpf, 512.0)
-            logger.info("Low-pass filtering signals...")
-            data = ts_service.filter(data, low_lpf, high_lpf, "bandpass", order=3)
-            if plotter:
-                plotter.plot_raster({"Low-pass filtering": data.squeezed}, data.time, time_units=data.time_unit,
-                                    special_idx=[], title='Low-pass filtered Time Series', offset=0.1,
-                                    figure_name=title_prefix + '_%sLpfRaster' % stri_preproc,
-                                    labels=data.space_labels)
-                if plotter:
-                    plotter.plot_timeseries({"Low-pass filtering": data.squeezed}, data.time,
-                                            time_units=data.time_unit,
-                                            special_idx=[], title='Low-pass filtered Time Series',
-                                            figure_name=title_prefix + '_%sLpfTS' % stri_preproc,
-                                            labels=data.space_labels)
+            # Decimation can precede low pass filtering only if no later step depends on the sampling frequency:
+            if decimate_before_lpf and "decimate" in preprocessing and \
+                    not np.any([rate_preproc in later_preproc.lower()
+                                for later_preproc in preprocessing[i_preproc+1:]
+                                for rate_preproc in RATE_DEPENDENT_PREPROCESSING]):
+                pipeline.add_step("decimation and low-pass filtering",
+                                  lambda data, context, high_lpf=high_lpf: decimate_and_lpf(data, context, high_lpf),
+                                  context=True, plot_title='Low-pass filtered Time Series', figure_name='_%sLpf' % stri_preproc)
+            else:
+                pipeline.add_step("low-pass filtering",
+                                  lambda data, high_lpf=high_lpf: ts_service.filter(data, low_lpf, high_lpf,
+                                                                                    "bandpass", order=3),
+                                  plot_title='Low-pass filtered Time Series', figure_name='_%sLpf' % stri_preproc)
 
     if "decimate" in preprocessing:
         # Now decimate to get close to seizure_length points
-        temp_duration = temp_on_off[1] - temp_on_off[0]
-        decim_ratio = np.maximum(1, int(np.round((1.0*data.time_length/seizure_length) * (duration/temp_duration))))
-        if decim_ratio > 1:
-            str_decim_ratio = str(decim_ratio)
-            logger.info("Decimating signals " + str_decim_ratio + " times...")
-            data = ts_service.decimate(data, decim_ratio)
-            if plotter:
-                plotter.plot_raster({str_decim_ratio + " wise Decimation": data.squeezed}, data.time,
-                                    time_units=data.time_unit, special_idx=[],
-                                    title=str_decim_ratio + " wise Decimation", offset=0.1,
-                                    figure_name=
-                                          title_prefix + "_%s_%sxDecimRaster" % (stri_preproc, str_decim_ratio),
-                                    labels=data.space_labels)
-                plotter.plot_timeseries({str_decim_ratio + " wise Decimation": data.squeezed}, data.time,
-                                        time_units=data.time_unit, special_idx=[],
-                                        title=str_decim_ratio + " wise Decimation",
-                                        figure_name=
-                                            title_prefix + "_%s_%sxDecimTS" % (stri_preproc, str_decim_ratio),
-                                        labels=data.space_labels)
-
-    # # Cut to the desired interval
-    data = data.get_time_window_by_units(on_off_set[0], on_off_set[1])
+
+        def decimate(data, context):
+            if "decimation_ratio" in context:
+                # Only what is left of the decimation ratio, computed before the low pass filtering step:
+                context["decimation_last"] = context["decimation_ratio"] // context["decimation_done"]
+            else:
+                context["decimation_last"] = decimation_ratio(data, context)
+            if context["decimation_last"] > 1:
+                logger.info("Decimating signals " + str(context["decimation_last"]) + " times...")
+                data = ts_service.decimate(data, context["decimation_last"])
+            return data
+
+        def decimation_figure_name(context):
+            # No figures if no decimation is performed:
+            if context["decimation_last"] > 1:
+                return "_%s_%sxDecim" % (str(len(preprocessing)), str(context["decimation_last"]))
+            return ""
+
+        pipeline.add_step("decimation", decimate, view=True, context=True,
+                          plot_title=lambda context: str(context["decimation_last"]) + " wise Decimation",
+                          figure_name=decimation_figure_name)
+
+    # Cut to the desired interval
+    pipeline.add_step("time interval cut",
+                      lambda data, context: data.get_time_window_by_units(context["on_off_set"][0],
+                                                                          context["on_off_set"][1]),
+                      view=True, context=True)
 
     for preproc in preprocessing:
         if preproc in NORMALIZATION_METHODS:
             # Finally, normalize signals
-            logger.info("Normalizing signals...")
-            data = ts_service.normalize(data, preproc)  # "baseline", "baseline-std", "baseline-amplitude" or "zscore
+            # "baseline", "baseline-std", "baseline-amplitude" or "zscore
+            pipeline.add_step(preproc + " normalization",
+                              lambda data, in_place, preproc=preproc: ts_service.normalize(data, preproc,
+                                                                                           in_place=in_place),
+                              in_place=True)
+
+    return pipeline
+
+
+def prepare_signal_observable(data, seizure_length=SEIZURE_LENGTH, on_off_set=[], rois=[],
+                              preprocessing=TARGET_DATA_PREPROCESSING, low_hpf=LOW_HPF, high_hpf=HIGH_HPF,
+                              low_lpf=LOW_LPF, high_lpf=HIGH_LPF, win_len_ratio=WIN_LEN_RATIO,
+                              plotter=None, title_prefix="", decimate_before_lpf=False):
+
+    title_prefix = title_prefix + str(np.where(len(title_prefix) > 0, "_", "")) + "fit_data_preproc"
+
+    # Select rois if any:
+    n_rois = len(rois)
+    if n_rois > 0:
+        if data.number_of_labels > n_rois:
+            logger.info("Selecting signals...")
+            if isinstance(rois[0], basestring):
+                data = data.get_subspace_by_labels(rois)
+            else:
+                data = data.get_subspace_by_index(rois)
+
+    pipeline = build_signal_observable_pipeline(data, seizure_length, on_off_set, preprocessing,
+                                                low_hpf, high_hpf, low_lpf, high_lpf, win_len_ratio,
+                                                plotter, title_prefix, decimate_before_lpf)
+    data = pipeline.run(data)
+
     if plotter:
         plotter.plot_raster({"ObservationRaster": data.squeezed}, data.time, time_units=data.time_unit,
                             special_idx=[], offset=0.1, title='Observation Raster Plot',
@@ -238,10 +254,12 @@ def prepare_seeg_observable_from_mne_file(seeg_path, sensors, rois_selection, se
                                           on_off_set=[], time_units="ms", label_strip_fun=None,
                                           preprocessing=TARGET_DATA_PREPROCESSING,
                                           low_hpf=LOW_HPF, high_hpf=HIGH_HPF, low_lpf=LOW_LPF, high_lpf=HIGH_LPF,
-                                          bipolar=BIPOLAR, win_len_ratio=WIN_LEN_RATIO, plotter=None, title_prefix=""):
+                                          bipolar=BIPOLAR, win_len_ratio=WIN_LEN_RATIO, plotter=None, title_prefix="",
+                                          time_window=None, decim_ratio=1):
     logger.info("Reading empirical dataset from edf file...")
     data = read_edf_to_Timeseries(seeg_path, sensors, rois_selection,
-                                  label_strip_fun=label_strip_fun, time_units=time_units)
+                                  label_strip_fun=label_strip_fun, time_units=time_units,
+                                  time_window=time_window, decim_ratio=decim_ratio)
     data.data = np.array(data.data).astype("float32")
     if plotter:
         plotter.plot_raster({"OriginalData": data.squeezed}, data.time, time_units=data.time_unit,
@@ -108,7 +108,16 @@ def pse_from_lsa_hypothesis(n_samples, lsa_hypothesis, model_connectivity, model
 
     # Now run pse service to generate output samples:
     pse = LSAPSEService(hypothesis=lsa_hypothesis, params_pse=pse_params_list)
-    pse_results, execution_status = pse.run_pse(model_connectivity, False, model_configuration_builder, lsa_service)
+    n_processes = kwargs.get("n_processes", 1)
+    if kwargs.get("lsa_batch", False):
+        pse_results, execution_status = pse.run_pse_batch(model_connectivity, False, model_configuration_builder,
+                                                          lsa_service)
+    elif n_processes is None or n_processes > 1:
+        pse_results, execution_status = pse.run_pse_parallel(model_connectivity, False, n_processes,
+                                                             model_configuration_builder, lsa_service)
+    else:
+        pse_results, execution_status = pse.run_pse(model_connectivity, False, model_configuration_builder,
+                                                    lsa_service)
     logger.info(pse.__repr__())
     pse_results = list_of_dicts_to_dicts_of_ndarrays(pse_results)
     for key in pse_results.keys():